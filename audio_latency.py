@@ -0,0 +1,87 @@
+import time
+
+# Block sizes the controller moves between, in frames (powers of two suit every host API)
+BLOCK_SIZES = (64, 128, 256, 512, 1024, 2048)
+
+
+class BlockSizeController:
+    """Picks the smallest audio block size the host can keep up with.
+
+    The audio callback reports every block through on_block() (its status
+    flags and how long rendering took); decide(), called from another thread
+    every fraction of a second, answers with a new block size or None.
+    Any underrun, or callbacks using more than `max_load` of their block's
+    duration, moves one size up. After `tighten_after` seconds without
+    trouble at under `idle_load` (so the halved block would still be below
+    max_load) it moves one size down again, except to a size that underran
+    recently: each backoff from a size bars it for `hold` seconds, doubling
+    every time that size fails again.
+    """
+    def __init__(self, sizes=BLOCK_SIZES, initial=256, sample_rate=44100, max_load=0.6,
+                 idle_load=0.25, tighten_after=10.0, hold=5.0, clock=time.monotonic):
+        self.sizes = tuple(sorted(sizes))
+        self.index = min(range(len(self.sizes)), key=lambda i: abs(self.sizes[i] - initial))
+        self.sample_rate = sample_rate
+        self.max_load = max_load
+        self.idle_load = idle_load
+        self.tighten_after = tighten_after
+        self.hold = hold
+        self.clock = clock
+
+        # Written by the audio thread only
+        self.underruns = 0
+        self.blocks = 0
+        self.load = None          # EWMA of render time / block duration
+
+        self.changes = 0
+        self._seen_underruns = 0
+        self._stable_since = clock()
+        self._barred_until = [0.0] * len(self.sizes)
+        self._hold = [hold] * len(self.sizes)
+
+    @property
+    def blocksize(self):
+        return self.sizes[self.index]
+
+    @property
+    def block_duration(self):
+        return self.blocksize / self.sample_rate
+
+    def on_block(self, frames, status, duration):
+        """Audio thread: one block was rendered in `duration` seconds"""
+        if status and status.output_underflow:
+            self.underruns += 1
+        load = duration * self.sample_rate / frames
+        self.load = load if self.load is None else self.load + 0.05 * (load - self.load)
+        self.blocks += 1
+
+    def decide(self, now=None):
+        """New block size if the stream should be reopened with one, else None"""
+        now = self.clock() if now is None else now
+        underruns = self.underruns
+        failed = underruns != self._seen_underruns
+        self._seen_underruns = underruns
+        load = self.load
+
+        if failed or (load is not None and load > self.max_load):
+            if failed:
+                # Keep away from this size for a while, longer each time it fails
+                self._barred_until[self.index] = now + self._hold[self.index]
+                self._hold[self.index] *= 2
+            self._stable_since = now
+            if self.index + 1 < len(self.sizes):
+                return self._move(self.index + 1)
+            return None
+
+        if (self.index > 0 and load is not None and load < self.idle_load
+                and now - self._stable_since >= self.tighten_after
+                and now >= self._barred_until[self.index - 1]):
+            self._stable_since = now
+            return self._move(self.index - 1)
+        return None
+
+    def _move(self, index):
+        self.index = index
+        self.load = None  # Measured afresh at the new size
+        self.changes += 1
+        return self.sizes[index]
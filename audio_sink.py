@@ -0,0 +1,141 @@
+import atexit
+import threading
+import time
+import wave
+from collections import namedtuple
+
+import numpy as np
+
+# Mirrors the time argument sounddevice passes to stream callbacks
+StreamTime = namedtuple('StreamTime', ['currentTime', 'outputBufferDacTime'])
+
+
+class CallbackStatus:
+    """Mirrors sounddevice.CallbackFlags for the flags EchoNav looks at"""
+    def __init__(self, output_underflow=False):
+        self.output_underflow = output_underflow
+
+    def __bool__(self):
+        return self.output_underflow
+
+
+class NullOutputStream:
+    """Output stream that discards audio but calls the callback at the real block rate.
+
+    Takes the same arguments as sounddevice.OutputStream, so it can be passed to
+    ContinuousToneGenerator as stream_factory to run EchoNav on machines
+    without an audio device.
+
+    Like a real device it flags output_underflow on the next callback when a
+    block was not ready in time (more than `latency` behind schedule). `host_load` (seconds, or a callable returning
+    seconds) is extra time spent per callback, to simulate a busy host.
+    """
+    def __init__(self, samplerate=44100, channels=1, callback=None, blocksize=0,
+                 latency=None, dtype='float32', host_load=0.0, **kwargs):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.callback = callback
+        self.blocksize = blocksize or 512
+        self.latency = latency if isinstance(latency, (int, float)) else self.blocksize / samplerate
+        self.dtype = dtype
+        self.host_load = host_load
+        self.active = False
+        self.callbacks = 0
+        self.underflows = 0
+        self._thread = None
+
+    def start(self):
+        if self.active:
+            return
+        self.active = True
+        self._thread = threading.Thread(target=self._run, name='null-audio', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.active = False
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def close(self):
+        self.stop()
+
+    def write_block(self, outdata):
+        """Where a rendered block goes; the null sink drops it"""
+
+    def _run(self):
+        outdata = np.zeros((self.blocksize, self.channels), dtype=self.dtype)
+        period = self.blocksize / self.samplerate
+        deadline = time.monotonic()
+        status = CallbackStatus()
+        while self.active:
+            now = time.monotonic()
+            self.callback(outdata, self.blocksize, StreamTime(now, now + self.latency), status)
+            self.callbacks += 1
+            self.write_block(outdata)
+            load = self.host_load() if callable(self.host_load) else self.host_load
+            if load:
+                time.sleep(load)
+            deadline += period
+            late = time.monotonic() - deadline
+            if late > self.latency:
+                # Later than the device's buffer could cover: it ran dry and restarts from now
+                status = CallbackStatus(output_underflow=True)
+                self.underflows += 1
+                deadline = time.monotonic()
+            else:
+                status = CallbackStatus()
+                time.sleep(max(0.0, -late))
+
+
+class WaveFileOutputStream(NullOutputStream):
+    """Null stream that also writes the audio to a WaveFileSink"""
+    def __init__(self, sink, **kwargs):
+        super().__init__(**kwargs)
+        self.sink = sink
+
+    def write_block(self, outdata):
+        self.sink.write(outdata, self.channels, self.samplerate)
+
+
+class WaveFileSink:
+    """stream_factory writing everything played to one 16-bit WAV file, for listening back to test runs.
+
+    Streams reopened with another block size keep appending to the same file.
+    The file is finished by close(), or at exit.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.writer = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def __call__(self, **kwargs):
+        return WaveFileOutputStream(self, **kwargs)
+
+    def write(self, block, channels, samplerate):
+        pcm = (np.clip(block, -1.0, 1.0) * 32767).astype('<i2')
+        with self._lock:
+            if self.writer is None:
+                self.writer = wave.open(self.path, 'wb')
+                self.writer.setnchannels(channels)
+                self.writer.setsampwidth(2)
+                self.writer.setframerate(samplerate)
+            self.writer.writeframes(pcm.tobytes())
+
+    def close(self):
+        with self._lock:
+            if self.writer:
+                self.writer.close()
+                self.writer = None
+
+
+def stream_factory_for(sink):
+    """stream_factory for an audio sink name: 'device' (sounddevice), 'null', or a .wav path"""
+    if sink in (None, 'device'):
+        return None
+    if sink == 'null':
+        return NullOutputStream
+    if sink.endswith('.wav'):
+        return WaveFileSink(sink)
+    raise ValueError(f"Unknown audio sink '{sink}'. Use device, null or a .wav path")
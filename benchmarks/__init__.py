@@ -0,0 +1,4 @@
+"""Headless benchmarks for EchoNav. Run from the repository root, e.g.
+
+    python -m benchmarks.bench_tone_generator
+"""
@@ -0,0 +1,57 @@
+"""Adaptive audio block size under changing host load.
+
+Plays a VoicePool of --voices voices in low-latency mode on the null audio
+sink, which flags an underrun whenever a block is not ready within its
+duration. The sink adds --load ms of simulated host work to every callback
+during the middle third of the run. Prints, once a second, the block size
+the controller chose, the callback load and the underruns so far: the block
+size should back off while the host is loaded and come down again after.
+"""
+import argparse
+import functools
+import time
+
+from audio_latency import BlockSizeController
+from audio_sink import NullOutputStream
+from voice_mixer import VoicePool
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--voices', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=30.0)
+    parser.add_argument('--load', type=float, default=8.0, help='simulated host work per callback while loaded, ms')
+    parser.add_argument('--tighten-after', type=float, default=3.0, help='quiet seconds before trying a smaller block')
+    args = parser.parse_args()
+
+    start = time.monotonic()
+    loaded = (args.seconds / 3, 2 * args.seconds / 3)
+
+    def host_load():
+        elapsed = time.monotonic() - start
+        return args.load / 1000 if loaded[0] <= elapsed < loaded[1] else 0.0
+
+    pool = VoicePool(max_voices=args.voices,
+                     stream_factory=functools.partial(NullOutputStream, host_load=host_load))
+    controller = pool.enable_low_latency(
+        BlockSizeController(initial=128, tighten_after=args.tighten_after, hold=2.0), check_interval=0.25)
+    for i in range(args.voices):
+        pool.allocate(220.0 * (1 + i / 4), amplitude=0.2, pan=(i % 5) / 2 - 1, timbre=(i % 4) * 0.4)
+
+    print(f"{'t s':>5} {'host':>7} {'block':>6} {'block ms':>9} {'load %':>7} {'underruns':>10}")
+    pool.start()
+    try:
+        for second in range(1, int(args.seconds) + 1):
+            time.sleep(max(0.0, start + second - time.monotonic()))
+            state = 'loaded' if loaded[0] <= second - 0.5 < loaded[1] else 'idle'
+            load = controller.load
+            print(f"{second:>5} {state:>7} {pool.blocksize:>6} {controller.block_duration * 1000:>9.1f} "
+                  f"{(load or 0) * 100:>7.1f} {controller.underruns:>10}")
+    finally:
+        pool.stop()
+    print(f"{pool.reconfigurations} block size changes, {controller.underruns} underruns "
+          f"in {controller.blocks} blocks")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Discovery cost per advertisement with thousands of advertisers in range.
+
+Feeds advertisements from --devices simulated advertisers (random order,
+duplicates allowed as with AllowDuplicatesKey) into the old dedup (a linear
+`peripheral in devices.values()` scan) and into DeviceRegistry, and reports
+the time per advertisement, the registry's memory per device and the cost
+of an expire() sweep.
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from device_registry import DeviceRegistry
+from simulated_backend import SimulatedPeripheral
+
+
+def old_dedup(peripherals, order):
+    devices = {}
+    counter = 0
+    start = time.perf_counter()
+    for i in order:
+        peripheral = peripherals[i]
+        if peripheral in devices.values():
+            continue
+        counter += 1
+        devices[counter] = peripheral
+    return (time.perf_counter() - start) / len(order)
+
+
+def registry_dedup(peripherals, identifiers, order, rssi):
+    registry = DeviceRegistry()
+    observe = registry.observe
+    start = time.perf_counter()
+    for n, i in enumerate(order):
+        observe(identifiers[i], peripherals[i], rssi[n], None, n * 1e-4)
+    return (time.perf_counter() - start) / len(order), registry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--devices', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--advertisements', type=int, default=200000)
+    parser.add_argument('--old-advertisements', type=int, default=5000,
+                        help='advertisements for the linear scan (it is slow)')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'devices':>8} {'old ns/adv':>11} {'registry ns/adv':>16} {'bytes/device':>13} {'expire ms':>10}")
+    for count in args.devices:
+        peripherals = [SimulatedPeripheral(f"SIM-{i:06d}", f"Beacon {i}") for i in range(count)]
+        identifiers = [str(p.identifier()) for p in peripherals]
+        # Every device advertised once first, as after the first second of a scan
+        warm = list(range(count))
+        order = [rng.randrange(count) for _ in range(args.advertisements)]
+        rssi = [rng.randint(-100, -40) for _ in range(args.advertisements)]
+
+        old = old_dedup(peripherals, warm + order[:args.old_advertisements])
+
+        tracemalloc.start()
+        _, registry = registry_dedup(peripherals, identifiers, warm, rssi)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        per_ad, _ = registry_dedup(peripherals, identifiers, warm + order, rssi + rssi[:count])
+
+        start = time.perf_counter()
+        registry.expire(now=registry.max_age + 1.0)  # Nothing stale: a full sweep that keeps everything
+        sweep = time.perf_counter() - start
+        print(f"{count:>8} {old * 1e9:>11.0f} {per_ad * 1e9:>16.0f} {size / count:>13.0f} {sweep * 1000:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
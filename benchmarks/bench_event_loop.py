@@ -0,0 +1,168 @@
+"""Threads and wakeups of the BLE tracking layer: the thread-per-task layout
+(readings handled inline on the radio thread, stats and connection monitor
+on their own polling threads) against the asyncio pipeline in
+BluetoothDelegate.
+
+The asyncio pipeline runs twice: handing every reading to the loop as it
+arrives (batch interval 0) and with readings batched for up to
+--batch-interval seconds. All track --beacons simulated devices in real
+time for --duration seconds with a null audio sink. Wakeups are context switches summed over the
+process's threads, read from /proc (Linux only), so they include the radio
+and audio threads that both layouts share.
+"""
+import argparse
+import contextlib
+import functools
+import io
+import os
+import threading
+import time
+
+from audio_sink import NullOutputStream
+from bluetooth_nav import BluetoothDelegate
+from frequency_map import FrequencyMap
+from rssi_filters import make_filter
+from rssi_scheduler import RSSIReadScheduler
+from simulated_backend import SimulatedRadioBackend, demo_scene
+from voice_mixer import VoicePool
+
+
+class ThreadedTracker:
+    """The pre-asyncio layout: inline callbacks plus sleeping stats/monitor threads"""
+    def __init__(self, backend, voice_pool):
+        self.backend = backend
+        self.voice_pool = voice_pool
+        self.frequency_map = FrequencyMap()
+        self.voices = {}
+        self.filters = {}
+        self.schedulers = {}
+        self.running = True
+        self.is_connected = False
+        self.last_successful_read_time = backend.clock()
+        self.rssi_updates_count = 0
+        backend.set_listener(self)
+
+    def track(self, peripheral, index):
+        self.voices[peripheral] = self.voice_pool.allocate(pan=index / 10 - 1)
+        self.filters[peripheral] = make_filter('moving_average', window=3)
+        self.schedulers[peripheral] = RSSIReadScheduler(
+            functools.partial(self.backend.read_rssi, peripheral),
+            clock=self.backend.clock, call_later=self.backend.call_later)
+        self.backend.connect(peripheral)
+
+    def centralManagerDidUpdateState_(self, central):
+        pass
+
+    def centralManager_didDiscoverPeripheral_advertisementData_RSSI_(self, central, peripheral, data, rssi):
+        pass
+
+    def centralManager_didConnectPeripheral_(self, central, peripheral):
+        self.is_connected = True
+        self.voice_pool.start()
+        self.schedulers[peripheral].start()
+        if not hasattr(self, 'threads'):
+            self.threads = [threading.Thread(target=self.stats_loop, daemon=True),
+                            threading.Thread(target=self.monitor_loop, daemon=True)]
+            for thread in self.threads:
+                thread.start()
+
+    def centralManager_didDisconnectPeripheral_error_(self, central, peripheral, error):
+        self.schedulers[peripheral].stop()
+        central.connect(peripheral)
+
+    def peripheral_didReadRSSI_error_(self, peripheral, rssi, error):
+        self.schedulers[peripheral].on_read_complete(error)
+        self.last_successful_read_time = self.backend.clock()
+        if error:
+            return
+        smoothed = self.filters[peripheral].update(rssi)
+        self.rssi_updates_count += 1
+        self.voices[peripheral].set_frequency(self.frequency_map(smoothed))
+
+    def stats_loop(self):
+        while self.running:
+            time.sleep(1.0)
+            for scheduler in list(self.schedulers.values()):
+                scheduler.tick()
+
+    def monitor_loop(self):
+        while self.running:
+            time.sleep(0.5)
+            if self.is_connected and self.backend.clock() - self.last_successful_read_time > 5.0:
+                self.is_connected = False
+
+    def stop(self):
+        self.running = False
+        for scheduler in self.schedulers.values():
+            scheduler.stop()
+        self.voice_pool.stop()
+
+
+def context_switches():
+    """Voluntary + involuntary context switches summed over this process's live threads"""
+    total = 0
+    task_dir = f'/proc/{os.getpid()}/task'
+    for tid in os.listdir(task_dir):
+        try:
+            with open(f'{task_dir}/{tid}/status') as status:
+                for line in status:
+                    if 'ctxt_switches' in line:
+                        total += int(line.split()[-1])
+        except FileNotFoundError:
+            pass  # Thread exited while we were reading
+    return total
+
+
+def run(layout, beacons, duration, batch_interval=0.01, seed=0):
+    peripherals, access_points = demo_scene(seed, peripherals=beacons)
+    backend = SimulatedRadioBackend(peripherals=peripherals, access_points=access_points,
+                                    seed=seed, realtime=True)
+    voice_pool = VoicePool(stream_factory=NullOutputStream)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if layout == 'threads':
+            tracker = ThreadedTracker(backend, voice_pool)
+            for index, peripheral in enumerate(peripherals):
+                tracker.track(peripheral, index)
+        else:
+            tracker = BluetoothDelegate(backend, voice_pool, batch_interval=batch_interval)
+            tracker.loop_thread.call_wait(tracker.connect_devices, peripherals)
+
+        # Let connections settle before measuring
+        backend.run(duration=1.0)
+        start_switches = context_switches()
+        start_count = tracker.rssi_updates_count
+        backend.run(duration=duration)
+        switches = context_switches() - start_switches
+        threads = threading.active_count()
+        tracker.stop()
+
+    return {
+        'threads': threads,
+        'wakeups_per_second': switches / duration,
+        'readings_per_second': (tracker.rssi_updates_count - start_count) / duration,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--beacons', type=int, default=3)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--batch-interval', type=float, default=0.01,
+                        help='how long the asyncio pipeline lets readings collect under load')
+    args = parser.parse_args()
+
+    if not os.path.isdir('/proc/self/task'):
+        print("Context switches are read from /proc; run this on Linux")
+        return
+
+    layouts = [('threads', 'threads', 0.0),
+               ('asyncio, per reading', 'asyncio', 0.0),
+               (f'asyncio, {args.batch_interval * 1000:g} ms batches', 'asyncio', args.batch_interval)]
+    print(f"{'layout':<26} {'threads':>8} {'wakeups/s':>10} {'readings/s':>11}")
+    for label, layout, batch_interval in layouts:
+        r = run(layout, args.beacons, args.duration, batch_interval)
+        print(f"{label:<26} {r['threads']:>8} {r['wakeups_per_second']:>10.0f} {r['readings_per_second']:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
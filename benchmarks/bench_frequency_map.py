@@ -0,0 +1,62 @@
+"""Cost of RSSI -> frequency mapping: the original per-call math against the
+compiled lookup table, per value and vectorized over whole arrays.
+"""
+import argparse
+import math
+import random
+import time
+
+import numpy as np
+
+from frequency_map import CURVES, FrequencyMap
+
+
+def legacy_frequency(rssi, min_rssi=-100, max_rssi=-40, min_freq=110, max_freq=1760,
+                     frequency_curve='logarithmic', frequency_curve_factor=2.0):
+    """The original BluetoothDelegate.calculate_frequency"""
+    clamped_rssi = max(min(rssi, max_rssi), min_rssi)
+    normalized = (clamped_rssi - min_rssi) / (max_rssi - min_rssi)
+    if frequency_curve == 'logarithmic':
+        adjusted = math.log(normalized * (frequency_curve_factor - 1) + 1) / math.log(frequency_curve_factor)
+    elif frequency_curve == 'exponential':
+        adjusted = math.pow(normalized, frequency_curve_factor)
+    else:
+        adjusted = normalized
+    freq_ratio = max_freq / min_freq
+    return min_freq * math.pow(freq_ratio, adjusted)
+
+
+def per_call_ns(fn, values):
+    start = time.perf_counter()
+    for value in values:
+        fn(value)
+    return (time.perf_counter() - start) / len(values) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--samples', type=int, default=200000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    # Smoothed readings are arbitrary floats, raw ones whole dBm
+    values = [rng.uniform(-105, -35) for _ in range(args.samples)]
+    array = np.array(values)
+
+    print(f"{'curve':<12} {'legacy ns':>10} {'table ns':>9} {'array ns/value':>15} {'max err Hz':>11}")
+    print("-" * 61)
+    for curve in CURVES:
+        frequency_map = FrequencyMap(curve=curve)
+        legacy = per_call_ns(lambda v: legacy_frequency(v, frequency_curve=curve), values)
+        table = per_call_ns(frequency_map, values)
+
+        start = time.perf_counter()
+        mapped = frequency_map.map_array(array)
+        vectorized = (time.perf_counter() - start) / len(values) * 1e9
+
+        error = max(abs(m - legacy_frequency(v, frequency_curve=curve)) for v, m in zip(values, mapped))
+        print(f"{curve:<12} {legacy:>10.0f} {table:>9.0f} {vectorized:>15.1f} {error:>11.3f}")
+
+
+if __name__ == '__main__':
+    main()
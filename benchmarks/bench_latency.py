@@ -0,0 +1,65 @@
+"""End-to-end latency from readRSSI() to the speaker, per pipeline setting.
+
+Runs BluetoothDelegate on the simulated radio backend in real time (audio
+latency only means something against the wall clock) with a null audio sink
+that calls back at the real block rate and reports one block of output
+latency. For each audio block size and loop batch interval, prints p50 /
+p99 / p99.9 of the time from a read's request until its frequency reaches
+each pipeline stage, so the block size and batching can be tuned against a
+latency budget.
+"""
+import argparse
+import contextlib
+import functools
+import io
+
+from audio_sink import NullOutputStream
+from bluetooth_nav import BluetoothDelegate
+from latency import QUANTILES
+from metrics import Registry
+from simulated_backend import SimulatedPeripheral, SimulatedRadioBackend, SyntheticTrace
+from voice_mixer import VoicePool
+
+
+def run(blocksize, batch_interval, duration, beacons, read_latency, seed=0):
+    peripherals = [SimulatedPeripheral(f'SIM-LAT-{i}', f'Latency beacon {i}', SyntheticTrace(period=5.0 + i))
+                   for i in range(beacons)]
+    backend = SimulatedRadioBackend(peripherals=peripherals, access_points=[], seed=seed, realtime=True,
+                                    read_latency=read_latency, jitter=read_latency / 4)
+    voice_pool = VoicePool(stream_factory=functools.partial(NullOutputStream, blocksize=blocksize))
+    delegate = BluetoothDelegate(backend, voice_pool, batch_interval=batch_interval)
+    tracer = delegate.enable_latency_tracing(Registry())  # Fresh histograms for every setting
+    for peripheral in peripherals:
+        delegate.loop_thread.call_wait(delegate.track_peripheral, peripheral)
+        backend.connect(peripheral)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        backend.run(duration=duration)
+        delegate.stop()
+    return tracer.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--blocksizes', type=int, nargs='+', default=[256, 512, 1024])
+    parser.add_argument('--batch-intervals', type=float, nargs='+', default=[0.0, 0.01],
+                        help='LoopBridge batch intervals in seconds')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per setting')
+    parser.add_argument('--beacons', type=int, default=2)
+    parser.add_argument('--read-latency', type=float, default=0.015, help='simulated readRSSI() round trip')
+    args = parser.parse_args()
+
+    labels = '/'.join(f"p{q * 100:g}" for q in QUANTILES)
+    print(f"{'block':>6} {'batch ms':>9} {'stage':<9} {'count':>7}  {labels + ' ms':>24}")
+    print("-" * 62)
+    for blocksize in args.blocksizes:
+        for batch_interval in args.batch_intervals:
+            summary = run(blocksize, batch_interval, args.duration, args.beacons, args.read_latency)
+            for stage, (count, *quantiles) in summary.items():
+                cells = ' / '.join(f"{q * 1000:.1f}" if q is not None else '-' for q in quantiles)
+                print(f"{blocksize:>6} {batch_interval * 1000:>9.0f} {stage:<9} {count:>7}  {cells:>24}")
+            print()
+
+
+if __name__ == '__main__':
+    main()
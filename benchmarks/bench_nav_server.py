@@ -0,0 +1,183 @@
+"""Load-test the headless navigation server: sessions per core and p99 response latency.
+
+Starts nav_server.NavServer on a temporary Unix socket and --clients load
+generator processes. Each opens --connections connections and plays a number
+of sessions over them; every session sends a frame of readings every
+--interval seconds (--rate readings per second per session, a synthetic RSSI
+walk) and the response time of each frame, from writing it to reading its
+tones, is recorded. The session count is doubled from --start until the p99
+response time exceeds --budget or frames go unanswered; the last level that
+kept up, divided by the cores serving it, is the sessions-per-core figure.
+Runs once per --workers setting (0 = a single process, no pool).
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from ble_pipeline import EventLoopThread
+from nav_server import FRAME_HEADER, TONE, NavServer, encode_request, read_frame
+
+
+async def _connection(path, sessions, rate, interval, duration, latencies, counts):
+    """Play `sessions` over one connection; response times go to `latencies`"""
+    reader, writer = await asyncio.open_unix_connection(path)
+    per_frame = max(1, round(rate * interval))
+    rssi = {session: random.uniform(-90, -50) for session in sessions}
+    sent = {}
+    ending = set(sessions)
+
+    async def receive():
+        while ending:
+            frame = await read_frame(reader, TONE)
+            if frame is None:
+                return
+            session, sequence, body = frame
+            if not body:
+                ending.discard(session)  # Session end acknowledged
+                continue
+            started = sent.pop((session, sequence), None)
+            if started is not None:
+                latencies.append(time.perf_counter() - started)
+                counts[1] += 1
+
+    receiver = asyncio.get_running_loop().create_task(receive())
+    await asyncio.sleep(random.uniform(0, interval))  # Spread the connections' ticks
+    start = time.perf_counter()
+    sequence = 0
+    while time.perf_counter() - start < duration:
+        tick = time.perf_counter()
+        sequence += 1
+        frames = []
+        for session in sessions:
+            level = rssi[session] = min(-40.0, max(-100.0, rssi[session] + random.gauss(0, 1.5)))
+            readings = [(tick, int(level + random.gauss(0, 3))) for _ in range(per_frame)]
+            frames.append(encode_request(session, sequence, readings))
+            sent[session, sequence] = tick
+        writer.write(b''.join(frames))
+        counts[0] += len(frames)
+        await writer.drain()
+        await asyncio.sleep(max(0.0, interval - (time.perf_counter() - tick)))
+
+    await asyncio.sleep(min(1.0, interval * 5))  # Let the last answers arrive
+    writer.write(b''.join(FRAME_HEADER.pack(session, sequence + 1, 0) for session in sessions))
+    await writer.drain()
+    try:
+        await asyncio.wait_for(receiver, 5.0)
+    except asyncio.TimeoutError:
+        pass
+    writer.close()
+
+
+def _client(path, first, sessions, stride, connections, rate, interval, duration, results):
+    """Load generator process: sessions first, first + stride, ... over `connections` connections"""
+    ids = [first + i * stride for i in range(sessions)]
+    groups = [ids[i::connections] for i in range(connections) if ids[i::connections]]
+    latencies, counts = [], [0, 0]
+
+    async def main():
+        await asyncio.gather(*(_connection(path, group, rate, interval, duration, latencies, counts)
+                               for group in groups))
+    asyncio.run(main())
+    results.put((latencies, counts))
+
+
+def quantile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def run_level(path, sessions, clients, connections, rate, interval, duration):
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    per_client = [sessions // clients + (i < sessions % clients) for i in range(clients)]
+    processes = [context.Process(target=_client, args=(path, i, count, clients, connections,
+                                                       rate, interval, duration, results))
+                 for i, count in enumerate(per_client) if count]
+    for process in processes:
+        process.start()
+    latencies, sent, answered = [], 0, 0
+    for _ in processes:
+        client_latencies, (client_sent, client_answered) = results.get()
+        latencies += client_latencies
+        sent += client_sent
+        answered += client_answered
+    for process in processes:
+        process.join()
+    latencies.sort()
+    return {
+        'sessions': sessions,
+        'frames_per_second': answered / duration,
+        'answered': answered / sent if sent else 0.0,
+        'p50': quantile(latencies, 0.5),
+        'p99': quantile(latencies, 0.99),
+    }
+
+
+def run(workers, args):
+    path = os.path.join(tempfile.mkdtemp(), 'echonav.sock')
+    server = NavServer(path, workers, filter_kind=args.filter)
+    loop_thread = EventLoopThread('nav-server')
+    loop_thread.start()
+    loop_thread.run(server.start())
+    time.sleep(0.5)  # Workers import their modules
+
+    best = None
+    sessions = args.start
+    try:
+        while sessions <= args.max_sessions:
+            r = run_level(path, sessions, args.clients, args.connections, args.rate, args.interval, args.seconds)
+            kept_up = r['p99'] is not None and r['p99'] <= args.budget and r['answered'] >= 0.999
+            print(f"{workers:>7} {sessions:>8} {r['frames_per_second']:>10.0f} {r['answered'] * 100:>8.1f}% "
+                  f"{r['p50'] * 1000 if r['p50'] is not None else float('nan'):>8.2f} "
+                  f"{r['p99'] * 1000 if r['p99'] is not None else float('nan'):>8.2f}"
+                  f"{'' if kept_up else '  over budget'}")
+            if not kept_up:
+                break
+            best = r
+            sessions *= 2
+    finally:
+        loop_thread.call_wait(server.close)
+        loop_thread.stop()
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, os.cpu_count() or 1],
+                        help='server worker processes to compare (0 = single process)')
+    parser.add_argument('--clients', type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                        help='load generator processes')
+    parser.add_argument('--connections', type=int, default=8, help='connections per load generator')
+    parser.add_argument('--rate', type=float, default=20.0, help='RSSI readings per second per session')
+    parser.add_argument('--interval', type=float, default=0.1, help='seconds between a session\'s frames')
+    parser.add_argument('--seconds', type=float, default=3.0, help='run time per load level')
+    parser.add_argument('--start', type=int, default=50, help='sessions at the first load level')
+    parser.add_argument('--max-sessions', type=int, default=100000)
+    parser.add_argument('--budget', type=float, default=0.05, help='p99 response time that still counts as keeping up')
+    parser.add_argument('--filter', default='moving_average')
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} cores; {args.rate:.0f} readings/s per session in frames every "
+          f"{args.interval * 1000:.0f} ms; p99 budget {args.budget * 1000:.0f} ms\n")
+    print(f"{'workers':>7} {'sessions':>8} {'frames/s':>10} {'answered':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    summary = []
+    for workers in args.workers:
+        best = run(workers, args)
+        summary.append((workers, best))
+    print()
+    for workers, best in summary:
+        cores = max(1, workers)
+        if best is None:
+            print(f"{workers} workers: not even {args.start} sessions within budget")
+        else:
+            print(f"{workers} workers: {best['sessions']} sessions "
+                  f"({best['sessions'] / cores:.0f} per core), p99 {best['p99'] * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Contention benchmark: many producer threads publishing tone parameters while a
+simulated audio thread picks them up once per block.
+
+Compares ParamChannel with the original drain-and-refill Queue handoff and
+reports producer throughput and how long the audio side spends fetching the
+latest value (p50/p99/max).
+"""
+import argparse
+import random
+import threading
+import time
+from queue import Empty, Queue
+
+from param_channel import ParamChannel, ToneParams
+
+
+class QueueHandoff:
+    """The original set_frequency/audio_callback handoff.
+
+    The original calls a blocking get() after empty(), which hangs forever when
+    another thread takes the item in between; get_nowait() keeps the benchmark
+    running while taking the same locks.
+    """
+    def __init__(self):
+        self.queue = Queue()
+        self.value = None
+
+    def publish(self, freq):
+        try:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+        except Empty:
+            pass
+        self.queue.put(freq)
+
+    def consume(self):
+        try:
+            while not self.queue.empty():
+                self.value = self.queue.get_nowait()
+        except Empty:
+            pass
+        return self.value
+
+
+class ChannelHandoff:
+    def __init__(self):
+        self.channel = ParamChannel(ToneParams(440.0, 0.3, 0.0))
+        self.seq = 0
+        self.value = None
+
+    def publish(self, freq):
+        self.channel.publish(frequency=freq)
+
+    def consume(self):
+        seq, params = self.channel.read()
+        if seq != self.seq:
+            self.seq = seq
+            self.value = params.frequency
+        return self.value
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def run(handoff, producers, duration, block_period):
+    stop = threading.Event()
+    published = [0] * producers
+
+    def producer(index):
+        rng = random.Random(index)
+        count = 0
+        while not stop.is_set():
+            handoff.publish(110 + rng.random() * 1650)
+            count += 1
+        published[index] = count
+
+    threads = [threading.Thread(target=producer, args=(i,), daemon=True) for i in range(producers)]
+    for thread in threads:
+        thread.start()
+
+    fetch_times = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter_ns()
+        handoff.consume()
+        fetch_times.append(time.perf_counter_ns() - start)
+        time.sleep(block_period)
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    fetch_times.sort()
+    return {
+        'publishes_per_second': sum(published) / duration,
+        'p50_us': percentile(fetch_times, 0.50) / 1000,
+        'p99_us': percentile(fetch_times, 0.99) / 1000,
+        'max_us': fetch_times[-1] / 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--producers', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--duration', type=float, default=2.0)
+    parser.add_argument('--block-period', type=float, default=0.001,
+                        help='seconds between simulated audio callbacks')
+    args = parser.parse_args()
+
+    print(f"{'handoff':<9} {'threads':>7} {'publish/s':>11} {'p50 us':>8} {'p99 us':>8} {'max us':>9}")
+    print("-" * 57)
+    for producers in args.producers:
+        for name, cls in (('queue', QueueHandoff), ('channel', ChannelHandoff)):
+            r = run(cls(), producers, args.duration, args.block_period)
+            print(f"{name:<9} {producers:>7} {r['publishes_per_second']:>11.0f} "
+                  f"{r['p50_us']:>8.1f} {r['p99_us']:>8.1f} {r['max_us']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
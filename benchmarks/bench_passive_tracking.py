@@ -0,0 +1,83 @@
+"""RSSI rate and gaps per beacon: connected readRSSI() tracking vs. passive advertisements.
+
+Runs BluetoothDelegate on the simulated backend in virtual time with
+--beacons devices advertising at --advertising-rate Hz. Connected mode
+reads RSSI over a link per device (one read per --connection-interval) and
+links drop at --disconnect-rate per second; passive mode connects to
+nothing and feeds the advertisements to the pipeline. Reports readings per
+second per beacon, the longest gap between two readings of a beacon, and
+the pipeline's throughput in wall-clock time.
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from audio_sink import NullOutputStream
+from bluetooth_nav import BluetoothDelegate
+from simulated_backend import SimulatedPeripheral, SimulatedRadioBackend, SyntheticTrace
+from voice_mixer import VoicePool
+
+
+def run(passive, beacons, duration, advertising_rate, connection_interval, disconnect_rate, seed=0):
+    peripherals = [SimulatedPeripheral(f'SIM-BEACON-{i}', f'Beacon {i}', SyntheticTrace(period=5.0 + i),
+                                       advertising_rate=advertising_rate)
+                   for i in range(beacons)]
+    backend = SimulatedRadioBackend(
+        peripherals=peripherals, access_points=[], seed=seed, realtime=False,
+        connection_interval=connection_interval, disconnect_rate=disconnect_rate,
+    )
+    voice_pool = VoicePool(max_voices=max(64, beacons), stream_factory=NullOutputStream)
+    delegate = BluetoothDelegate(backend, voice_pool, passive=passive)
+
+    # Note when every good reading of a tracked device reaches the bridge
+    heard = {peripheral: [] for peripheral in peripherals}
+    push = delegate.bridge._push
+
+    def recording_push(event):
+        if not event.error and event.peripheral in heard:
+            heard[event.peripheral].append(event.time)
+        push(event)
+    delegate.bridge._push = recording_push
+
+    reconnects = delegate.reconnects.value  # The counter is process-wide
+    with contextlib.redirect_stdout(io.StringIO()):
+        delegate.loop_thread.call_wait(delegate.connect_devices, peripherals)
+        # Scan from the start: in virtual time the run would end before the delegate's power-on handler did
+        backend.start_discovery()
+        start = time.perf_counter()
+        backend.run(duration=duration)
+        wall = time.perf_counter() - start
+        delegate.stop()
+
+    readings = sum(len(times) for times in heard.values())
+    gaps = [max(b - a for a, b in zip([0.0] + times, times + [duration])) for times in heard.values()]
+    return {
+        'hz_per_beacon': readings / duration / beacons,
+        'max_gap': max(gaps),
+        'events_per_wall_second': delegate.rssi_updates_count / wall,
+        'reconnects': delegate.reconnects.value - reconnects,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--beacons', type=int, nargs='+', default=[1, 8, 64])
+    parser.add_argument('--duration', type=float, default=30.0, help='simulated seconds')
+    parser.add_argument('--advertising-rate', type=float, default=20.0, help='advertisements per second per beacon')
+    parser.add_argument('--connection-interval', type=float, default=0.03, help='seconds per connection event')
+    parser.add_argument('--disconnect-rate', type=float, default=0.02, help='link drops per second per device')
+    args = parser.parse_args()
+
+    print(f"{'beacons':>7} {'mode':>9} {'Hz/beacon':>10} {'max gap s':>10} {'events/s wall':>14} {'reconnects':>11}")
+    for beacons in args.beacons:
+        for passive in (False, True):
+            r = run(passive, beacons, args.duration, args.advertising_rate,
+                    args.connection_interval, args.disconnect_rate)
+            mode = 'passive' if passive else 'connected'
+            print(f"{beacons:>7} {mode:>9} {r['hz_per_beacon']:>10.1f} {r['max_gap']:>10.2f} "
+                  f"{r['events_per_wall_second']:>14.0f} {r['reconnects']:>11}")
+
+
+if __name__ == '__main__':
+    main()
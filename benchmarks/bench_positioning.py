@@ -0,0 +1,92 @@
+"""Update latency and accuracy of the position engine on simulated floor plans.
+
+Anchors sit on a jittered grid (--spacing metres apart) over a square floor
+sized for the anchor count; a listener walks a random route across it at
+walking pace. Every update step, each anchor within radio range (RSSI above
+--sensitivity) reports one reading with --noise dB of shadowing noise, then
+the engine updates. Reports the engine's update time and the position error
+against the true route.
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from positioning import PathLossModel, PositionEngine
+from simulated_backend import Route
+
+
+def floor_plan(anchor_count, spacing, rng):
+    """Anchor positions on a jittered grid, and a random walk over the floor"""
+    side = max(1, math.ceil(math.sqrt(anchor_count)))
+    cells = rng.permutation(side * side)[:anchor_count]
+    xy = np.stack([cells % side, cells // side], axis=1) * spacing
+    xy = xy + rng.uniform(-spacing / 4, spacing / 4, xy.shape)
+    anchors = {f"ANCHOR-{i:04d}": (float(x), float(y)) for i, (x, y) in enumerate(xy)}
+    size = (side - 1) * spacing
+    route = Route(rng.uniform(0, size, (8, 2)), speed=1.2)
+    return anchors, route
+
+
+def run(anchor_count, method, steps, rate, spacing, noise, sensitivity, seed=0):
+    rng = np.random.default_rng(seed)
+    anchors, route = floor_plan(anchor_count, spacing, rng)
+    model = PathLossModel()
+    engine = PositionEngine(anchors, model=model, method=method, update_rate=rate, seed=seed)
+    keys = engine.keys
+    xy = engine.anchors
+
+    latencies = []
+    errors = []
+    heard = 0
+    for step in range(steps):
+        now = step / rate
+        x, y = route.position_at(now)
+        rssi = model.rssi(np.hypot(xy[:, 0] - x, xy[:, 1] - y)) + rng.normal(0, noise, len(keys))
+        in_range = np.flatnonzero(rssi > sensitivity)
+        heard += len(in_range)
+        for i in in_range:
+            engine.observe(keys[i], rssi[i], now)
+
+        start = time.perf_counter()
+        position = engine.update(now)
+        latencies.append(time.perf_counter() - start)
+        if position is not None and step >= rate * 2:  # Skip the first seconds while the filter converges
+            errors.append(math.hypot(position[0] - x, position[1] - y))
+
+    latencies = np.array(latencies) * 1e6
+    errors = np.array(errors) if errors else np.array([np.nan])
+    return {
+        'heard': heard / steps,
+        'p50_us': np.percentile(latencies, 50),
+        'p99_us': np.percentile(latencies, 99),
+        'mean_error': errors.mean(),
+        'p90_error': np.percentile(errors, 90),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--anchors', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--methods', nargs='+', default=['least_squares', 'particle'])
+    parser.add_argument('--seconds', type=float, default=60.0, help='simulated walking time')
+    parser.add_argument('--rate', type=float, default=10.0, help='position updates per second')
+    parser.add_argument('--spacing', type=float, default=8.0, help='metres between anchors')
+    parser.add_argument('--noise', type=float, default=4.0, help='RSSI noise std-dev in dB')
+    parser.add_argument('--sensitivity', type=float, default=-95.0, help='weakest RSSI heard')
+    args = parser.parse_args()
+
+    steps = int(args.seconds * args.rate)
+    print(f"{'anchors':>7} {'method':<14} {'heard':>6} {'p50 us':>8} {'p99 us':>8} "
+          f"{'mean err m':>11} {'p90 err m':>10}")
+    print("-" * 70)
+    for anchor_count in args.anchors:
+        for method in args.methods:
+            r = run(anchor_count, method, steps, args.rate, args.spacing, args.noise, args.sensitivity)
+            print(f"{anchor_count:>7} {method:<14} {r['heard']:>6.1f} {r['p50_us']:>8.0f} {r['p99_us']:>8.0f} "
+                  f"{r['mean_error']:>11.2f} {r['p90_error']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
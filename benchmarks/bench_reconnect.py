@@ -0,0 +1,108 @@
+"""Time to recovery and feedback gaps under simulated disconnect storms.
+
+Runs BluetoothDelegate on the realtime simulated backend (the links' timers
+run on the event loop, so virtual time would not do) with --beacons
+connected devices whose links drop at --disconnect-rate per second, stay
+unreachable for --outage seconds on average after a drop, and go silent
+without a disconnect event at --stall-rate per second. Three policies:
+
+  fixed      retries every 2 s and a 5 s silence check followed by a 1 s
+             cancel/reconnect pause, like the old polling monitor
+  backoff    connection_state.Link defaults: immediate reconnect, jittered
+             exponential backoff, 1 s stall deadline
+  fallback   backoff, plus advertisement RSSI while a link is down
+
+Reports link recovery time (loss -> connected again) and the gaps in
+feedback: the longest stretch without a reading for any device, and the
+share of time devices spent more than 0.25 s from their last reading.
+"""
+import argparse
+import contextlib
+import io
+
+from audio_sink import NullOutputStream
+from bluetooth_nav import BluetoothDelegate
+from connection_state import Backoff
+from simulated_backend import SimulatedPeripheral, SimulatedRadioBackend, SyntheticTrace
+from voice_mixer import VoicePool
+
+GAP = 0.25  # Seconds without a reading that count as lost feedback
+
+
+def run(policy, beacons, duration, disconnect_rate, outage, stall_rate, seed=0):
+    peripherals = [SimulatedPeripheral(f'SIM-STORM-{i}', f'Beacon {i}', SyntheticTrace(period=5.0 + i),
+                                       advertising_rate=10.0)
+                   for i in range(beacons)]
+    backend = SimulatedRadioBackend(
+        peripherals=peripherals, access_points=[], seed=seed, realtime=True, connection_interval=0.03,
+        disconnect_rate=disconnect_rate, outage=outage, stall_rate=stall_rate,
+    )
+    voice_pool = VoicePool(max_voices=max(64, beacons), stream_factory=NullOutputStream)
+    delegate = BluetoothDelegate(backend, voice_pool)
+    delegate.advertisement_fallback = policy == 'fallback'
+    if policy == 'fixed':
+        delegate.stall_timeout = 5.0
+
+    heard = {peripheral: [] for peripheral in peripherals}
+    push = delegate.bridge._push
+
+    def recording_push(event):
+        if not event.error and event.peripheral in heard:
+            heard[event.peripheral].append(event.time)
+        push(event)
+    delegate.bridge._push = recording_push
+
+    recovery = delegate.recovery_time
+    before = recovery.snapshot()[0]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for peripheral in peripherals:
+            delegate.loop_thread.call_wait(delegate.track_peripheral, peripheral)
+            if policy == 'fixed':
+                delegate.links[peripheral].backoff = Backoff(initial=1.0, multiplier=1.0, jitter=0.0)
+        delegate.loop_thread.call_wait(delegate.connect_devices, peripherals)
+        start = backend.clock()
+        backend.run(duration=duration)
+        end = backend.clock()
+        links = list(delegate.links.values())
+        delegate.stop()
+
+    counts = [n - m for n, m in zip(recovery.snapshot()[0], before)]
+    longest, lost = 0.0, 0.0
+    for times in heard.values():
+        stamps = [start] + [t for t in times if t >= start] + [end]
+        for a, b in zip(stamps, stamps[1:]):
+            longest = max(longest, b - a)
+            if b - a > GAP:
+                lost += b - a - GAP
+    return {
+        'outages': sum(link.outages for link in links),
+        'stalls': sum(link.stalls for link in links),
+        'recovery_p50': recovery.quantile(0.5, counts),
+        'recovery_p99': recovery.quantile(0.99, counts),
+        'longest_gap': longest,
+        'lost_share': lost / ((end - start) * beacons),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--beacons', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=20.0, help='run time per policy')
+    parser.add_argument('--disconnect-rate', type=float, default=0.2, help='link drops per second per device')
+    parser.add_argument('--outage', type=float, default=0.5, help='mean seconds unreachable after a drop')
+    parser.add_argument('--stall-rate', type=float, default=0.05, help='silent link stalls per second per device')
+    parser.add_argument('--policies', nargs='+', default=['fixed', 'backoff', 'fallback'])
+    args = parser.parse_args()
+
+    print(f"{'policy':>8} {'outages':>8} {'stalls':>7} {'recovery p50':>13} {'recovery p99':>13} "
+          f"{'longest gap':>12} {'feedback lost':>14}")
+    for policy in args.policies:
+        r = run(policy, args.beacons, args.seconds, args.disconnect_rate, args.outage, args.stall_rate)
+        p50 = f"{r['recovery_p50']:.2f} s" if r['recovery_p50'] is not None else '-'
+        p99 = f"{r['recovery_p99']:.2f} s" if r['recovery_p99'] is not None else '-'
+        print(f"{policy:>8} {r['outages']:>8} {r['stalls']:>7} {p50:>13} {p99:>13} "
+              f"{r['longest_gap']:>10.2f} s {r['lost_share'] * 100:>13.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Per-update cost of the streaming RSSI filters against the original list-based
+smoothing, for growing window lengths.
+
+Also times update-rate tracking: RateMeter against the original timestamp
+list trimmed with pop(0).
+"""
+import argparse
+import random
+import time
+
+from rssi_filters import FILTERS, RateMeter, make_filter
+
+
+class LegacyListAverage:
+    """The original rssi_history smoothing: append, pop(0), sum()"""
+    def __init__(self, window=3):
+        self.window = window
+        self.history = []
+
+    def update(self, sample):
+        self.history.append(sample)
+        if len(self.history) > self.window:
+            self.history.pop(0)
+        return sum(self.history) / len(self.history)
+
+
+def time_updates(rssi_filter, samples):
+    update = rssi_filter.update
+    start = time.perf_counter()
+    for sample in samples:
+        update(sample)
+    return (time.perf_counter() - start) / len(samples)
+
+
+def time_rate_tracking(rate, seconds):
+    """Cost per event of tracking updates/s at `rate` events per second"""
+    events = int(rate * seconds)
+    times = [i / rate for i in range(events)]
+
+    update_times = []
+    start = time.perf_counter()
+    for now in times:
+        update_times.append(now)
+        while update_times and update_times[0] < now - 1.0:
+            update_times.pop(0)
+    legacy = (time.perf_counter() - start) / events
+
+    meter = RateMeter()
+    start = time.perf_counter()
+    for now in times:
+        meter.mark(now)
+    streaming = (time.perf_counter() - start) / events
+    return legacy, streaming
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--samples', type=int, default=200000)
+    parser.add_argument('--windows', type=int, nargs='+', default=[3, 30, 300, 1000])
+    parser.add_argument('--rates', type=int, nargs='+', default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    samples = [rng.randint(-95, -45) for _ in range(args.samples)]
+
+    print(f"{'filter':<16} " + " ".join(f"{'w=' + str(w):>9}" for w in args.windows) + "   (ns/update)")
+    print("-" * (17 + 10 * len(args.windows)))
+    for name in ['legacy_list'] + list(FILTERS):
+        cells = []
+        for window in args.windows:
+            if name == 'legacy_list':
+                rssi_filter = LegacyListAverage(window)
+            elif name in ('moving_average', 'median'):
+                rssi_filter = make_filter(name, window=window)
+            else:
+                rssi_filter = make_filter(name)  # No window: cost is flat by construction
+            cells.append(f"{time_updates(rssi_filter, samples) * 1e9:>9.0f}")
+        print(f"{name:<16} " + " ".join(cells))
+
+    print()
+    print(f"{'updates/s':>10} {'list ns/event':>14} {'RateMeter ns/event':>19}")
+    for rate in args.rates:
+        legacy, streaming = time_rate_tracking(rate, seconds=5)
+        print(f"{rate:>10} {legacy * 1e9:>14.0f} {streaming * 1e9:>19.0f}")
+
+
+if __name__ == '__main__':
+    main()
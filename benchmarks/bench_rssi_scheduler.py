@@ -0,0 +1,139 @@
+"""Compare the event-driven RSSI scheduler with the original 10 spinning scan
+threads against a simulated BLE peripheral.
+
+The simulated link answers at most one RSSI read per connection event, like a
+real GATT connection: extra requests just queue up. Reports achieved update
+rate, read latency, queue depth and process CPU usage.
+"""
+import argparse
+import random
+import threading
+import time
+from collections import deque
+
+from rssi_scheduler import RSSIReadScheduler
+
+
+class SimulatedPeripheral:
+    """Serves queued readRSSI() requests one per connection interval"""
+    def __init__(self, interval=0.0075, loss=0.0, seed=0):
+        self.interval = interval
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.requests = deque()
+        self.on_rssi = None          # Called as on_rssi(rssi, error) from the radio thread
+        self.running = False
+        self.max_queue = 0
+
+    def readRSSI(self):
+        self.requests.append(time.monotonic())
+        if len(self.requests) > self.max_queue:
+            self.max_queue = len(self.requests)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._radio_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+
+    def _radio_loop(self):
+        next_event = time.monotonic()
+        while self.running:
+            next_event += self.interval
+            time.sleep(max(0.0, next_event - time.monotonic()))
+            if not self.requests:
+                continue
+            self.requests.popleft()
+            if self.rng.random() < self.loss:
+                continue  # Request vanished; the scheduler writes it off
+            self.on_rssi(-60 + self.rng.randint(-5, 5), None)
+
+
+def run_scheduler(args):
+    peripheral = SimulatedPeripheral(args.interval, args.loss)
+    scheduler = RSSIReadScheduler(peripheral.readRSSI, max_in_flight=args.max_in_flight)
+    latencies = []
+
+    def on_rssi(rssi, error):
+        scheduler.on_read_complete(error)
+        latencies.append(scheduler.latency)
+
+    peripheral.on_rssi = on_rssi
+    peripheral.start()
+    scheduler.start()
+    cpu0, wall0 = time.process_time(), time.monotonic()
+    deadline = wall0 + args.duration
+    while time.monotonic() < deadline:
+        time.sleep(0.25)
+        scheduler.tick()
+    cpu, wall = time.process_time() - cpu0, time.monotonic() - wall0
+    scheduler.stop()
+    peripheral.stop()
+    return {
+        'hz': scheduler.completed / wall,
+        'latency_ms': (scheduler.latency or 0) * 1000,
+        'max_queue': peripheral.max_queue,
+        'cpu_percent': cpu / wall * 100,
+        'threads': 1,  # The stall watchdog; reads are issued from the callback
+    }
+
+
+def run_legacy(args, thread_count=10):
+    peripheral = SimulatedPeripheral(args.interval, args.loss)
+    completed = [0]
+
+    def on_rssi(rssi, error):
+        completed[0] += 1
+
+    peripheral.on_rssi = on_rssi
+    peripheral.start()
+    running = [True]
+
+    def scan_loop():
+        while running[0]:
+            peripheral.readRSSI()
+            time.sleep(0.00005)
+
+    threads = [threading.Thread(target=scan_loop, daemon=True) for _ in range(thread_count)]
+    cpu0, wall0 = time.process_time(), time.monotonic()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    cpu, wall = time.process_time() - cpu0, time.monotonic() - wall0
+    running[0] = False
+    for thread in threads:
+        thread.join()
+    peripheral.stop()
+    # With the queue always growing, a new read waits behind every queued one
+    backlog = len(peripheral.requests)
+    return {
+        'hz': completed[0] / wall,
+        'latency_ms': backlog * args.interval * 1000,
+        'max_queue': peripheral.max_queue,
+        'cpu_percent': cpu / wall * 100,
+        'threads': thread_count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--duration', type=float, default=3.0)
+    parser.add_argument('--interval', type=float, default=0.0075,
+                        help='simulated connection interval in seconds')
+    parser.add_argument('--loss', type=float, default=0.01)
+    parser.add_argument('--max-in-flight', type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10} {'threads':>7} {'Hz':>8} {'latency ms':>11} {'max queue':>10} {'CPU %':>7}")
+    print("-" * 58)
+    for name, fn in (('legacy', run_legacy), ('scheduler', run_scheduler)):
+        r = fn(args)
+        print(f"{name:<10} {r['threads']:>7} {r['hz']:>8.1f} {r['latency_ms']:>11.1f} "
+              f"{r['max_queue']:>10} {r['cpu_percent']:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
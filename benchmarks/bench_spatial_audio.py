@@ -0,0 +1,112 @@
+"""Cost and smoothness of placing N voices by bearing.
+
+Renders a VoicePool whose voices all circle the listener (every voice gets
+a new frequency and bearing before each block) with the plain pan mixdown,
+the stereo SpatialRenderer and the binaural one. Reports the pool's CPU time
+per block, the spatial stage's share of it per voice, and the whole
+callback as a share of the block's real-time budget.
+
+Smoothness: one 440 Hz voice turning once a second. The pan mixdown changes
+its gains once per block, the spatial stages glide them. A smoothly moving
+440 Hz tone has next to no energy above 4 kHz; gain steps (zipper noise)
+are broadband clicks, so the share of energy above 4 kHz measures them.
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from voice_mixer import VoicePool
+
+MODES = ('pan', 'stereo', 'binaural')
+
+
+def make_pool(mode, voices, sample_rate):
+    pool = VoicePool(max_voices=max(voices, 1), sample_rate=sample_rate, channels=2)
+    if mode != 'pan':
+        pool.enable_spatial(mode)
+    return pool
+
+
+def turn(voice, mode, bearing):
+    if mode == 'pan':
+        voice.set_pan(math.sin(bearing))
+    else:
+        voice.set_bearing(bearing)
+
+
+def time_pool(mode, voices, blocks, frames, sample_rate):
+    """(CPU seconds per block for the whole callback, for the mixdown alone)"""
+    pool = make_pool(mode, voices, sample_rate)
+    handles = [pool.allocate(220.0 + 10 * i, timbre=0.4 * (i % 4)) for i in range(voices)]
+    outdata = np.zeros((frames, 2), dtype=np.float32)
+    step = 2 * math.pi * frames / sample_rate  # One turn per second
+
+    # Time the mixdown separately by wrapping whichever stage does it
+    mixing = [0.0]
+    if pool.spatializer is not None:
+        mix = pool.spatializer.mix
+
+        def timed_mix(*args):
+            start = time.process_time()
+            mix(*args)
+            mixing[0] += time.process_time() - start
+        pool.spatializer.mix = timed_mix
+
+    cpu = 0.0
+    for block in range(blocks):
+        for i, voice in enumerate(handles):
+            voice.set_frequency(220.0 + 10 * i + block % 50)
+            turn(voice, mode, block * step + i)
+        start = time.process_time()
+        pool.audio_callback(outdata, frames, None, None)
+        cpu += time.process_time() - start
+    return cpu / blocks, mixing[0] / blocks
+
+
+def zipper_level(mode, frames, sample_rate, seconds=2.0, cutoff=4000.0):
+    """Energy above `cutoff` Hz relative to the total, in dB, of one turning voice"""
+    pool = make_pool(mode, 1, sample_rate)
+    voice = pool.allocate(440.0, amplitude=0.3)
+    outdata = np.zeros((frames, 2), dtype=np.float32)
+    blocks = int(seconds * sample_rate / frames)
+    step = 2 * math.pi * frames / sample_rate
+    output = []
+    for block in range(blocks):
+        turn(voice, mode, block * step)
+        pool.audio_callback(outdata, frames, None, None)
+        output.append(outdata.copy())
+    signal = np.concatenate(output[2:]).astype(np.float64)  # Skip the fade-in
+    spectrum = np.abs(np.fft.rfft(signal * np.hanning(len(signal))[:, None], axis=0)) ** 2
+    frequencies = np.fft.rfftfreq(len(signal), 1 / sample_rate)
+    return 10 * math.log10(spectrum[frequencies > cutoff].sum() / spectrum.sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--voices', type=int, nargs='+', default=[1, 8, 32, 64])
+    parser.add_argument('--blocks', type=int, default=300)
+    parser.add_argument('--frames', type=int, default=512)
+    parser.add_argument('--sample-rate', type=int, default=44100)
+    args = parser.parse_args()
+
+    budget = args.frames / args.sample_rate
+    print(f"{args.frames}-frame blocks ({budget * 1000:.1f} ms)\n")
+    print(f"{'mode':>9} {'voices':>6} {'callback us':>12} {'spatial us':>11} "
+          f"{'per voice us':>13} {'of budget':>10}")
+    for mode in MODES:
+        for voices in args.voices:
+            callback, mixing = time_pool(mode, voices, args.blocks, args.frames, args.sample_rate)
+            spatial = f"{mixing * 1e6:>11.1f}" if mode != 'pan' else f"{'-':>11}"
+            per_voice = f"{mixing / voices * 1e6:>13.2f}" if mode != 'pan' else f"{'-':>13}"
+            print(f"{mode:>9} {voices:>6} {callback * 1e6:>12.1f} {spatial} {per_voice} "
+                  f"{callback / budget * 100:>9.2f}%")
+
+    print("\nEnergy above 4 kHz of a 440 Hz source turning once a second (lower is smoother):")
+    for mode in MODES:
+        print(f"{mode:>9} {zipper_level(mode, args.frames, args.sample_rate):>7.1f} dB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Cold start: import cost, time to the device list and time to the first tone.
+
+Profiles `import bluetooth_nav` with `python -X importtime` and lists the
+slowest top-level imports. Then starts bluetooth_nav.py --backend simulated
+--audio-sink null as a fresh process --runs times and measures, from the
+spawn, when the first tone is published with a device picked automatically
+(--device, as from the device cache), and when the device list appears with
+--choose (once the strongest devices settle, instead of after a fixed 10 s).
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET = 1.0  # Seconds from launch to the first tone
+
+
+def import_profile(top=8):
+    """(total import seconds, [(seconds, module)] of bluetooth_nav's slowest direct imports)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import bluetooth_nav'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    total, direct = 0.0, []
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)', line)
+        if not match:
+            continue
+        cumulative, depth, module = int(match.group(1)) / 1e6, len(match.group(2)), match.group(3)
+        if module == 'bluetooth_nav':
+            total = cumulative
+        elif depth == 3:  # Imported by bluetooth_nav itself
+            direct.append((cumulative, module))
+    return total, sorted(direct, reverse=True)[:top], 'numpy' in result.stderr
+
+
+def time_to_line(arguments, pattern, stdin=None, timeout=20.0):
+    """Seconds from spawning bluetooth_nav.py with `arguments` until it prints a line matching `pattern`"""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, ECHONAV_DEVICE_CACHE=os.path.join(tmp, 'devices.json'))
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, '-u', 'bluetooth_nav.py', '--backend', 'simulated',
+                                    '--audio-sink', 'null'] + arguments,
+                                   cwd=ROOT, env=env, stdin=subprocess.PIPE if stdin else subprocess.DEVNULL,
+                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        try:
+            for line in process.stdout:
+                if re.search(pattern, line):
+                    return time.perf_counter() - start
+                if time.perf_counter() - start > timeout:
+                    break
+            return None
+        finally:
+            process.kill()
+            process.wait()
+
+
+def summary(samples):
+    samples = [s for s in samples if s is not None]
+    if not samples:
+        return "did not happen"
+    return f"median {statistics.median(samples) * 1000:.0f} ms, max {max(samples) * 1000:.0f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--device', default='SIM-0001', help='simulated device to pick automatically')
+    args = parser.parse_args()
+
+    total, direct, numpy_loaded = import_profile()
+    print(f"import bluetooth_nav: {total * 1000:.0f} ms (numpy {'loaded' if numpy_loaded else 'deferred'})")
+    for seconds, module in direct:
+        print(f"  {module:<20} {seconds * 1000:>6.1f} ms")
+
+    first_tone = [time_to_line(['--device', args.device], r'^First tone') for _ in range(args.runs)]
+    device_list = [time_to_line(['--choose'], r'^Discovered devices') for _ in range(args.runs)]
+    print(f"\nLaunch -> first tone (auto-selected): {summary(first_tone)}")
+    print(f"Launch -> device list (--choose):     {summary(device_list)}")
+    worst = max((s for s in first_tone if s is not None), default=None)
+    verdict = 'within' if worst is not None and worst < BUDGET else 'OVER'
+    print(f"Worst cold start {verdict} the {BUDGET:.0f} s budget")
+
+
+if __name__ == '__main__':
+    main()
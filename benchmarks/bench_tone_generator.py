@@ -0,0 +1,96 @@
+"""Compare the preallocated tone engine against the original per-block synthesis.
+
+Reports CPU time per audio callback and the bytes allocated inside the callback
+(measured with tracemalloc), both per callback and per second of audio.
+"""
+import argparse
+import time
+import tracemalloc
+from queue import Queue
+
+import numpy as np
+
+from tone_generator import ContinuousToneGenerator
+
+
+class LegacyToneGenerator(ContinuousToneGenerator):
+    """The original engine: Queue handoff, fresh arange/time/sample arrays every block"""
+    def __init__(self, initial_freq=440.0, sample_rate=44100):
+        super().__init__(initial_freq, sample_rate)
+        self.freq_queue = Queue()
+
+    def set_frequency(self, freq):
+        if self.running:
+            while not self.freq_queue.empty():
+                self.freq_queue.get()
+            self.freq_queue.put(freq)
+
+    def audio_callback(self, outdata, frames, time, status):
+        while not self.freq_queue.empty():
+            self.frequency = self.freq_queue.get()
+        t = np.arange(frames) / self.sample_rate
+        phase_increment = 2 * np.pi * self.frequency / self.sample_rate
+        samples = self.amplitude * np.sin(self.phase + 2 * np.pi * self.frequency * t)
+        self.phase = (self.phase + frames * phase_increment) % (2 * np.pi)
+        outdata[:, 0] = samples
+
+
+def run_callbacks(generator, outdata, frames, callbacks):
+    """Drive the callback with a changing frequency, like a live RSSI stream"""
+    generator.running = True
+    for i in range(callbacks):
+        generator.set_frequency(220.0 + (i % 64) * 10.0)
+        generator.audio_callback(outdata, frames, None, None)
+
+
+def measure(generator_cls, frames, callbacks, sample_rate):
+    generator = generator_cls(initial_freq=440.0, sample_rate=sample_rate)
+    outdata = np.zeros((frames, 1), dtype=np.float32)
+
+    # Warm up so one-off buffer preparation is not counted
+    run_callbacks(generator, outdata, frames, 16)
+
+    start = time.process_time()
+    run_callbacks(generator, outdata, frames, callbacks)
+    cpu = time.process_time() - start
+
+    # Peak traced memory above the steady-state baseline = bytes allocated
+    # (and released) inside one callback
+    tracemalloc.start()
+    transient = 0
+    for i in range(min(callbacks, 200)):
+        generator.set_frequency(220.0 + i)
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        generator.audio_callback(outdata, frames, None, None)
+        _, peak = tracemalloc.get_traced_memory()
+        transient = max(transient, peak - base)
+    tracemalloc.stop()
+
+    callbacks_per_second = sample_rate / frames
+    return {
+        'us_per_callback': cpu / callbacks * 1e6,
+        'cpu_percent': cpu / callbacks * callbacks_per_second * 100,
+        'bytes_per_callback': transient,
+        'bytes_per_second': transient * callbacks_per_second,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--callbacks', type=int, default=20000)
+    parser.add_argument('--sample-rate', type=int, default=44100)
+    parser.add_argument('--blocksizes', type=int, nargs='+', default=[64, 256, 512, 1024])
+    args = parser.parse_args()
+
+    print(f"{'engine':<10} {'block':>6} {'us/cb':>8} {'CPU %':>7} {'B/cb':>8} {'B/s':>10}")
+    print("-" * 54)
+    for frames in args.blocksizes:
+        for name, cls in (('legacy', LegacyToneGenerator), ('prealloc', ContinuousToneGenerator)):
+            r = measure(cls, frames, args.callbacks, args.sample_rate)
+            print(f"{name:<10} {frames:>6} {r['us_per_callback']:>8.1f} {r['cpu_percent']:>7.3f} "
+                  f"{r['bytes_per_callback']:>8} {r['bytes_per_second']:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Cost of capturing and replaying RSSI traces.
+
+Times TraceRecorder.record() per reading against printing each reading (what
+the RSSI callback used to do), how fast the background writer drains, how
+long a large trace takes to open, and how fast replay() runs the filter ->
+frequency pipeline compared with real time.
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from trace_log import RECORD_DTYPE, TraceReader, TraceRecorder, replay
+
+
+def record_cost(path, readings):
+    rng = random.Random(0)
+    samples = [(f"DEV-{i % 8}", rng.randint(-95, -45)) for i in range(readings)]
+
+    buffer = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(buffer):
+        for device, rssi in samples:
+            print(f"RSSI: {rssi}, Smoothed RSSI: {rssi:.1f}, Frequency: {440.0:.1f}Hz")
+    printed = (time.perf_counter() - start) / readings
+
+    recorder = TraceRecorder(path)
+    record = recorder.record
+    start = time.perf_counter()
+    for device, rssi in samples:
+        record(device, rssi, float(rssi), 440.0)
+    recorded = (time.perf_counter() - start) / readings
+    start = time.perf_counter()
+    recorder.close()
+    drained = time.perf_counter() - start
+    return printed, recorded, drained, recorder
+
+
+def write_synthetic(path, records, devices=16, rate=100.0, chunk=1000000):
+    """A large trace written straight from NumPy (as if recorded for records / rate seconds)"""
+    rng = np.random.default_rng(0)
+    recorder = TraceRecorder(path)  # Writes the header
+    recorder.close()
+    with open(path, 'ab') as f:
+        for first in range(0, records, chunk):
+            n = min(chunk, records - first)
+            block = np.zeros(n, dtype=RECORD_DTYPE)
+            block['time'] = (first + np.arange(n)) / (rate * devices)
+            block['device'] = np.arange(first, first + n) % devices
+            block['rssi'] = rng.integers(-95, -45, n)
+            block['smoothed'] = np.nan
+            block['frequency'] = np.nan
+            f.write(block.tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--readings', type=int, default=200000, help='readings for the record() timing')
+    parser.add_argument('--large', type=int, default=20000000, help='records in the large trace (22 bytes each)')
+    parser.add_argument('--replay', type=int, default=1000000, help='records replayed through the pipeline')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'session.trc')
+        printed, recorded, drained, recorder = record_cost(path, args.readings)
+        print(f"print() per reading:   {printed * 1e9:>8.0f} ns")
+        print(f"record() per reading:  {recorded * 1e9:>8.0f} ns "
+              f"({recorder.records_written} written in {recorder.flushes} flushes, "
+              f"{drained * 1000:.0f} ms to drain on close)")
+
+        large = os.path.join(directory, 'large.trc')
+        write_synthetic(large, args.large)
+        size = os.path.getsize(large)
+        start = time.perf_counter()
+        reader = TraceReader(large)
+        opened = time.perf_counter() - start
+        start = time.perf_counter()
+        strongest = int(reader['rssi'].max())
+        scanned = time.perf_counter() - start
+        print(f"Large trace: {len(reader)} records, {size / 1e9:.2f} GB; opened in {opened * 1000:.2f} ms, "
+              f"full RSSI column scanned in {scanned * 1000:.0f} ms (max {strongest} dBm)")
+
+        replay_path = os.path.join(directory, 'replay.trc')
+        write_synthetic(replay_path, args.replay)
+        reader = TraceReader(replay_path)
+        start = time.perf_counter()
+        results = replay(reader)
+        elapsed = time.perf_counter() - start
+        readings = sum(len(smoothed) for smoothed, _ in results.values())
+        print(f"Replay: {readings} readings ({reader.duration:.0f} s of trace) in {elapsed:.2f} s, "
+              f"{readings / elapsed / 1e6:.2f} M readings/s, {reader.duration / elapsed:.0f}x real time")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Audio-callback cost of N tracked beacons: one ContinuousToneGenerator (and
+stream) per beacon against a single VoicePool mixing all of them.
+
+Every voice gets a new frequency before each block, as when all beacons are
+reporting RSSI, so the glide path is always exercised. Reports CPU time per
+block and as a share of the block's real-time budget.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from tone_generator import ContinuousToneGenerator
+from voice_mixer import VoicePool
+
+
+def time_generators(voices, blocks, frames, sample_rate):
+    """N independent generators, each with its own callback and output buffer"""
+    generators = [ContinuousToneGenerator(220.0 + 10 * i, sample_rate, channels=2) for i in range(voices)]
+    outputs = [np.zeros((frames, 2), dtype=np.float32) for _ in range(voices)]
+    cpu = 0.0
+    for block in range(blocks):
+        for i, generator in enumerate(generators):
+            generator.set_frequency(220.0 + 10 * i + block % 50)
+        start = time.process_time()
+        for generator, outdata in zip(generators, outputs):
+            generator.audio_callback(outdata, frames, None, None)
+        cpu += time.process_time() - start
+    return cpu / blocks
+
+
+def time_pool(voices, blocks, frames, sample_rate, timbre):
+    pool = VoicePool(max_voices=max(voices, 1), sample_rate=sample_rate, channels=2)
+    handles = [pool.allocate(220.0 + 10 * i, pan=(i % 9) / 4 - 1, timbre=timbre * (i % 4) / 3)
+               for i in range(voices)]
+    outdata = np.zeros((frames, 2), dtype=np.float32)
+    cpu = 0.0
+    for block in range(blocks):
+        for i, voice in enumerate(handles):
+            voice.set_frequency(220.0 + 10 * i + block % 50)
+        start = time.process_time()
+        pool.audio_callback(outdata, frames, None, None)
+        cpu += time.process_time() - start
+    return cpu / blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--voices', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--blocks', type=int, default=500)
+    parser.add_argument('--frames', type=int, default=512)
+    parser.add_argument('--sample-rate', type=int, default=44100)
+    args = parser.parse_args()
+
+    budget = args.frames / args.sample_rate
+    print(f"{'voices':>6} {'generators us':>14} {'pool us':>9} {'pool+timbre us':>15} "
+          f"{'generators %':>13} {'pool %':>7}")
+    print("-" * 70)
+    for voices in args.voices:
+        separate = time_generators(voices, args.blocks, args.frames, args.sample_rate)
+        pooled = time_pool(voices, args.blocks, args.frames, args.sample_rate, timbre=0.0)
+        timbred = time_pool(voices, args.blocks, args.frames, args.sample_rate, timbre=1.0)
+        print(f"{voices:>6} {separate * 1e6:>14.0f} {pooled * 1e6:>9.0f} {timbred * 1e6:>15.0f} "
+              f"{separate / budget * 100:>12.1f}% {timbred / budget * 100:>6.1f}%")
+
+
+if __name__ == '__main__':
+    main()
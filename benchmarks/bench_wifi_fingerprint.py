@@ -0,0 +1,99 @@
+"""WiFi fingerprint k-NN: database open time, lookup latency and accuracy.
+
+Builds a synthetic survey of --fingerprints scans (--scans per reference
+point on a grid) of a floor with --access-points access points, using the
+path-loss model plus shadowing noise, then localizes fresh scans taken at
+random spots. Lookups through the strongest-AP index are compared with an
+exhaustive scan of every fingerprint.
+"""
+import argparse
+import math
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from positioning import PathLossModel
+from wifi_fingerprint import MISSING, FingerprintDatabase, scan_vector, write_database
+
+
+def synthetic_scans(points, access_points, model, noise, sensitivity, rng):
+    """RSSI matrix (points x access points, int8) of scans taken at `points`"""
+    dx = points[:, 0, None] - access_points[None, :, 0]
+    dy = points[:, 1, None] - access_points[None, :, 1]
+    rssi = model.rssi(np.hypot(dx, dy)) + rng.normal(0, noise, dx.shape)
+    rssi[rssi < sensitivity] = MISSING
+    return np.clip(np.round(rssi), MISSING, 0).astype(np.int8)
+
+
+def as_networks(vector, bssids):
+    """A scan vector in scan_wifi_networks' format"""
+    return [{'ssid': 'Net', 'bssid': bssids[i], 'rssi': int(vector[i]), 'channel': 6, 'security': 3}
+            for i in np.flatnonzero(vector > MISSING)]
+
+
+def build(path, fingerprints, scans, access_points, size, model, noise, sensitivity, rng):
+    points = fingerprints // scans
+    side = math.ceil(math.sqrt(points * size[0] / size[1]))
+    grid = np.stack(np.meshgrid(np.linspace(0, size[0], side),
+                                np.linspace(0, size[1], math.ceil(points / side))), axis=-1).reshape(-1, 2)[:points]
+    ap_xy = rng.uniform((0, 0), size, (access_points, 2))
+    spots = np.repeat(grid, scans, axis=0)
+    matrix = np.concatenate([synthetic_scans(chunk, ap_xy, model, noise, sensitivity, rng)
+                             for chunk in np.array_split(spots, max(1, len(spots) // 10000))])
+    bssids = ["02:00:00:%02x:%02x:%02x" % (i >> 16, (i >> 8) & 255, i & 255) for i in range(access_points)]
+    labels = [f"P{i // scans}" for i in range(len(spots))]
+    write_database(path, matrix, bssids, labels, spots)
+    return ap_xy, bssids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--fingerprints', type=int, default=100000)
+    parser.add_argument('--scans', type=int, default=5, help='scans recorded per reference point')
+    parser.add_argument('--access-points', type=int, default=300)
+    parser.add_argument('--size', type=float, nargs=2, default=[200.0, 120.0], help='floor size in metres')
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--noise', type=float, default=4.0)
+    parser.add_argument('--sensitivity', type=float, default=-90.0)
+    parser.add_argument('--k', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    model = PathLossModel(tx_power=-40.0, exponent=3.0)  # 1 m RSSI of a typical access point
+    with tempfile.TemporaryDirectory() as path:
+        start = time.perf_counter()
+        ap_xy, bssids = build(path, args.fingerprints, args.scans, args.access_points, args.size,
+                              model, args.noise, args.sensitivity, rng)
+        built = time.perf_counter() - start
+        size_mb = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 1e6
+
+        start = time.perf_counter()
+        db = FingerprintDatabase(path)
+        opened = time.perf_counter() - start
+
+        spots = rng.uniform((0, 0), args.size, (args.queries, 2))
+        scans = [as_networks(v, bssids) for v in synthetic_scans(spots, ap_xy, model, args.noise, args.sensitivity, rng)]
+        db.locate(scans[0])  # Fault in the index pages once
+
+        print(f"{len(db)} fingerprints x {len(db.bssids)} access points, {size_mb:.1f} MB on disk, "
+              f"built in {built:.1f} s, opened in {opened * 1000:.2f} ms")
+        print(f"{'search':<11} {'p50 us':>8} {'p99 us':>8} {'candidates':>11} {'mean err m':>11} {'p90 err m':>10}")
+        for label, exhaustive in (('indexed', False), ('exhaustive', True)):
+            latencies, errors, candidates = [], [], []
+            for spot, networks in zip(spots, scans):
+                start = time.perf_counter()
+                result = db.locate(networks, k=args.k, exhaustive=exhaustive)
+                latencies.append(time.perf_counter() - start)
+                candidates.append(len(db) if exhaustive else
+                                  len(db.candidates(scan_vector(networks, db.column, len(db.bssids)))))
+                if result and result['position'] is not None:
+                    errors.append(math.hypot(result['position'][0] - spot[0], result['position'][1] - spot[1]))
+            latencies = np.array(latencies) * 1e6
+            print(f"{label:<11} {np.percentile(latencies, 50):>8.0f} {np.percentile(latencies, 99):>8.0f} "
+                  f"{np.mean(candidates):>11.0f} {np.mean(errors):>11.2f} {np.percentile(errors, 90):>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""WiFi scan throughput and per-scan processing cost in a dense venue.
+
+A simulated backend holds --aps access points on --interfaces interfaces,
+each scan taking --scan-time seconds. Compares scanning the interfaces one
+after another against ParallelWifiScanner (all interfaces at once, next scan
+queued before processing), back to back with no interval. Then times the
+processing of one scan: printing the full table, as the scan loop used to,
+against updating the NetworkTable and printing only the diff.
+"""
+import argparse
+import contextlib
+import io
+import math
+import random
+import time
+
+from simulated_backend import SimulatedAccessPoint, SimulatedRadioBackend, SyntheticTrace
+from wifi_scan import print_scan_diff, scan_wifi_networks
+from wifi_scanner import NetworkTable, ParallelWifiScanner, ScanResult
+
+
+def venue(aps, interfaces, scan_time, seed=0):
+    rng = random.Random(seed)
+    access_points = [
+        SimulatedAccessPoint(f"Venue-{i % 40}", "02:00:00:%02x:%02x:%02x" % (i >> 16, (i >> 8) & 255, i & 255),
+                             channel=rng.choice([1, 6, 11, 36, 44, 149]),
+                             trace=SyntheticTrace(base=rng.uniform(-92, -50), swing=rng.uniform(2, 10),
+                                                  period=rng.uniform(30, 120), phase=rng.uniform(0, 2 * math.pi)))
+        for i in range(aps)
+    ]
+    return SimulatedRadioBackend(peripherals=[], access_points=access_points, seed=seed, realtime=True,
+                                 wifi_scan_time=scan_time,
+                                 wifi_interfaces=[f"sim{i}" for i in range(interfaces)])
+
+
+def sequential(backend, seconds):
+    scans = 0
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        for interface in backend.wifi_interfaces():
+            scan_wifi_networks(backend, interface)
+            scans += 1
+    return scans / seconds
+
+
+def parallel(backend, seconds):
+    scanner = ParallelWifiScanner.for_backends([backend], scan_wifi_networks, interval=0.0)
+    end = time.monotonic() + seconds
+    results = scanner.results()
+    for _ in results:
+        if time.monotonic() >= end:
+            break
+    results.close()
+    return scanner.scans_completed / seconds
+
+
+def print_full_table(networks):
+    print("\n" + "=" * 80)
+    print(f"Scan at {time.strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"{'SSID':<32} {'BSSID':<20} {'RSSI':<10} {'Channel':<10} {'Security':<10}")
+    print("-" * 80)
+    for net in networks:
+        print(f"{net['ssid']:<32} {net['bssid']:<20} {net['rssi']:<10} {net['channel']:<10} {net['security']:<10}")
+
+
+def processing_cost(backend, scans):
+    """Microseconds per scan to print the full table, and to diff and print the changes"""
+    samples = [scan_wifi_networks(backend, 'sim0') for _ in range(scans)]
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink):
+        start = time.perf_counter()
+        for networks in samples:
+            print_full_table(networks)
+        full = (time.perf_counter() - start) / scans
+
+        table = NetworkTable()
+        table.update(samples[0], 0.0)
+        start = time.perf_counter()
+        for i, networks in enumerate(samples[1:], 1):
+            diff = table.update(networks, float(i))
+            print_scan_diff(ScanResult(('sim', 'sim0'), i, networks, diff), len(table))
+        incremental = (time.perf_counter() - start) / (scans - 1)
+    return full * 1e6, incremental * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--aps', type=int, default=300)
+    parser.add_argument('--interfaces', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--scan-time', type=float, default=0.2, help='seconds one scan takes')
+    parser.add_argument('--seconds', type=float, default=3.0, help='measuring time per layout')
+    args = parser.parse_args()
+
+    print(f"{'interfaces':>10} {'sequential scans/s':>19} {'parallel scans/s':>17}")
+    for interfaces in args.interfaces:
+        backend = venue(args.aps, interfaces, args.scan_time)
+        print(f"{interfaces:>10} {sequential(backend, args.seconds):>19.1f} {parallel(backend, args.seconds):>17.1f}")
+
+    backend = venue(args.aps, 1, 0.0)
+    full, incremental = processing_cost(backend, 200)
+    print(f"\nProcessing one scan of {args.aps} access points: full table {full:.0f} us, "
+          f"diff + changes only {incremental:.0f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+"""Headless performance suite for the RSSI -> audio pipeline, with baseline comparison.
+
+Runs on the simulated radio backend with a null audio sink, so it needs no
+Bluetooth or audio hardware:
+
+  rssi_callback     cost of peripheral_didReadRSSI_error_ on the radio thread,
+                    and readings per second through the whole pipeline
+  frequency         calculate_frequency per call
+  audio_callback    VoicePool.audio_callback per block (p50/p99), 1 and 16 voices
+  memory            traced heap growth per 100k readings over a long virtual-time run
+  threads           threads and CPU share while tracking beacons in real time
+
+Each timing is the best of --repeat runs. Results go to --output as JSON
+(value, unit, which direction is better, and the regression tolerance per
+metric). With --baseline (default benchmarks/baseline.json, if present) every
+metric is compared against the baseline's value. A change for the worse beyond
+the tolerance is reported as a regression, and the exit status is 1.
+--save-baseline writes the results as the new baseline instead.
+
+Timings on shared or virtual machines drift by up to half from one
+minute to the next. Record the baseline on the machine that runs the
+comparison, or widen the tolerances there with --tolerance-scale.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+from audio_sink import NullOutputStream
+from benchmarks import bench_pipeline
+from bluetooth_nav import BluetoothDelegate
+from simulated_backend import SimulatedPeripheral, SimulatedRadioBackend, SyntheticTrace, demo_scene
+from voice_mixer import VoicePool
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, 'baseline.json')
+DEFAULT_OUTPUT = os.path.join(HERE, 'results.json')
+
+
+def metric(value, unit, better, tolerance=0.15, slack=0.0):
+    """A result entry; worse than the baseline by more than max(tolerance * baseline, slack) is a regression"""
+    return {'value': value, 'unit': unit, 'better': better, 'tolerance': tolerance, 'slack': slack}
+
+
+def best_per_item(function, items, chunks=50):
+    """Fastest per-item time of `function(item)` over `chunks` slices of `items`.
+
+    Shared and virtual machines slow down for whole stretches; the fastest
+    slice is what the code costs when nothing else interferes.
+    """
+    size = max(1, len(items) // chunks)
+    best = None
+    for i in range(0, len(items), size):
+        chunk = items[i:i + size]
+        start = time.perf_counter()
+        for item in chunk:
+            function(item)
+        per_item = (time.perf_counter() - start) / len(chunk)
+        best = per_item if best is None else min(best, per_item)
+    return best
+
+
+def quiet_delegate(backend, passive=False, voices=64):
+    voice_pool = VoicePool(max_voices=voices, stream_factory=NullOutputStream)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return BluetoothDelegate(backend, voice_pool, passive=passive)
+
+
+def wait_for_pipeline(delegate, count, timeout=30.0):
+    """Wait until the pipeline has processed `count` readings"""
+    deadline = time.perf_counter() + timeout
+    while delegate.rssi_updates_count < count and time.perf_counter() < deadline:
+        time.sleep(0.001)
+
+
+def wait_until_idle(delegate, settle=0.05):
+    """Wait until the pipeline stops taking in readings"""
+    last = -1
+    while delegate.rssi_updates_count != last:
+        last = delegate.rssi_updates_count
+        time.sleep(settle)
+
+
+def bench_rssi_callback(readings, repeat):
+    """Radio-thread cost per callback and end-to-end pipeline throughput"""
+    best_call = None
+    for _ in range(repeat):
+        peripheral = SimulatedPeripheral('SIM-BENCH', 'Bench beacon', SyntheticTrace())
+        backend = SimulatedRadioBackend(peripherals=[peripheral], access_points=[])
+        # Passive: no read scheduler, so the callback is the bridge's own work
+        delegate = quiet_delegate(backend, passive=True)
+        delegate.loop_thread.call_wait(delegate.track_peripheral, peripheral)
+        callback = delegate.bridge.peripheral_didReadRSSI_error_
+        values = [-60 - (i % 30) for i in range(readings)]
+
+        # Park the loop so the timing is the callback alone, not the GIL shared with the pipeline
+        release = threading.Event()
+        delegate.loop_thread.call(release.wait)
+        with contextlib.redirect_stdout(io.StringIO()):
+            call = best_per_item(lambda rssi: callback(peripheral, rssi, None), values)
+            release.set()
+            wait_for_pipeline(delegate, readings)
+            delegate.stop()
+        best_call = call if best_call is None else min(best_call, call)
+
+    # Throughput: the simulator delivering readings as fast as the pipeline takes them
+    best_rate = max(bench_pipeline.run(rate=10000.0, duration=readings / 10000.0, loss=0.0)['events_per_wall_second']
+                    for _ in range(repeat))
+    return {
+        'rssi_callback_ns': metric(best_call * 1e9, 'ns/call', 'lower', tolerance=0.5),
+        'pipeline_readings_per_second': metric(best_rate, 'readings/s', 'higher', tolerance=0.4),
+    }
+
+
+def bench_frequency(calls, repeat):
+    backend = SimulatedRadioBackend(peripherals=[], access_points=[])
+    delegate = quiet_delegate(backend)
+    calculate_frequency = delegate.calculate_frequency
+    values = [-100 + (i % 1200) * 0.05 for i in range(calls)]  # Grid and in-between values
+    calculate_frequency(-70)  # Build the table outside the timing
+    best = min(best_per_item(calculate_frequency, values) for _ in range(repeat))
+    with contextlib.redirect_stdout(io.StringIO()):
+        delegate.stop()
+    return {'calculate_frequency_ns': metric(best * 1e9, 'ns/call', 'lower', tolerance=0.5)}
+
+
+def bench_audio_callback(blocks, repeat, frames=512, window=100):
+    """Per-block callback time: p50 of the quietest `window` blocks, p99 over all of them"""
+    results = {}
+    for voices in (1, 16):
+        best50, best99 = None, None
+        for _ in range(repeat):
+            pool = VoicePool(max_voices=voices, stream_factory=NullOutputStream)
+            handles = [pool.allocate(220.0 + 10 * i, pan=(i % 9) / 4 - 1, timbre=0.4 * (i % 4))
+                       for i in range(voices)]
+            outdata = np.zeros((frames, 2), dtype=np.float32)
+            times = []
+            for block in range(blocks):
+                for i, voice in enumerate(handles):
+                    voice.set_frequency(220.0 + 10 * i + block % 50)
+                start = time.perf_counter()
+                pool.audio_callback(outdata, frames, None, None)
+                times.append(time.perf_counter() - start)
+            p50 = min(sorted(times[i:i + window])[len(times[i:i + window]) // 2]
+                      for i in range(0, len(times), window))
+            p99 = sorted(times)[int(len(times) * 0.99)]
+            best50 = p50 if best50 is None else min(best50, p50)
+            best99 = p99 if best99 is None else min(best99, p99)
+        results[f'audio_callback_{voices}v_p50_us'] = metric(best50 * 1e6, 'us/block', 'lower', tolerance=0.5)
+        # Tail latency is the noisiest figure on a shared machine
+        results[f'audio_callback_{voices}v_p99_us'] = metric(best99 * 1e6, 'us/block', 'lower', tolerance=1.0)
+    return results
+
+
+def bench_memory(seconds, rate=5000.0):
+    """Heap growth between the end of a warm-up and the end of a long virtual-time run"""
+    interval = 1.0 / rate
+    peripheral = SimulatedPeripheral('SIM-SOAK', 'Soak beacon', SyntheticTrace(period=7.0))
+    backend = SimulatedRadioBackend(peripherals=[peripheral], access_points=[], realtime=False,
+                                    read_latency=interval, jitter=interval / 4, connection_interval=interval)
+    delegate = quiet_delegate(backend)
+    with contextlib.redirect_stdout(io.StringIO()):
+        delegate.loop_thread.call_wait(delegate.track_peripheral, peripheral)
+        backend.connect(peripheral)
+        tracemalloc.start()
+        try:
+            backend.run(duration=min(5.0, seconds / 4))  # Fill caches, histograms and rings first
+            wait_until_idle(delegate)
+            warm, warm_count = tracemalloc.get_traced_memory()[0], delegate.rssi_updates_count
+            backend.run(duration=seconds)
+            wait_until_idle(delegate)
+            end, end_count = tracemalloc.get_traced_memory()[0], delegate.rssi_updates_count
+        finally:
+            tracemalloc.stop()
+            delegate.stop()
+    readings = max(1, end_count - warm_count)
+    return {
+        'memory_growth_bytes_per_100k': metric((end - warm) / readings * 1e5, 'bytes', 'lower',
+                                               tolerance=0.5, slack=65536),
+        'soak_readings': metric(readings, 'readings', 'info'),
+    }
+
+
+def thread_cpu():
+    """{thread name: CPU seconds} from /proc (Linux), or {} elsewhere"""
+    task_dir = f'/proc/{os.getpid()}/task'
+    if not os.path.isdir(task_dir):
+        return {}
+    names = {thread.native_id: thread.name for thread in threading.enumerate()}
+    ticks = os.sysconf('SC_CLK_TCK')
+    cpu = {}
+    for tid in os.listdir(task_dir):
+        try:
+            with open(f'{task_dir}/{tid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except FileNotFoundError:
+            continue  # Thread exited while we were reading
+        name = names.get(int(tid), f'native-{tid}')  # e.g. threads started by numpy or the OS
+        cpu[name] = cpu.get(name, 0.0) + (int(fields[11]) + int(fields[12])) / ticks  # utime + stime
+    return cpu
+
+
+def bench_threads(seconds, beacons=6):
+    """Threads and CPU share of tracking `beacons` devices in real time"""
+    peripherals, access_points = demo_scene(0, peripherals=beacons)
+    backend = SimulatedRadioBackend(peripherals=peripherals, access_points=access_points, realtime=True)
+    delegate = quiet_delegate(backend)
+    with contextlib.redirect_stdout(io.StringIO()):
+        delegate.loop_thread.call_wait(delegate.connect_devices, peripherals)
+        delegate.voice_pool.start()
+        backend.run(duration=1.0)  # Let connections settle
+        before_threads, before_cpu, before_count = thread_cpu(), time.process_time(), delegate.rssi_updates_count
+        start = time.perf_counter()
+        backend.run(duration=seconds)
+        wall = time.perf_counter() - start
+        after_threads, cpu = thread_cpu(), time.process_time() - before_cpu
+        threads = threading.active_count()
+        readings = delegate.rssi_updates_count - before_count
+        delegate.stop()
+    per_thread = {name: round((after_threads[name] - before_threads.get(name, 0.0)) / wall * 100, 1)
+                  for name in after_threads}
+    return {
+        'threads': metric(threads, 'threads', 'lower', tolerance=0.0),
+        'cpu_percent': metric(cpu / wall * 100, '% of one core', 'lower', tolerance=0.25, slack=2.0),
+        'readings_per_second_realtime': metric(readings / wall, 'readings/s', 'info'),
+    }, {name: share for name, share in sorted(per_thread.items(), key=lambda item: -item[1]) if share}
+
+
+def run_suite(quick=False, repeat=3):
+    scale = 0.2 if quick else 1.0
+    results, details = {}, {}
+    steps = [
+        ('rssi_callback', lambda: bench_rssi_callback(int(100000 * scale), repeat)),
+        ('frequency', lambda: bench_frequency(int(500000 * scale), repeat)),
+        ('audio_callback', lambda: bench_audio_callback(int(2000 * scale), repeat)),
+        ('memory', lambda: bench_memory(60.0 * scale)),
+        ('threads', lambda: bench_threads(max(1.0, 5.0 * scale))),
+    ]
+    for name, step in steps:
+        start = time.perf_counter()
+        print(f"{name}...", end=' ', flush=True)
+        result = step()
+        if isinstance(result, tuple):
+            result, details[name] = result
+        results.update(result)
+        print(f"{time.perf_counter() - start:.1f} s")
+    return results, details
+
+
+def host_info():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance_scale=1.0):
+    """[(name, baseline value, value, relative change, verdict)] for metrics in both"""
+    rows = []
+    for name, entry in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        old, new = base['value'], entry['value']
+        change = (new - old) / abs(old) if old else 0.0
+        if entry['better'] == 'info':
+            verdict = ''
+        else:
+            worse = new - old if entry['better'] == 'lower' else old - new
+            allowed = max(entry['tolerance'] * abs(old), entry['slack']) * tolerance_scale
+            if worse > allowed:
+                verdict = 'REGRESSION'
+            elif -worse > allowed:
+                verdict = 'improved'
+            else:
+                verdict = 'ok'
+        rows.append((name, old, new, change, verdict))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='where to write the results (JSON)')
+    parser.add_argument('--baseline', help=f'results to compare against (default: {DEFAULT_BASELINE} if present)')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--quick', action='store_true', help='shorter runs, e.g. for a pre-commit check')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per timing; the best counts')
+    parser.add_argument('--tolerance-scale', type=float, default=1.0,
+                        help='multiply every regression tolerance, e.g. 2 on a noisy shared host')
+    args = parser.parse_args()
+
+    results, details = run_suite(args.quick, args.repeat)
+    report = {
+        'format': 1,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'host': host_info(),
+        'quick': args.quick,
+        'metrics': results,
+        'thread_cpu_percent': details.get('threads', {}),
+    }
+    output = DEFAULT_BASELINE if args.save_baseline else args.output
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=1)
+        f.write('\n')
+
+    print(f"\n{'metric':<32} {'value':>12} {'unit':<14}")
+    for name, entry in results.items():
+        print(f"{name:<32} {entry['value']:>12.1f} {entry['unit']:<14}")
+    if report['thread_cpu_percent']:
+        busiest = ', '.join(f"{name} {share}%" for name, share in report['thread_cpu_percent'].items())
+        print(f"CPU by thread: {busiest}")
+    print(f"Results written to {output}")
+
+    baseline_path = args.baseline or (DEFAULT_BASELINE if os.path.exists(DEFAULT_BASELINE) else None)
+    if args.save_baseline or not baseline_path:
+        return 0
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    if baseline.get('host') != report['host']:
+        print(f"\nNote: the baseline was recorded on a different host ({baseline.get('host', {}).get('platform')}, "
+              f"{baseline.get('host', {}).get('cpus')} cpus); differences may not be regressions")
+    if baseline.get('quick') != args.quick:
+        print("Note: comparing a --quick run with a full one (or the other way round)")
+
+    rows = compare(results, baseline['metrics'], args.tolerance_scale)
+    print(f"\n{'metric':<32} {'baseline':>12} {'now':>12} {'change':>8}")
+    for name, old, new, change, verdict in rows:
+        print(f"{name:<32} {old:>12.1f} {new:>12.1f} {change * 100:>+7.1f}% {verdict}")
+    regressions = [row[0] for row in rows if row[4] == 'REGRESSION']
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {baseline_path}: {', '.join(regressions)}")
+        return 1
+    print(f"\nNo regressions against {baseline_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
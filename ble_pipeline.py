@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+from collections import deque, namedtuple
+
+# One RSSI answer, as handed from the radio thread to the event loop; `requested`
+# is when its read was issued (from the on_rssi hook), None if unknown
+RSSIEvent = namedtuple('RSSIEvent', ['peripheral', 'rssi', 'error', 'time', 'requested'], defaults=(None,))
+
+# CoreBluetooth reports this advertisement RSSI when it has no measurement
+RSSI_UNAVAILABLE = 127
+
+
+class EventLoopThread:
+    """An asyncio event loop running on one background thread"""
+    def __init__(self, name='echonav-loop'):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def start(self):
+        if not self._thread.is_alive():
+            self._thread.start()
+
+    def call(self, fn, *args):
+        """Run fn(*args) on the loop; safe from any thread"""
+        self.loop.call_soon_threadsafe(fn, *args)
+
+    def call_wait(self, fn, *args, timeout=None):
+        """Run fn(*args) on the loop and wait for its result from another thread"""
+        async def call():
+            return fn(*args)
+        return self.run(call(), timeout)
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the loop and wait for its result from another thread"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def stop(self):
+        """Stop the loop and wait for its thread to exit"""
+        if self.loop.is_closed():
+            return
+        if self._thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+        self.loop.close()
+
+
+class LoopBridge:
+    """Radio listener that hands backend callbacks over to an asyncio event loop.
+
+    Install it as the backend's listener in place of `target`. State,
+    discovery and connection events are forwarded to the same-named methods
+    of `target` on the loop, one call_soon_threadsafe each.
+
+    RSSI answers are frequent, so they take a cheaper path. Link-level work
+    that must not wait for the loop (the read scheduler issuing the next
+    read) runs right away on the radio thread via the `on_rssi` hook; the
+    reading itself is appended to a deque that the loop drains into
+    `queue` in batches. The loop is woken once for the first reading after
+    a quiet period; after that it polls the deque every `batch_interval`
+    for as long as readings keep arriving, so under load there is at most
+    one wakeup per interval instead of one per reading.
+
+    Advertisements of the peripherals in `advertisers` (see
+    track_advertisements) take the same batched path as RSSI readings
+    instead of being forwarded one by one, so beacons can be tracked from
+    their advertisements alone, without a connection. Their `requested`
+    stamp is the time the advertisement arrived.
+    """
+    def __init__(self, loop, target, on_rssi=None, on_link=None, batch_interval=0.01,
+                 clock=time.monotonic):
+        self.loop = loop
+        self.target = target
+        self.on_rssi = on_rssi    # on_rssi(peripheral, error) -> request time or None, on the radio thread
+        self.on_link = on_link    # on_link(peripheral, connected), called on the radio thread
+        self.batch_interval = batch_interval
+        self.clock = clock
+        self.queue = asyncio.Queue()  # Lists of RSSIEvents; None once closed
+        self._pending = deque()
+        self._scheduled = False
+        self.advertisers = set()  # Peripherals whose advertisements are readings
+        self.wakeups = 0          # Times the radio thread had to wake the loop
+        self.batches_delivered = 0
+
+    # -- events forwarded one by one -------------------------------------
+
+    def centralManagerDidUpdateState_(self, central):
+        self.loop.call_soon_threadsafe(self.target.centralManagerDidUpdateState_, central)
+
+    def centralManager_didDiscoverPeripheral_advertisementData_RSSI_(self, central, peripheral, data, rssi):
+        if peripheral in self.advertisers:
+            now = self.clock()
+            error = 'RSSI unavailable' if rssi == RSSI_UNAVAILABLE else None
+            self._push(RSSIEvent(peripheral, rssi, error, now, now))
+            return
+        self.loop.call_soon_threadsafe(
+            self.target.centralManager_didDiscoverPeripheral_advertisementData_RSSI_,
+            central, peripheral, data, rssi)
+
+    def centralManager_didConnectPeripheral_(self, central, peripheral):
+        if self.on_link is not None:
+            self.on_link(peripheral, True)
+        self.loop.call_soon_threadsafe(self.target.centralManager_didConnectPeripheral_, central, peripheral)
+
+    def centralManager_didDisconnectPeripheral_error_(self, central, peripheral, error):
+        if self.on_link is not None:
+            self.on_link(peripheral, False)
+        self.loop.call_soon_threadsafe(
+            self.target.centralManager_didDisconnectPeripheral_error_, central, peripheral, error)
+
+    # -- RSSI, batched -----------------------------------------------------
+
+    def track_advertisements(self, peripheral, enabled=True):
+        """Treat the peripheral's advertisements as RSSI readings (or stop, with enabled=False)"""
+        if enabled:
+            self.advertisers.add(peripheral)
+        else:
+            self.advertisers.discard(peripheral)
+
+    def peripheral_didReadRSSI_error_(self, peripheral, rssi, error):
+        requested = self.on_rssi(peripheral, error) if self.on_rssi is not None else None
+        self._push(RSSIEvent(peripheral, rssi, error, self.clock(), requested))
+
+    def _push(self, event):
+        """Queue a reading for the loop, waking it only if no drain is scheduled (radio thread)"""
+        self._pending.append(event)
+        if not self._scheduled:
+            self._scheduled = True
+            self.wakeups += 1
+            self.loop.call_soon_threadsafe(self._drain)
+
+    def _drain(self):
+        """Move pending readings into the queue as one batch (runs on the loop)"""
+        pending = self._pending
+        if pending:
+            batch = [pending.popleft() for _ in range(len(pending))]
+            self.batches_delivered += 1
+            self.queue.put_nowait(batch)
+            # Stay scheduled, so readings arriving meanwhile do not wake the loop
+            self.loop.call_later(self.batch_interval, self._drain)
+            return
+        self._scheduled = False
+        if pending:
+            # A reading arrived between the check above and clearing the flag
+            self._scheduled = True
+            self.loop.call_soon(self._drain)
+
+    async def batches(self):
+        """Async generator over batches of RSSIEvents, in arrival order, until close()"""
+        while True:
+            batch = await self.queue.get()
+            if batch is None:
+                return
+            yield batch
+
+    def close(self):
+        """Flush pending readings and end batches() (call on the loop)"""
+        pending = self._pending
+        if pending:
+            self.queue.put_nowait([pending.popleft() for _ in range(len(pending))])
+        self.queue.put_nowait(None)
@@ -1,87 +1,132 @@
-import objc
-from CoreBluetooth import CBCentralManager, CBPeripheral
-from Foundation import NSObject, NSLog, NSNumber, NSRunLoop, NSDefaultRunLoopMode, NSDate
-import dispatch
-from PyObjCTools import AppHelper
+import argparse
+import functools
+import math
+import signal
+import sys
 import threading
 import time
 import os
-import math
-import numpy as np
-import sounddevice as sd
-from queue import Queue
-
-# Load CoreBluetooth framework
-objc.loadBundle('CoreBluetooth', globals(), '/System/Library/Frameworks/CoreBluetooth.framework')
-
-class ContinuousToneGenerator:
-    """Generates a continuous tone with frequency that can be updated in real-time"""
-    def __init__(self, initial_freq=440.0, sample_rate=44100):
-        self.sample_rate = sample_rate
-        self.frequency = initial_freq
-        self.amplitude = 0.3
-        self.phase = 0.0
-        self.running = False
-        self.freq_queue = Queue()
-        self.stream = None
-    
-    def audio_callback(self, outdata, frames, time, status):
-        """Callback for the sounddevice stream"""
-        # Check if there's a new frequency to apply
-        while not self.freq_queue.empty():
-            self.frequency = self.freq_queue.get()
-        
-        # Generate audio samples
-        t = np.arange(frames) / self.sample_rate
-        phase_increment = 2 * np.pi * self.frequency / self.sample_rate
-        
-        # Generate continuous sine wave with current phase
-        samples = self.amplitude * np.sin(self.phase + 2 * np.pi * self.frequency * t)
-        
-        # Update phase for next callback
-        self.phase = (self.phase + frames * phase_increment) % (2 * np.pi)
-        
-        # Write to output buffer
-        outdata[:, 0] = samples
+STARTUP_TIME = time.perf_counter()  # For the time to first tone
 
-    def start(self):
-        """Start the continuous tone"""
-        if not self.running:
-            self.running = True
-            self.stream = sd.OutputStream(
-                channels=1,
-                samplerate=self.sample_rate,
-                callback=self.audio_callback
-            )
-            self.stream.start()
-    
-    def set_frequency(self, freq):
-        """Update the frequency of the tone"""
-        # Put the new frequency in the queue
-        if self.running:
-            # Clear queue to avoid backlog
-            while not self.freq_queue.empty():
-                self.freq_queue.get()
-            self.freq_queue.put(freq)
-    
-    def stop(self):
-        """Stop the continuous tone"""
-        self.running = False
-        if self.stream:
-            self.stream.stop()
-            self.stream.close()
-            self.stream = None
-
-class BluetoothDelegate(NSObject):
-    def init(self):
-        self = objc.super(BluetoothDelegate, self).init()
-        if self is None:
-            return None
-        self.devices = {}          # Mapping: serial number -> peripheral
-        self.device_counter = 0    # To assign serial numbers
-        self.selected_peripheral = None
+# numpy and everything built on it (audio, positioning) are imported where
+# first needed, so the radio can start while they load; see AudioWarmUp and
+# `python -X importtime bluetooth_nav.py` / benchmarks/bench_startup.py
+from ble_pipeline import RSSI_UNAVAILABLE, EventLoopThread, LoopBridge
+from connection_state import BACKOFF, CONNECTED, CONNECTING, DISCONNECTED, FAILED, RECOVERY_BUCKETS, Link
+from device_cache import DeviceCache
+from device_registry import DeviceRegistry, RankingWatch
+from frequency_map import FrequencyMap
+from latency import LatencyTracer
+from metrics import REGISTRY, MetricsReporter, MetricsServer
+from radio_backend import BACKENDS, get_backend
+from rssi_filters import RateMeter, make_filter
+from rssi_scheduler import RSSIReadScheduler
+
+
+class AudioWarmUp:
+    """Builds and starts a muted VoicePool on a background thread.
+
+    Importing numpy and opening the audio device take a few hundred
+    milliseconds on a cold start. Pass an AudioWarmUp as the delegate's
+    voice pool and that happens while the delegate, its event loop and the
+    optional services are set up; call result() before starting the radio,
+    so that a missing audio device is reported up front.
+    """
+    def __init__(self, sink='device', low_latency=False, channels=2, spatial=None):
+        self.sink = sink
+        self.low_latency = low_latency
+        self.channels = channels
+        self.spatial = spatial  # 'stereo' or 'binaural' to place voices by bearing
+        self._pool = None
+        self._error = None
+        self._done = threading.Event()
+        threading.Thread(target=self._build, name='audio-warm-up', daemon=True).start()
+
+    def _build(self):
+        try:
+            from audio_sink import stream_factory_for
+            from voice_mixer import VoicePool
+            pool = VoicePool(channels=self.channels, stream_factory=stream_factory_for(self.sink))
+            if self.low_latency:
+                pool.enable_low_latency()
+            if self.spatial:
+                pool.enable_spatial(self.spatial)
+            pool.start()  # Every voice starts muted
+            self._pool = pool
+        except Exception as e:
+            self._error = e
+        finally:
+            self._done.set()
+
+    def result(self, timeout=None):
+        """The started VoicePool, waiting for it if needed; raises whatever building it raised"""
+        self._done.wait(timeout)
+        if self._error is not None:
+            raise self._error
+        return self._pool
+
+    def started(self):
+        """The VoicePool once building it has finished, or None if it failed"""
+        self._done.wait()
+        return self._pool
+
+
+def _frequency_map_setting(name):
+    """Delegate attribute stored on the FrequencyMap, so changing it rebuilds the table"""
+    return property(lambda self: getattr(self.frequency_map, name),
+                    lambda self, value: setattr(self.frequency_map, name, value))
+
+class BluetoothDelegate:
+    """Tracks BLE devices and turns the RSSI of each into its own continuous tone.
+
+    Every tracked device gets an RSSI pipeline (read scheduler and filter) and
+    a voice in one shared VoicePool, with its own stereo position and timbre,
+    so all beacons play through a single mixed audio stream. The first device
+    picked is the primary one.
+
+    Each connection is a connection_state.Link, which reconnects as soon as
+    the link drops, retries failed attempts with jittered backoff and
+    catches links that go silent without a disconnect. While a link is down
+    the device's advertisements drive its tone instead, so the feedback
+    carries on during the reconnect. A device not heard at all (no reads, no
+    advertisements) for `advertisement_timeout` seconds plays the
+    disconnected sound until it is heard again.
+
+    With passive=True nothing is connected: discovery keeps running and the
+    RSSI of each tracked device's advertisements drives its pipeline, so any
+    number of beacons can be followed at their advertising rate with no
+    link to lose.
+
+    All delegate state lives on one asyncio event loop thread. The backend
+    talks to a LoopBridge, which forwards events to the methods below on the
+    loop and feeds RSSI readings through the filter -> map -> audio pipeline;
+    stats and the connection monitor run as timers on the same loop.
+
+    Nothing on the RSSI path prints: it only updates metrics (see metrics.py),
+    which a low-priority reporter thread prints every few seconds and
+    serve_metrics() can export for Prometheus.
+
+    Receives radio events from a RadioBackend (CoreBluetooth, or the simulator
+    for headless runs) through the CoreBluetooth delegate method names.
+    """
+    min_rssi = _frequency_map_setting('min_rssi')
+    max_rssi = _frequency_map_setting('max_rssi')
+    min_freq = _frequency_map_setting('min_freq')
+    max_freq = _frequency_map_setting('max_freq')
+    frequency_curve = _frequency_map_setting('curve')
+    frequency_curve_factor = _frequency_map_setting('curve_factor')
+
+    def __init__(self, backend, voice_pool=None, batch_interval=0.01, passive=False):
+        self.registry = DeviceRegistry(max_age=60.0)  # Advertisers in range, by identifier and serial number
+        self.selected_peripheral = None  # Primary tracked device
+        self.tracked = []          # All tracked peripherals, in selection order
         self.running = True
-        self.manager = None        # Will hold the CBCentralManager instance
+        self.passive = passive     # Track from advertisements only, without connecting
+        self.backend = backend     # Radio stack we scan, connect and read RSSI through
+        self.clock = backend.clock
+        
+        # RSSI -> frequency lookup table; the settings below are stored on it
+        self.frequency_map = FrequencyMap()
         
         # Sound and RSSI related attributes
         self.min_rssi = -100       # Weak signal (far away)
@@ -92,380 +137,742 @@ class BluetoothDelegate(NSObject):
         self.max_freq = 1760       # Highest frequency in Hz (A6) - much wider range
         
         # RSSI smoothing for more natural frequency changes
-        self.rssi_history = []
-        self.max_history_size = 3  # Number of readings to average
+        self.filter_kind = 'moving_average'  # 'moving_average', 'ema', 'median' or 'kalman'
+        self.max_history_size = 3  # Number of readings to average (moving_average/median)
+        self.filter_options = {}   # Extra options for the filter, e.g. {'alpha': 0.3} for 'ema'
+        self.rssi_filters = {}     # Mapping: peripheral -> its streaming filter
         self.last_rssi = None
         
         # Fine-tuning parameters
-        self.frequency_curve = 'logarithmic'  # 'linear', 'logarithmic', or 'exponential'
+        self.frequency_curve = 'logarithmic'  # 'linear', 'logarithmic', 'exponential' or a callable
         self.frequency_curve_factor = 2.0     # Curve steepness factor
         
-        # High-performance scanning
-        self.scan_threads = []
-        self.scan_threads_count = 10  # Increased from 5 to 10 threads
-        self.scan_thread_delay = 0.0001  # Extremely minimal delay between reads
-        self.last_successful_read_time = time.time()
+        # High-performance scanning: reads are issued from the RSSI callback
+        self.rssi_schedulers = {}  # Mapping: peripheral -> its RSSIReadScheduler
+        self.max_reads_in_flight = 4  # Upper bound on outstanding readRSSI() requests
         self.rssi_updates_per_second = 0
         self.rssi_updates_count = 0
-        self.rssi_update_times = []
-        self.last_stats_time = time.time()
+        self.update_rate = RateMeter(window=1.0)
+        self.last_stats_time = self.clock()
         
-        # Connection state
-        self.is_connected = False
+        # Connection state: one Link state machine per connected device
+        self.links = {}            # Mapping: peripheral -> its Link
+        self.max_reconnect_attempts = 50  # Failed attempts in a row before a link gives up
+        self.connect_timeout = 2.0        # Seconds before an attempt is cancelled and retried
+        self.stall_timeout = 1.0          # Seconds without RSSI before a connected link counts as dead
+        self.advertisement_fallback = True  # Play advertisement RSSI while a link is down
+        self._fallback = set()     # Devices currently played from their advertisements
+        self.scanning = False
+        self._fallback_scan = False  # Whether discovery runs only for the fallback
+        
+        # Device selection: list the devices once the strongest ones stop changing,
+        # or pick known devices as soon as they turn up (see select_automatically)
+        self.ranking_size = 5             # How many of the strongest devices must settle
+        self.ranking_settle = 1.0         # Seconds they must stay the same
+        self.discovery_min_wait = 1.0
+        self.discovery_max_wait = 10.0
+        self.auto_select = []             # Identifiers or names to track without asking
+        self.selection_made = threading.Event()
+        self.device_cache = None          # DeviceCache of the devices picked (see use_device_cache)
+        self.first_tone = None            # Seconds from startup to the first published frequency
+        
+        # When each device was last heard, and those silent for too long
         self.connection_monitor_active = False
-        self.disconnection_time = None
-        self.reconnect_attempts = 0
-        self.max_reconnect_attempts = 50  # Maximum number of reconnection attempts
+        self.last_heard = {}
+        self.out_of_range = set()
+        self.advertisement_timeout = 3.0
+        self._silence_phase = 0
+        
+        # Telemetry: the hot paths only bump these; print_stats reports them
+        self.metrics = REGISTRY
+        self.rssi_readings = self.metrics.counter('echonav_rssi_readings_total', 'RSSI readings processed')
+        self.rssi_errors = self.metrics.counter('echonav_rssi_errors_total', 'RSSI reads that returned an error')
+        self.reconnects = self.metrics.counter('echonav_reconnects_total', 'Reconnection attempts')
+        self.link_stalls = self.metrics.counter('echonav_link_stalls_total',
+                                                'Links that went silent without a disconnect event')
+        self.recovery_time = self.metrics.histogram(
+            'echonav_link_recovery_seconds', 'Time from losing a link to having it back', RECOVERY_BUCKETS)
+        self.batch_latency = self.metrics.histogram(
+            'echonav_rssi_batch_seconds', 'Time from taking a batch of readings off the bridge to updating the voices')
+        self.metrics.gauge('echonav_rssi_rate', 'RSSI readings per second over the last second',
+                           lambda: self.rssi_updates_per_second)
+        self.metrics.gauge('echonav_reads_in_flight', 'Outstanding RSSI reads per device',
+                           lambda: self._scheduler_stats('window'), label='device')
+        self.metrics.gauge('echonav_read_rate_hz', 'RSSI reads completed per second per device',
+                           lambda: self._scheduler_stats('achieved_hz'), label='device')
+        self.stats_reporter = MetricsReporter(self.print_stats, interval=5.0)
+        self.metrics_server = None
+        self._batch_started = 0.0
+        self._batch_filtered = 0.0
+        
+        # Optional request -> speaker latency histograms (see enable_latency_tracing)
+        self.latency_tracer = None
         
-        # Initialize the continuous tone generator
-        self.tone_generator = ContinuousToneGenerator(initial_freq=self.min_freq)
+        # One stereo stream; each tracked device plays as a voice in it
+        if voice_pool is None:
+            from voice_mixer import VoicePool
+            voice_pool = VoicePool(channels=2)
+        self._voice_pool = voice_pool  # May be an AudioWarmUp until first used
+        self.voices = {}           # Mapping: peripheral -> its Voice
+        self._tracking_announced = False  # How the tones work is explained on the first connection
         
-        return self
+        # Optional position estimate from beacons at known spots (see enable_positioning)
+        self.position_engine = None
+        self.heading = 0.0         # Radians clockwise from the map's +y axis the listener faces (for bearings)
+        
+        # Optional binary log of every reading (see start_recording)
+        self.trace_recorder = None
+        
+        # Event loop that runs the delegate, and the bridge the backend calls into
+        self.loop_thread = EventLoopThread()
+        self.loop = self.loop_thread.loop
+        self.bridge = LoopBridge(self.loop, self, on_rssi=self._on_radio_rssi,
+                                 on_link=self._on_radio_link,
+                                 batch_interval=batch_interval,  # Max wait before a reading is processed
+                                 clock=self.clock)
+        self._pipeline_task = None
+        self._stats_timer = None
+        self._monitor_timer = None
+        self._expire_timer = None
+        backend.set_listener(self.bridge)
+        self.loop_thread.start()
+        self.loop_thread.call(self._start_pipeline)
+
+    @property
+    def voice_pool(self):
+        """The VoicePool, waiting for it if it is still warming up"""
+        pool = self._voice_pool
+        if isinstance(pool, AudioWarmUp):
+            pool = self._voice_pool = pool.result()
+        return pool
 
     def centralManagerDidUpdateState_(self, central):
-        self.manager = central  # Save reference to the central manager
-        if central.state() == 5:  # CBManagerStatePoweredOn
-            NSLog("Bluetooth is powered on, scanning for devices...")
-            
-            # Use scan options to improve device discovery
-            scan_options = {
-                'CBCentralManagerScanOptionAllowDuplicatesKey': True
-            }
-            central.scanForPeripheralsWithServices_options_(None, scan_options)
+        if central.is_powered_on():
+            print("Bluetooth is powered on, scanning for devices...")
+            self.scanning = True
+            central.start_discovery()
+            # Devices the system already knows can be connected without waiting for an advertisement
+            if self.auto_select:
+                for peripheral in central.retrieve_peripherals(self.auto_select):
+                    self._auto_select(peripheral)
         else:
-            NSLog("Bluetooth state: %d" % central.state())
+            print(f"Bluetooth state: {central.state()}")
 
     def centralManager_didDiscoverPeripheral_advertisementData_RSSI_(self, central, peripheral, data, rssi):
-        # Only add new peripherals
-        if peripheral in self.devices.values():
+        identifier = self.backend.identifier_of(peripheral)
+        now = self.clock()
+        # Every measured advertisement is a reading for the position engine
+        if self.position_engine and rssi != RSSI_UNAVAILABLE:
+            self.position_engine.observe(identifier, rssi, now)
+        if self.trace_recorder:
+            self.trace_recorder.record_advertisement(identifier, rssi, when=now, name=peripheral.name())
+        
+        # Only announce new peripherals; repeats just update their record
+        record, new = self.registry.observe(identifier, peripheral, rssi, data, now)
+        if new:
+            print(f"[{record.number}] {record.name or 'Unnamed'} (RSSI: {rssi})")
+            if self.auto_select and (identifier in self.auto_select or record.name in self.auto_select):
+                self._auto_select(peripheral)
+
+    def _expire_devices(self):
+        """Forget advertisers not heard for a while, except tracked ones; re-arms every 5 s"""
+        if not self.running:
             return
+        self.registry.expire(self.clock(), keep=lambda record: record.peripheral in self.voices)
+        self._expire_timer = self.loop.call_later(5.0, self._expire_devices)
 
-        self.device_counter += 1
-        self.devices[self.device_counter] = peripheral
-        peripheral_name = peripheral.name() or "Unnamed"
-        print(f"[{self.device_counter}] {peripheral_name} (RSSI: {rssi})")
+    def select_automatically(self, devices):
+        """Track these devices (identifiers or names) as soon as they are found, without asking"""
+        self.auto_select = list(devices)
+
+    def use_device_cache(self, cache=None, reuse=True):
+        """Remember the devices picked in a DeviceCache; with reuse, pick the last session's again"""
+        self.device_cache = cache or DeviceCache()
+        if reuse and not self.auto_select:
+            self.select_automatically(self.device_cache.last_session())
+        return self.device_cache
+
+    def _auto_select(self, peripheral):
+        identifier = self.backend.identifier_of(peripheral)
+        name = peripheral.name()
+        wanted = [device for device in self.auto_select if device not in (identifier, name)]
+        if len(wanted) == len(self.auto_select) or peripheral in self.voices:
+            return
+        self.auto_select = wanted
+        print(f"Found {name or identifier}, tracking it")
+        self.connect_devices([peripheral])
+        self.selection_made.set()
+
+    def wait_for_discovery(self):
+        """Wait until the device list is worth showing; returns it, or None if devices were picked automatically.
+
+        The list is ready once the `ranking_size` strongest devices have
+        stayed the same for `ranking_settle` seconds (but no sooner than
+        discovery_min_wait and no later than discovery_max_wait). While
+        devices to pick automatically are outstanding it waits the maximum.
+        """
+        watch = RankingWatch(self.ranking_size, self.ranking_settle)
+        start = time.monotonic()
+        while not self.selection_made.wait(0.1):
+            elapsed = time.monotonic() - start
+            records = self.loop_thread.call_wait(list, self.registry)  # Snapshot taken on the loop
+            settled = watch.update(records, elapsed) and not self.auto_select
+            if (settled and elapsed >= self.discovery_min_wait) or elapsed >= self.discovery_max_wait:
+                return records
+        
+        # Give any other devices to pick automatically until the deadline to turn up
+        while self.auto_select and time.monotonic() - start < self.discovery_max_wait:
+            time.sleep(0.1)
+        return None
 
     def prompt_for_device_selection(self):
-        # Wait for 10 seconds before prompting so that some devices are discovered.
-        time.sleep(10)
-        self.manager.stopScan()
-        if not self.devices:
+        """Ask which devices to track once discovery has settled, unless they were picked automatically"""
+        records = self.wait_for_discovery()
+        if not self.passive:
+            self.scanning = False
+            self.backend.stop_discovery()  # Passive tracking listens to the advertisements
+        if records is None:
+            self._remember_devices(self.loop_thread.call_wait(list, self.tracked))
+            return
+        self.auto_select = []  # Too late: the user picks now
+        if not records:
             print("No devices found.")
             return
         print("\nDiscovered devices:")
-        for num, periph in self.devices.items():
-            print(f"[{num}] {periph.name() or 'Unnamed'}")
+        for record in records:
+            print(f"[{record.number}] {record.name or 'Unnamed'} (RSSI: {record.mean_rssi:.0f}, "
+                  f"{record.advertisements} advertisements)")
+        devices = {record.number: record.peripheral for record in records}
         while True:
             try:
-                choice = int(input("Enter device number to track: "))
-                if choice in self.devices:
-                    self.selected_peripheral = self.devices[choice]
+                choices = [int(c) for c in input("Enter device number(s) to track: ").replace(',', ' ').split()]
+                if choices and all(c in devices for c in choices):
                     break
                 else:
                     print("Invalid number. Please try again.")
             except ValueError:
-                print("Please enter a valid number.")
-        print(f"Connecting to {self.selected_peripheral.name()}...")
-        self.manager.connectPeripheral_options_(self.selected_peripheral, None)
+                print("Please enter valid numbers.")
+        peripherals = [devices[c] for c in dict.fromkeys(choices)]
+        self.loop_thread.call(self.connect_devices, peripherals)
+        self._remember_devices(peripherals)
+
+    def _remember_devices(self, peripherals):
+        if self.device_cache and peripherals:
+            self.device_cache.remember((self.backend.identifier_of(peripheral), peripheral.name())
+                                       for peripheral in peripherals)
+
+    def connect_devices(self, peripherals):
+        """Track and connect to each of the given devices (or listen to them in passive mode)"""
+        for peripheral in peripherals:
+            if self.passive:
+                self.track_advertisements(peripheral)
+                continue
+            self.track_peripheral(peripheral)
+            print(f"Connecting to {peripheral.name()}...")
+            self.links[peripheral].start()
+
+    def track_peripheral(self, peripheral):
+        """Give a device its own voice and read scheduler; the first device becomes the primary one"""
+        if peripheral in self.voices:
+            return self.voices[peripheral]
+        index = len(self.tracked)
+        self.tracked.append(peripheral)
+        if self.selected_peripheral is None:
+            self.selected_peripheral = peripheral
+        # Spread voices across the stereo field and cycle timbres so they stay distinguishable
+        pan = 0.0 if index == 0 else ((index * 0.618034) % 1.0) * 2 - 1
+        timbre = (index % 4) * 0.4
+        voice = self.voice_pool.allocate(self.min_freq, amplitude=0.0, pan=pan, timbre=timbre)
+        
+        # Keep a few RSSI reads in flight; each callback issues the next one
+        if not self.passive:
+            self.rssi_schedulers[peripheral] = RSSIReadScheduler(
+                functools.partial(self.backend.read_rssi, peripheral),
+                max_in_flight=self.max_reads_in_flight,
+                clock=self.clock,
+                call_later=self.backend.call_later
+            )
+            self.links[peripheral] = Link(
+                peripheral, self.backend.connect, self.backend.disconnect, self.loop.call_later,
+                heard=functools.partial(self.last_heard.get, peripheral),
+                clock=self.clock,
+                connect_timeout=self.connect_timeout,
+                stall_timeout=self.stall_timeout,
+                max_attempts=self.max_reconnect_attempts,
+                on_state=self._on_link_state
+            )
+        self.last_heard[peripheral] = self.clock()
+        self.voices[peripheral] = voice
+        return voice
+
+    def track_advertisements(self, peripheral):
+        """Passive mode: play a device from the RSSI of its advertisements, without connecting"""
+        voice = self.track_peripheral(peripheral)
+        self.bridge.track_advertisements(peripheral)
+        print(f"Listening to {peripheral.name() or 'Unnamed'} (no connection)...")
+        
+        self.voice_pool.start()
+        voice.set_amplitude(0.3)
+        if self._stats_timer is None:
+            self.start_stats_reporting()
+        if not self.connection_monitor_active:
+            self.start_connection_monitor()
+        return voice
+
+    def _on_radio_link(self, peripheral, connected):
+        """Radio thread: start or stop reads as soon as the link changes"""
+        scheduler = self.rssi_schedulers.get(peripheral)
+        if scheduler:
+            if connected:
+                scheduler.start()
+            else:
+                # Reads die with the connection; resume when it comes back
+                scheduler.stop()
+
+    def _on_radio_rssi(self, peripheral, error):
+        """Radio thread: issue the next read right away so the link never goes idle"""
+        scheduler = self.rssi_schedulers.get(peripheral)
+        if scheduler:
+            return scheduler.on_read_complete(error)  # When the answered read was issued
+        return None
+
+    @property
+    def is_connected(self):
+        """Whether the primary device's link is up"""
+        link = self.links.get(self.selected_peripheral)
+        return link is not None and link.state == CONNECTED
 
     def centralManager_didConnectPeripheral_(self, central, peripheral):
-        if peripheral == self.selected_peripheral:
-            NSLog("Connected to %s" % (peripheral.name() or "Unnamed"))
-            peripheral.setDelegate_(self)
-            print("Starting continuous tone proximity tracking...")
-            print("Closer = higher frequency tone, Further = lower frequency tone")
-            
-            # Update connection state
-            self.is_connected = True
-            self.disconnection_time = None
-            self.reconnect_attempts = 0
+        voice = self.voices.get(peripheral)
+        if voice is not None:
+            link = self.links.get(peripheral)
+            if link:
+                link.on_connected()
+            if link and link.last_downtime is not None:
+                print(f"Reconnected to {peripheral.name() or 'Unnamed'} after {link.last_downtime:.2f} s")
+            else:
+                print(f"Connected to {peripheral.name() or 'Unnamed'}")
+                if not self._tracking_announced:
+                    self._tracking_announced = True
+                    print("Starting continuous tone proximity tracking...")
+                    print("Closer = higher frequency tone, Further = lower frequency tone")
             
-            # Start the continuous tone
-            self.tone_generator.start()
+            # Start the mixed audio stream and unmute this device's voice
+            self.voice_pool.start()
+            voice.set_amplitude(0.3)
             
-            # Apply high-performance settings to the peripheral
-            try:
-                # Try to optimize peripheral settings
-                peripheral.setValue_forKey_(NSNumber.numberWithFloat_(0.01), "notifyOnNotificationTimeout")
-            except:
-                pass
-                
-            # Warmup the BLE stack with an initial burst of RSSI requests
-            # This helps establish a higher scan rate from the beginning
-            print("Warming up BLE scanning for maximum responsiveness...")
-            self.warmup_rssi_scanning(peripheral)
-            
-            # Start high-performance scanning for RSSI values
-            if not self.scan_threads:
-                self.start_high_performance_scanning(peripheral)
-            
-            # Start stats reporting thread
-            if not hasattr(self, 'stats_thread') or not self.stats_thread.is_alive():
+            # Start stats reporting
+            if self._stats_timer is None:
                 self.start_stats_reporting()
             
             # Start connection monitoring
             if not self.connection_monitor_active:
                 self.start_connection_monitor()
 
-    def warmup_rssi_scanning(self, peripheral):
-        """Perform initial burst of RSSI readings to maximize scan rate from the start"""
-        def warmup():
-            # Create a dedicated runloop for the warmup
-            warmup_loop = NSRunLoop.currentRunLoop()
-            
-            # Send 100 RSSI requests in rapid succession to "warm up" the BLE stack
-            for _ in range(100):
-                try:
-                    peripheral.readRSSI()
-                    # Process events immediately
-                    warmup_loop.runMode_beforeDate_(
-                        NSDefaultRunLoopMode,
-                        NSDate.dateWithTimeIntervalSinceNow_(0.001)
-                    )
-                    time.sleep(0.001)
-                except:
-                    pass
-                    
-        # Run warmup in a separate thread
-        warmup_thread = threading.Thread(target=warmup, daemon=True)
-        warmup_thread.start()
+    def start_stats_reporting(self):
+        """Refresh stats every second from an event loop timer and print them every few seconds"""
+        self._stats_timer = self.loop.call_later(1.0, self._report_stats)
+        self.stats_reporter.start()
+
+    def _report_stats(self):
+        if not self.running:
+            return
         
-        # Give the warmup a moment to get started
-        time.sleep(0.5)
-
-    def start_high_performance_scanning(self, peripheral):
-        """Start multiple threads for high-performance RSSI scanning"""
-        def scan_loop():
-            """Thread function for continuous RSSI scanning"""
-            run_loop = NSRunLoop.currentRunLoop()
-            
-            # Pre-allocate date object to minimize overhead
-            next_date = NSDate.dateWithTimeIntervalSinceNow_(0.001)
+        # Calculate updates per second
+        current_time = self.clock()
+        elapsed = current_time - self.last_stats_time
+        
+        if elapsed >= 1.0:
+            # Calculate rate
+            self.rssi_updates_per_second = self.update_rate.rate(current_time)
             
-            while self.running:
-                try:
-                    # Request RSSI reading
-                    peripheral.readRSSI()
-                    
-                    # Process the runloop immediately to handle callbacks
-                    run_loop.runMode_beforeDate_(
-                        NSDefaultRunLoopMode,
-                        next_date
-                    )
-                    
-                    # Minimize delay between scans for faster updates
-                    time.sleep(0.00005)  # Reduced delay to 50 microseconds
-                except Exception as e:
-                    # Shorter sleep on error for faster recovery
-                    time.sleep(0.01)
+            # Refresh the schedulers' rate/CPU figures
+            for scheduler in list(self.rssi_schedulers.values()):
+                scheduler.tick()
+            self.last_stats_time = current_time
         
-        # Start multiple threads for better throughput
-        if not self.scan_threads:
-            for i in range(self.scan_threads_count):
-                thread = threading.Thread(target=scan_loop, daemon=True)
-                thread.start()
-                self.scan_threads.append(thread)
-                
-            print(f"Started {self.scan_threads_count} high-performance scanning threads")
+        self._stats_timer = self.loop.call_later(1.0, self._report_stats)  # Update stats every second
 
-    def start_stats_reporting(self):
-        """Start a thread to periodically report scanning performance stats"""
-        def stats_loop():
-            while self.running:
-                time.sleep(1.0)  # Update stats every second
+    def _scheduler_stats(self, attribute):
+        """{device identifier: scheduler attribute} for the per-device gauges"""
+        return {self.backend.identifier_of(peripheral): getattr(scheduler, attribute)
+                for peripheral, scheduler in list(self.rssi_schedulers.items())}
+
+    def print_stats(self):
+        """Print a summary of the metrics; runs on the reporter thread"""
+        latency = self.batch_latency
+        counts = latency.snapshot()[0]
+        p50, p99 = latency.quantile(0.5, counts), latency.quantile(0.99, counts)
+        schedulers = list(self.rssi_schedulers.items())
+        print(f"RSSI updates per second: {self.rssi_updates_per_second:.0f} "
+              f"({len(self.tracked)} device(s)), errors: {self.rssi_errors.value}, "
+              f"reconnects: {self.reconnects.value}, audio underruns: {self.voice_pool.underruns.value}")
+        if p50 is not None:
+            print(f"  pipeline batch latency: p50 {p50 * 1000:.2f} ms, p99 {p99 * 1000:.2f} ms")
+        if self.latency_tracer:
+            count, p50, p99, p999 = self.latency_tracer.summary()['audible']
+            if count:
+                print(f"  read -> audible: p50 {p50 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms, "
+                      f"p99.9 {p999 * 1000:.1f} ms")
+        recovery = self.recovery_time.snapshot()[0]
+        if sum(recovery):
+            print(f"  link recovery: p50 {self.recovery_time.quantile(0.5, recovery) * 1000:.0f} ms, "
+                  f"p99 {self.recovery_time.quantile(0.99, recovery) * 1000:.0f} ms, "
+                  f"stalls: {self.link_stalls.value}")
+        for peripheral, scheduler in schedulers:
+            link = self.links.get(peripheral)
+            print(f"  {peripheral.name() or 'Unnamed'}: "
+                  f"link: {link.state if link else 'none'}, "
+                  f"reads in flight: {scheduler.window}, "
+                  f"latency: {(scheduler.latency or 0) * 1000:.1f} ms, "
+                  f"achieved: {scheduler.achieved_hz:.1f} Hz, "
+                  f"scheduler CPU: {scheduler.cpu_percent:.1f}%")
+        controller = self.voice_pool.latency_controller
+        if controller:
+            print(f"  audio: {self.voice_pool.blocksize} frames per block "
+                  f"({controller.block_duration * 1000:.1f} ms), load {(controller.load or 0) * 100:.0f}%, "
+                  f"{self.voice_pool.reconfigurations} block size change(s)")
+        engine = self.position_engine
+        if engine and engine.position is not None:
+            print(f"Position: ({engine.position[0]:.1f}, {engine.position[1]:.1f}) m, "
+                  f"+/- {engine.accuracy:.1f} m from {engine.anchors_used} anchors")
+
+    def serve_metrics(self, port=9464, host='127.0.0.1'):
+        """Export the metrics in Prometheus text format at http://host:port/metrics"""
+        self.metrics_server = MetricsServer(self.metrics, host, port).start()
+        return self.metrics_server
+
+    def enable_positioning(self, anchors, **options):
+        """Estimate position from beacons at known spots (see positioning.PositionEngine).
+
+        `anchors` maps peripheral identifier -> (x, y) in metres, or is the path
+        of a JSON file with that mapping. Advertisements and RSSI reads of those
+        devices feed the engine, which updates on a timer on the event loop.
+        """
+        from positioning import PositionEngine, load_anchors
+        if isinstance(anchors, str):
+            anchors = load_anchors(anchors)
+        options.setdefault('on_position', self._update_bearings)
+        self.position_engine = PositionEngine(anchors, **options)
+        self.loop_thread.call(self.position_engine.start, self.loop.call_later, self.clock)
+        return self.position_engine
+
+    def _update_bearings(self, engine):
+        """Point each tracked anchor's voice at its direction from the estimated position"""
+        x, y = engine.position
+        for peripheral, voice in self.voices.items():
+            i = engine.index.get(self.backend.identifier_of(peripheral))
+            if i is not None:
+                ax, ay = engine.anchors[i]
+                voice.set_bearing(math.atan2(ax - x, ay - y) - self.heading)
+
+    def enable_latency_tracing(self, registry=None):
+        """Time each published reading from its readRSSI() request to the audio block that plays it.
+
+        See latency.LatencyTracer; the histograms join the other metrics and
+        latency_tracer.report() dumps their percentiles.
+        """
+        self.latency_tracer = LatencyTracer(registry or self.metrics, clock=self.clock)
+        self.latency_tracer.attach(self.voice_pool)
+        return self.latency_tracer
+
+    def start_recording(self, path):
+        """Log every reading with its smoothed value and frequency to a binary trace (see trace_log)"""
+        from trace_log import TraceRecorder
+        self.trace_recorder = TraceRecorder(path, clock=self.clock)
+        return self.trace_recorder
+
+    def _start_pipeline(self):
+        self._pipeline_task = self.loop.create_task(self.rssi_pipeline())
+        self._expire_timer = self.loop.call_later(5.0, self._expire_devices)
+
+    async def rssi_pipeline(self):
+        """RSSI readings from the bridge -> smoothing -> frequency -> voices"""
+        smoothed = self.filter_stage(self.bridge.batches())
+        await self.audio_stage(self.map_stage(smoothed))
+
+    async def filter_stage(self, batches):
+        """Smooth each reading with its device's filter; yields (peripheral, time, rssi, smoothed, requested) lists"""
+        async for batch in batches:
+            self._batch_started = time.perf_counter()
+            readings = []
+            for event in batch:
+                peripheral = event.peripheral
+                if peripheral not in self.voices:
+                    continue
                 
-                # Calculate updates per second
-                current_time = time.time()
-                elapsed = current_time - self.last_stats_time
+                # When the device was last heard, for the link watchdog and the silence monitor
+                self.last_heard[peripheral] = event.time
                 
-                if elapsed >= 1.0:
-                    # Clean old timestamps
-                    while self.rssi_update_times and self.rssi_update_times[0] < current_time - 1.0:
-                        self.rssi_update_times.pop(0)
-                        
-                    # Calculate rate
-                    self.rssi_updates_per_second = len(self.rssi_update_times)
-                    
-                    # Only print every 5 seconds to reduce console spam
-                    if int(current_time) % 5 == 0:
-                        print(f"RSSI updates per second: {self.rssi_updates_per_second}")
-                        
-                    self.last_stats_time = current_time
-        
-        stats_thread = threading.Thread(target=stats_loop, daemon=True)
-        stats_thread.start()
-
-    def peripheral_didReadRSSI_error_(self, peripheral, rssi, error):
-        """Called when RSSI is read from the peripheral"""
-        if peripheral != self.selected_peripheral:
-            return
+                if event.error:
+                    # Counted rather than printed to keep the console quiet
+                    self.rssi_errors.inc()
+                    continue
+                
+                if self.position_engine:
+                    self.position_engine.observe(self.backend.identifier_of(peripheral), event.rssi, event.time)
+                
+                # Get smoothed RSSI value from this device's streaming filter
+                smoothed_rssi = self.filter_for(peripheral).update(event.rssi)
+                
+                # Track update rate
+                self.update_rate.mark(event.time)
+                readings.append((peripheral, event.time, event.rssi, smoothed_rssi, event.requested))
             
-        # Update last successful read time for monitoring
-        self.last_successful_read_time = time.time()
-        
-        if error:
-            # Silently ignore errors to prevent console spam
-            return
+            self._batch_filtered = self.clock()
+            if readings:
+                self.last_rssi = readings[-1][3]
+                self.rssi_updates_count += len(readings)
+                self.rssi_readings.inc(len(readings))
+            yield readings
+
+    async def map_stage(self, batches):
+        """Add the tone frequency for each smoothed RSSI value"""
+        calculate_frequency = self.calculate_frequency
+        async for batch in batches:
+            yield [(peripheral, when, rssi, smoothed, requested, calculate_frequency(smoothed))
+                   for peripheral, when, rssi, smoothed, requested in batch]
+
+    async def audio_stage(self, batches):
+        """Hand the newest frequency of each device to its voice"""
+        async for batch in batches:
+            latest = {}
+            recorder = self.trace_recorder
+            tracer = self.latency_tracer
+            if tracer:
+                tracer.collect(self.voice_pool)
+            for peripheral, when, rssi_val, smoothed_rssi, requested, frequency in batch:
+                if recorder:
+                    recorder.record(self.backend.identifier_of(peripheral), rssi_val, smoothed_rssi, frequency, when,
+                                    name=peripheral.name())
+                latest[peripheral] = (frequency, when, requested)
             
-        # Get the RSSI value
-        rssi_val = rssi.intValue()
-        
-        # Add to history and maintain maximum size
-        self.rssi_history.append(rssi_val)
-        if len(self.rssi_history) > self.max_history_size:
-            self.rssi_history.pop(0)
-        
-        # Get smoothed RSSI value (average of recent readings)
-        smoothed_rssi = sum(self.rssi_history) / len(self.rssi_history)
-        self.last_rssi = smoothed_rssi
-        
-        # Track update rate
-        current_time = time.time()
-        self.rssi_update_times.append(current_time)
-        self.rssi_updates_count += 1
-        
-        # Update tone frequency based on the smoothed RSSI value
-        frequency = self.calculate_frequency(smoothed_rssi)
-        self.tone_generator.set_frequency(frequency)
-        
-        # Dynamically adjust scan thread delay based on update rate
-        # If we're getting fewer than 5 updates per second, decrease delay
-        if len(self.rssi_update_times) < 5 and self.scan_thread_delay > 0.0001:
-            self.scan_thread_delay = max(0.0001, self.scan_thread_delay * 0.9)
-        
-        # Print RSSI value and frequency to the terminal
-        print(f"RSSI: {rssi_val}, Smoothed RSSI: {smoothed_rssi:.1f}, Frequency: {frequency:.1f}Hz")
-        
-        # Print occasionally (every 5 seconds) to avoid console spam
-        if int(current_time) % 5 == 0 and int(current_time * 10) % 10 == 0:
-            print(f"RSSI updates per second: {self.rssi_updates_per_second}")
+            # The audio callback only picks up the newest value per block anyway
+            for peripheral, (frequency, when, requested) in latest.items():
+                voice = self.voices[peripheral]
+                sequence = voice.set_frequency(frequency)
+                if tracer:
+                    tracer.published(voice.slot, sequence, requested, when, self._batch_filtered)
+            if batch:
+                self.batch_latency.observe(time.perf_counter() - self._batch_started)
+                if self.first_tone is None:
+                    self.first_tone = time.perf_counter() - STARTUP_TIME
+                    print(f"First tone {self.first_tone * 1000:.0f} ms after startup")
+
+    def filter_for(self, peripheral):
+        """Return the RSSI filter for a device, creating it on first use"""
+        rssi_filter = self.rssi_filters.get(peripheral)
+        if rssi_filter is None:
+            options = dict(self.filter_options)
+            if self.filter_kind in ('moving_average', 'median'):
+                options.setdefault('window', self.max_history_size)
+            rssi_filter = make_filter(self.filter_kind, **options)
+            self.rssi_filters[peripheral] = rssi_filter
+        return rssi_filter
+
+    def set_device_filter(self, peripheral, kind, **options):
+        """Use a specific filter (see rssi_filters.FILTERS) for one device"""
+        self.rssi_filters[peripheral] = make_filter(kind, **options)
 
     def calculate_frequency(self, rssi):
         """Calculate tone frequency based on RSSI value with more granular mapping"""
-        # Ensure RSSI is within our defined range
-        clamped_rssi = max(min(rssi, self.max_rssi), self.min_rssi)
-        
-        # Normalize RSSI to [0, 1] range where 1 is closest
-        normalized = (clamped_rssi - self.min_rssi) / (self.max_rssi - self.min_rssi)
-        
-        # Apply chosen frequency curve for more natural sound progression
-        if self.frequency_curve == 'logarithmic':
-            # Logarithmic curve - more granular changes when further away
-            # This gives finer distinctions at lower signal strengths
-            adjusted = math.log(normalized * (self.frequency_curve_factor - 1) + 1) / math.log(self.frequency_curve_factor)
-        elif self.frequency_curve == 'exponential':
-            # Exponential curve - more granular changes when closer
-            # This gives finer distinctions at higher signal strengths
-            adjusted = math.pow(normalized, self.frequency_curve_factor)
-        else:  # 'linear'
-            adjusted = normalized
-        
-        # Apply frequency mapping using musical intervals for more pleasing sounds
-        # Using a logarithmic frequency scale like musical octaves
-        freq_ratio = self.max_freq / self.min_freq
-        frequency = self.min_freq * math.pow(freq_ratio, adjusted)
-        
-        return frequency
+        # Table lookup with interpolation; see FrequencyMap for the curves
+        return self.frequency_map(rssi)
 
     def centralManager_didDisconnectPeripheral_error_(self, central, peripheral, error):
-        if peripheral == self.selected_peripheral:
-            self.is_connected = False
-            self.disconnection_time = time.time()
-            print(f"Disconnected from {peripheral.name() or 'Unnamed'}")
-            
-            # Play a distinct "disconnected" sound pattern
-            self.play_disconnected_sound_pattern()
-            
-            # Try to reconnect immediately
-            print("Attempting to reconnect...")
-            central.connectPeripheral_options_(peripheral, None)
-            self.reconnect_attempts += 1
+        link = self.links.get(peripheral)
+        if link is None:
+            return
+        if link.state == CONNECTED:
+            print(f"Disconnected from {peripheral.name() or 'Unnamed'} - reconnecting...")
+        link.on_disconnected(error)
 
-    def play_disconnected_sound_pattern(self):
+    def _on_link_state(self, link, old, new):
+        """Count reconnects and outages, and play advertisement RSSI while a link is down"""
+        peripheral = link.peripheral
+        name = peripheral.name() or 'Unnamed'
+        if new == CONNECTED:
+            self._set_fallback(peripheral, False)
+            if link.last_downtime is not None:
+                self.recovery_time.observe(link.last_downtime)
+        elif old == CONNECTED and new != DISCONNECTED:
+            self._set_fallback(peripheral, self.advertisement_fallback)
+            if new == BACKOFF:
+                self.link_stalls.inc()
+                print(f"No RSSI from {name} for {link.stall_timeout:.1f} seconds - reconnecting...")
+        if new == CONNECTING and link.down_since is not None:
+            self.reconnects.inc()
+        elif new == FAILED:
+            print(f"Giving up on {name} after {link.attempts} attempts")
+
+    def _set_fallback(self, peripheral, enabled):
+        """Feed a device's advertisements to its pipeline (scanning if needed) while its link is down"""
+        if enabled == (peripheral in self._fallback):
+            return
+        self.bridge.track_advertisements(peripheral, enabled)
+        if enabled:
+            self._fallback.add(peripheral)
+            if not self.scanning:
+                self.scanning = self._fallback_scan = True
+                self.backend.start_discovery()
+        else:
+            self._fallback.discard(peripheral)
+            if not self._fallback and self._fallback_scan:
+                self.scanning = self._fallback_scan = False
+                self.backend.stop_discovery()
+
+    def play_disconnected_sound_pattern(self, peripheral=None):
         """Play a distinct sound pattern to indicate disconnection"""
         # Use a low frequency oscillation pattern
         base_freq = 150
-        self.tone_generator.set_frequency(base_freq)
+        voice = self.voices.get(peripheral or self.selected_peripheral)
+        if voice:
+            voice.set_frequency(base_freq)
 
     def start_connection_monitor(self):
-        """Start a thread to monitor connection status and handle reconnection"""
-        def connection_monitor_loop():
-            self.connection_monitor_active = True
-            disconnect_sound_alternator = 0
-            
-            while self.running:
-                time.sleep(0.5)  # Check every half second
-                
-                current_time = time.time()
-                
-                # Check if we're not connected
-                if not self.is_connected:
-                    # Play alternating tones when disconnected to make it obvious
-                    disconnect_sound_alternator = (disconnect_sound_alternator + 1) % 4
-                    
-                    if disconnect_sound_alternator == 0:
-                        self.tone_generator.set_frequency(150)  # Low tone
-                    elif disconnect_sound_alternator == 2:
-                        self.tone_generator.set_frequency(100)  # Even lower tone
-                    
-                    # Try to reconnect if we've been disconnected
-                    if self.disconnection_time and self.reconnect_attempts < self.max_reconnect_attempts:
-                        # Retry connection every 2 seconds
-                        if current_time - self.disconnection_time > 2.0:
-                            if self.selected_peripheral:
-                                print(f"Reconnection attempt {self.reconnect_attempts + 1}/{self.max_reconnect_attempts}...")
-                                self.manager.connectPeripheral_options_(self.selected_peripheral, None)
-                                self.reconnect_attempts += 1
-                                self.disconnection_time = current_time  # Reset timer
-                
-                # Check for silent disconnection (no RSSI updates for a while)
-                elif current_time - self.last_successful_read_time > 5.0:
-                    print("No RSSI updates for 5 seconds - device may be silently disconnected")
-                    # Mark as disconnected
-                    self.is_connected = False
-                    self.disconnection_time = current_time
-                    self.reconnect_attempts = 0
-                    
-                    # Try to disconnect and reconnect
-                    if self.selected_peripheral:
-                        try:
-                            self.manager.cancelPeripheralConnection_(self.selected_peripheral)
-                            time.sleep(1.0)
-                            self.manager.connectPeripheral_options_(self.selected_peripheral, None)
-                        except Exception as e:
-                            print(f"Error during reconnection: {str(e)}")
-            
+        """Watch for devices that go silent; the links watch their own connections"""
+        self.connection_monitor_active = True
+        self._monitor_timer = self.loop.call_later(self.advertisement_timeout, self._check_connection)
+        print("Connection monitoring started")
+
+    def _check_connection(self):
+        """Alternate the disconnected tones on devices not heard for advertisement_timeout seconds.
+
+        Sleeps until the next device could go silent, or half a second while
+        one is silent, to step the tone pattern.
+        """
+        if not self.running:
             self.connection_monitor_active = False
+            return
         
-        monitor_thread = threading.Thread(target=connection_monitor_loop, daemon=True)
-        monitor_thread.start()
-        print("Connection monitoring started")
+        current_time = self.clock()
+        self._silence_phase = (self._silence_phase + 1) % 4
+        next_check = self.advertisement_timeout
+        for peripheral, heard in list(self.last_heard.items()):
+            name = peripheral.name() or 'Unnamed'
+            silent = current_time - heard
+            if silent > self.advertisement_timeout:
+                if peripheral not in self.out_of_range:
+                    print(f"Nothing heard from {name} for {self.advertisement_timeout:.0f} seconds - out of range?")
+                    self.out_of_range.add(peripheral)
+                
+                # Play alternating tones while silent to make it obvious
+                if self._silence_phase == 0:
+                    self.play_disconnected_sound_pattern(peripheral)  # Low tone
+                elif self._silence_phase == 2:
+                    self.voices[peripheral].set_frequency(100)  # Even lower tone
+                next_check = min(next_check, 0.5)
+            else:
+                if peripheral in self.out_of_range:
+                    print(f"{name} is back in range")
+                    self.out_of_range.discard(peripheral)
+                next_check = min(next_check, self.advertisement_timeout - silent + 0.01)
+        
+        self._monitor_timer = self.loop.call_later(next_check, self._check_connection)
 
     def stop(self):
         print("Stopping Bluetooth tracking...")
         self.running = False
         
-        # Stop the tone generator
-        if hasattr(self, 'tone_generator'):
-            self.tone_generator.stop()
+        for scheduler in list(self.rssi_schedulers.values()):
+            scheduler.stop()
+        if self.position_engine:
+            self.position_engine.stop()
+        self.stats_reporter.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        
+        # Let the pipeline finish the readings already delivered, then stop the loop
+        if self.loop.is_running():
+            self.loop_thread.run(self._shutdown())
+        self.loop_thread.stop()
+        
+        if self.trace_recorder:
+            self.trace_recorder.close()
+        
+        # Stop the mixed audio stream, unless it never started
+        pool = self._voice_pool
+        if isinstance(pool, AudioWarmUp):
+            pool = pool.started()
+        if pool is not None:
+            pool.stop()
             
         print("Tracking stopped")
 
+    async def _shutdown(self):
+        for timer in (self._stats_timer, self._monitor_timer, self._expire_timer):
+            if timer:
+                timer.cancel()
+        for link in self.links.values():
+            link.close()
+        self.bridge.close()
+        if self._pipeline_task:
+            await self._pipeline_task
+
 
 if __name__ == '__main__':
-    # Create delegate and central manager instances.
-    delegate = BluetoothDelegate.alloc().init()
-    manager = CBCentralManager.alloc().initWithDelegate_queue_(delegate, None)
+    parser = argparse.ArgumentParser(description="Bluetooth proximity tracking with sound feedback")
+    parser.add_argument('--backend', choices=sorted(BACKENDS),
+                        help="radio backend (default: corebluetooth on macOS, simulated elsewhere)")
+    parser.add_argument('--anchors', help="JSON file of beacon positions ({identifier: [x, y]}) to estimate position from")
+    parser.add_argument('--position-method', choices=['least_squares', 'particle'], default='least_squares')
+    parser.add_argument('--record', metavar='PATH', help="log every RSSI reading to a binary trace file")
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument('--low-latency', action='store_true',
+                        help="small audio blocks, adapted to the host's load")
+    parser.add_argument('--audio-sink', default='device', metavar='SINK',
+                        help="'device' (default), 'null' or a .wav file to write the audio to")
+    parser.add_argument('--spatial', choices=['stereo', 'binaural'],
+                        help="place each device's tone at its direction (from --anchors positions, else spread)")
+    parser.add_argument('--passive', action='store_true',
+                        help="track from advertisement RSSI only, without connecting")
+    parser.add_argument('--trace-latency', action='store_true',
+                        help="time readings from request to speaker; SIGUSR1 prints the percentiles")
+    parser.add_argument('--device', action='append', metavar='ID_OR_NAME',
+                        help="track this device as soon as it is found, without asking (repeatable)")
+    parser.add_argument('--choose', action='store_true',
+                        help="always list the devices, instead of tracking the last session's again")
+    args = parser.parse_args()
+
+    # Load the audio stack in the background while the radio starts
+    voice_pool = AudioWarmUp(args.audio_sink, args.low_latency, spatial=args.spatial)
+    
+    # Create the radio backend and the delegate that listens to it.
+    backend = get_backend(args.backend)
+    delegate = BluetoothDelegate(backend, voice_pool, passive=args.passive)
+    if args.device:
+        delegate.select_automatically(args.device)
+    delegate.use_device_cache(reuse=not args.choose)
+    if args.anchors:
+        delegate.enable_positioning(args.anchors, method=args.position_method)
+    if args.record:
+        delegate.start_recording(args.record)
+    if args.metrics_port:
+        delegate.serve_metrics(args.metrics_port)
+
+    # Radio events start with backend.run(); without audio, stop here rather than in their callbacks
+    try:
+        voice_pool.result()
+    except Exception as e:
+        print(f"Could not start audio output ({args.audio_sink}): {e}")
+        delegate.stop()
+        sys.exit(1)
+    if args.trace_latency:
+        tracer = delegate.enable_latency_tracing()
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: print(tracer.report()))
 
     print("Scanning for Bluetooth devices...\n")
 
-    # Start a background thread to prompt for device selection after a delay.
+    # Start a background thread to prompt for device selection once discovery settles.
     selection_thread = threading.Thread(target=delegate.prompt_for_device_selection, daemon=True)
     selection_thread.start()
 
     try:
-        AppHelper.runConsoleEventLoop()
+        backend.run()
     except KeyboardInterrupt:
         delegate.stop()
+        if delegate.latency_tracer:
+            print(delegate.latency_tracer.report())
         print("Stopped by user")
-
@@ -0,0 +1,162 @@
+import random
+import time
+
+from metrics import exponential_buckets
+
+# Link states
+DISCONNECTED = 'disconnected'  # Not started, or closed
+CONNECTING = 'connecting'      # connect() issued, waiting for the link to come up
+CONNECTED = 'connected'
+BACKOFF = 'backoff'            # An attempt failed; the next one is scheduled
+FAILED = 'failed'              # Gave up after max_attempts
+
+# 1 ms .. ~2 min in steps of 1.5x, for outage durations
+RECOVERY_BUCKETS = exponential_buckets(1e-3, 1.5, 30)
+
+
+class Backoff:
+    """Jittered exponential retry delays.
+
+    The n-th delay after a reset is initial * multiplier ** n, capped at
+    `maximum`, scaled by a random factor in [1 - jitter, 1] so devices that
+    lost their links together do not retry in lockstep.
+    """
+    def __init__(self, initial=0.05, maximum=2.0, multiplier=2.0, jitter=0.5, rng=None):
+        self.initial = initial
+        self.maximum = maximum
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+        self.failures = 0
+
+    def next(self):
+        """Delay before the next attempt; each call counts one more failure"""
+        delay = min(self.maximum, self.initial * self.multiplier ** self.failures)
+        self.failures += 1
+        return delay * (1.0 - self.jitter * self.rng.random())
+
+    def reset(self):
+        self.failures = 0
+
+
+class Link:
+    """Connection state machine for one peripheral, driven by radio events and one-shot timers.
+
+    start() connects. A link that is lost is reconnected at once, since the
+    device is usually still there. An attempt that does not complete within
+    `connect_timeout` is cancelled and retried after a Backoff delay, which
+    resets once connected; after `max_attempts` attempts in a row the link
+    gives up (FAILED) until start() is called again.
+
+    While connected, a deadline `stall_timeout` after the last reading
+    (`heard()`, or the time the link came up) catches links that went
+    silent without a disconnect event: the link is cancelled and
+    reconnected after the first backoff delay. Nothing polls: every state
+    has at most one pending call_later, and a watchdog that finds a recent
+    reading just re-arms for that reading's deadline. Timers from a state
+    that has been left are ignored, so any call_later works.
+
+    Call the on_* methods and start()/close() from the thread `call_later`
+    runs on. on_state(link, old, new) is called on every transition.
+    """
+    def __init__(self, peripheral, connect, disconnect, call_later, heard, clock=time.monotonic,
+                 backoff=None, connect_timeout=2.0, stall_timeout=1.0, max_attempts=None, on_state=None):
+        self.peripheral = peripheral
+        self.connect = connect          # connect(peripheral): request a connection
+        self.disconnect = disconnect    # disconnect(peripheral): drop the link or cancel the request
+        self.call_later = call_later
+        self.heard = heard              # Time of the latest reading from the device
+        self.clock = clock
+        self.backoff = backoff or Backoff()
+        self.connect_timeout = connect_timeout
+        self.stall_timeout = stall_timeout
+        self.max_attempts = max_attempts
+        self.on_state = on_state
+
+        self.state = DISCONNECTED
+        self.attempts = 0               # Attempts since the link was last up
+        self.connected_at = None
+        self.down_since = None          # When the current outage began; None while up
+        self.outages = 0
+        self.stalls = 0
+        self.last_downtime = None       # Duration of the latest outage that ended
+        self._generation = 0            # Bumped on every transition to void older timers
+
+    def _enter(self, state):
+        old = self.state
+        self.state = state
+        self._generation += 1
+        if self.on_state:
+            self.on_state(self, old, state)
+
+    def _arm(self, delay, fn):
+        self.call_later(delay, self._fire, self._generation, fn)
+
+    def _fire(self, generation, fn):
+        if generation == self._generation:
+            fn()
+
+    def start(self):
+        """Connect, unless already connected or trying to"""
+        if self.state in (DISCONNECTED, FAILED):
+            self.attempts = 0
+            self.backoff.reset()
+            self._connect()
+
+    def close(self):
+        """Stop managing the link (timers are voided; the connection is left as it is)"""
+        self._enter(DISCONNECTED)
+
+    def _connect(self):
+        self.attempts += 1
+        self._enter(CONNECTING)
+        self.connect(self.peripheral)
+        self._arm(self.connect_timeout, self._connect_timed_out)
+
+    def _connect_timed_out(self):
+        self.disconnect(self.peripheral)  # Cancel the request before making a new one
+        self._retry()
+
+    def _retry(self):
+        if self.max_attempts is not None and self.attempts >= self.max_attempts:
+            self._enter(FAILED)
+            return
+        self._enter(BACKOFF)
+        self._arm(self.backoff.next(), self._connect)
+
+    def _lost(self, since):
+        self.outages += 1
+        self.down_since = since
+        self.connected_at = None
+        self.attempts = 0
+
+    def on_connected(self):
+        if self.state not in (CONNECTING, BACKOFF):
+            return  # Closed, or a stale completion
+        now = self.clock()
+        self.last_downtime = None if self.down_since is None else now - self.down_since
+        self.down_since = None
+        self.connected_at = now
+        self.attempts = 0
+        self.backoff.reset()
+        self._enter(CONNECTED)
+        self._arm(self.stall_timeout, self._check_stall)
+
+    def on_disconnected(self, error=None):
+        if self.state == CONNECTED:
+            self._lost(self.clock())
+            self._connect()
+        elif self.state == CONNECTING:
+            self._retry()  # The attempt failed
+        # In BACKOFF a retry is already scheduled; DISCONNECTED/FAILED are not managed
+
+    def _check_stall(self):
+        last = max(self.heard() or 0.0, self.connected_at)
+        silent = self.clock() - last
+        if silent < self.stall_timeout:
+            self._arm(self.stall_timeout - silent, self._check_stall)
+            return
+        self.stalls += 1
+        self._lost(last)
+        self.disconnect(self.peripheral)
+        self._retry()
@@ -0,0 +1,63 @@
+import json
+import os
+import time
+
+DEFAULT_PATH = os.path.join('~', '.echonav', 'devices.json')
+
+
+class DeviceCache:
+    """Devices tracked in earlier sessions, kept in a small JSON file.
+
+    Each entry holds a device's identifier, name and the session (start
+    time) it was last tracked in, most recent first. last_session() gives
+    the devices picked together most recently, which bluetooth_nav selects
+    again without asking. The path defaults to $ECHONAV_DEVICE_CACHE or
+    ~/.echonav/devices.json; a missing or unreadable file is an empty cache.
+    """
+    def __init__(self, path=None, max_entries=50):
+        self.path = os.path.expanduser(path or os.environ.get('ECHONAV_DEVICE_CACHE') or DEFAULT_PATH)
+        self.max_entries = max_entries
+        self.session = time.time()  # Devices remembered by this process share it
+        self.entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)['devices']
+        except (OSError, ValueError, KeyError, TypeError):
+            return []
+        return [entry for entry in entries if isinstance(entry, dict) and 'identifier' in entry]
+
+    def last_session(self):
+        """Identifiers of the devices tracked in the most recent session"""
+        if not self.entries:
+            return []
+        latest = self.entries[0].get('session')
+        return [entry['identifier'] for entry in self.entries if entry.get('session') == latest]
+
+    def name(self, identifier):
+        for entry in self.entries:
+            if entry['identifier'] == identifier:
+                return entry.get('name')
+        return None
+
+    def remember(self, devices):
+        """Save (identifier, name) pairs among this session's devices; returns False if the file cannot be written"""
+        chosen = dict(devices)
+        entries = [entry for entry in self.entries
+                   if entry.get('session') == self.session and entry['identifier'] not in chosen]
+        entries += [{'identifier': identifier, 'name': name, 'session': self.session}
+                    for identifier, name in chosen.items()]
+        entries += [entry for entry in self.entries
+                    if entry.get('session') != self.session and entry['identifier'] not in chosen]
+        self.entries = entries[:self.max_entries]
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            temporary = self.path + '.tmp'
+            with open(temporary, 'w') as f:
+                json.dump({'devices': self.entries}, f, indent=1)
+            os.replace(temporary, self.path)  # Never leave a half-written cache behind
+        except OSError as e:
+            print(f"Could not save the device cache {self.path}: {e}")
+            return False
+        return True
@@ -0,0 +1,128 @@
+import heapq
+
+from ble_pipeline import RSSI_UNAVAILABLE
+
+
+class DeviceRecord:
+    """What discovery knows about one advertiser; __slots__ keeps 10k+ of them small"""
+    __slots__ = ('number', 'identifier', 'peripheral', 'name', 'data', 'first_seen', 'last_seen',
+                 'advertisements', 'last_rssi', 'mean_rssi', 'min_rssi', 'max_rssi')
+
+    def __init__(self, number, identifier, peripheral, rssi, data, now):
+        self.number = number          # Serial number shown to the user
+        self.identifier = identifier
+        self.peripheral = peripheral
+        self.name = peripheral.name()
+        self.data = data              # Latest advertisement data
+        self.first_seen = now
+        self.last_seen = now
+        self.advertisements = 1
+        self.last_rssi = rssi
+        self.mean_rssi = float(rssi)  # EWMA over advertisements
+        self.min_rssi = rssi
+        self.max_rssi = rssi
+
+    def __repr__(self):
+        return (f"DeviceRecord({self.number}, {self.identifier!r}, {self.name!r}, "
+                f"rssi={self.last_rssi}, advertisements={self.advertisements})")
+
+
+class DeviceRegistry:
+    """Advertising devices indexed by identifier, for O(1) dedup of every advertisement.
+
+    observe() is one dict lookup plus a few attribute updates, however many
+    devices are in range, so discovery with duplicate advertisements allowed
+    stays linear in the advertisement rate. Devices are also numbered in
+    order of discovery for the selection prompt. expire() drops devices not
+    heard for `max_age` seconds; call it every few seconds from a timer.
+    """
+    def __init__(self, max_age=60.0, smoothing=0.2):
+        self.max_age = max_age
+        self.smoothing = smoothing    # EWMA weight of a new advertisement's RSSI
+        self.by_identifier = {}
+        self.by_number = {}
+        self._next_number = 1
+        self.expired = 0
+
+    def __len__(self):
+        return len(self.by_identifier)
+
+    def __iter__(self):
+        return iter(self.by_number.values())
+
+    def get(self, identifier):
+        return self.by_identifier.get(identifier)
+
+    def observe(self, identifier, peripheral, rssi, data, now):
+        """Fold in one advertisement; returns (record, True if the device is new).
+
+        An advertisement without an RSSI measurement (RSSI_UNAVAILABLE) only
+        marks a known device as seen; an unknown one is registered by its
+        first measured advertisement, so the record is (None, False).
+        """
+        record = self.by_identifier.get(identifier)
+        if rssi == RSSI_UNAVAILABLE:
+            if record is not None:
+                record.last_seen = now
+                record.advertisements += 1
+            return record, False
+        if record is None:
+            record = DeviceRecord(self._next_number, identifier, peripheral, rssi, data, now)
+            self._next_number += 1
+            self.by_identifier[identifier] = record
+            self.by_number[record.number] = record
+            return record, True
+        record.last_seen = now
+        record.advertisements += 1
+        record.last_rssi = rssi
+        record.mean_rssi += self.smoothing * (rssi - record.mean_rssi)
+        if rssi < record.min_rssi:
+            record.min_rssi = rssi
+        elif rssi > record.max_rssi:
+            record.max_rssi = rssi
+        record.data = data
+        if record.name is None:
+            record.name = peripheral.name()  # Some devices only put their name in the scan response
+        return record, False
+
+    def expire(self, now, keep=None):
+        """Drop devices silent for max_age seconds, except those keep(record) is true for; returns them"""
+        cutoff = now - self.max_age
+        stale = [record for record in self.by_identifier.values()
+                 if record.last_seen < cutoff and not (keep and keep(record))]
+        for record in stale:
+            del self.by_identifier[record.identifier]
+            del self.by_number[record.number]
+        self.expired += len(stale)
+        return stale
+
+    def snapshot(self):
+        """{number: peripheral} of the devices in range, in discovery order"""
+        return {number: record.peripheral for number, record in self.by_number.items()}
+
+
+class RankingWatch:
+    """Tells when discovery has settled: the `size` strongest devices stayed the same for `settle` seconds.
+
+    Feed it snapshots of the registry with update(). Only devices heard at
+    least `min_advertisements` times are ranked, so a single packet does not
+    reshuffle the list, and order within the strongest set is ignored, since
+    neighbours a few dB apart keep swapping places.
+    """
+    def __init__(self, size=5, settle=1.0, min_advertisements=2):
+        self.size = size
+        self.settle = settle
+        self.min_advertisements = min_advertisements
+        self.ranking = frozenset()
+        self._since = None
+
+    def update(self, records, now):
+        """Rank a snapshot of DeviceRecords; True once the strongest set has held for `settle` seconds"""
+        heard = [record for record in records if record.advertisements >= self.min_advertisements]
+        strongest = heapq.nlargest(self.size, heard, key=lambda record: record.mean_rssi)
+        ranking = frozenset(record.identifier for record in strongest)
+        if ranking != self.ranking or self._since is None:
+            self.ranking = ranking
+            self._since = now
+            return False
+        return bool(ranking) and now - self._since >= self.settle
@@ -0,0 +1,127 @@
+# numpy is imported where the table is built, not with the module, so that
+# bluetooth_nav can start the radio while numpy loads (see AudioWarmUp)
+
+
+def linear_curve(normalized, factor):
+    return normalized
+
+
+def logarithmic_curve(normalized, factor):
+    # More granular changes when further away
+    # This gives finer distinctions at lower signal strengths
+    import numpy as np
+    return np.log(normalized * (factor - 1) + 1) / np.log(factor)
+
+
+def exponential_curve(normalized, factor):
+    # More granular changes when closer
+    # This gives finer distinctions at higher signal strengths
+    import numpy as np
+    return np.power(normalized, factor)
+
+
+# Curve name -> function(normalized array in [0, 1], factor) -> adjusted array in [0, 1]
+CURVES = {
+    'linear': linear_curve,
+    'logarithmic': logarithmic_curve,
+    'exponential': exponential_curve,
+}
+
+
+def _table_parameter(name):
+    """Property that marks the lookup table stale when its value changes"""
+    attr = '_' + name
+
+    def getter(self):
+        return getattr(self, attr)
+
+    def setter(self, value):
+        if getattr(self, attr) != value:
+            setattr(self, attr, value)
+            self._table = None  # Rebuilt lazily on the next lookup
+
+    return property(getter, setter)
+
+
+class FrequencyMap:
+    """RSSI -> tone frequency mapping compiled into a lookup table.
+
+    The curve is evaluated once over a grid spanning min_rssi..max_rssi in
+    steps of `resolution` dB (half-dBm by default, so integer and half-dBm
+    readings hit the table exactly); other values are interpolated linearly.
+    Changing any parameter marks the table stale and it is rebuilt on the
+    next lookup.
+
+    The curve is a name from CURVES or a callable taking the normalized RSSI
+    array (0 = weakest, 1 = strongest) and the curve factor.
+    """
+    def __init__(self, min_rssi=-100, max_rssi=-40, min_freq=110, max_freq=1760,
+                 curve='logarithmic', curve_factor=2.0, resolution=0.5):
+        self._min_rssi = min_rssi
+        self._max_rssi = max_rssi
+        self._min_freq = min_freq
+        self._max_freq = max_freq
+        self._curve = curve
+        self._curve_factor = curve_factor
+        self._resolution = resolution
+        self._table = None
+        self.builds = 0
+
+    min_rssi = _table_parameter('min_rssi')
+    max_rssi = _table_parameter('max_rssi')
+    min_freq = _table_parameter('min_freq')
+    max_freq = _table_parameter('max_freq')
+    curve = _table_parameter('curve')
+    curve_factor = _table_parameter('curve_factor')
+    resolution = _table_parameter('resolution')
+
+    def _build(self):
+        """Evaluate the curve over the RSSI grid"""
+        import numpy as np
+        curve = self._curve if callable(self._curve) else CURVES.get(self._curve)
+        if curve is None:
+            raise ValueError(f"Unknown frequency curve '{self._curve}'. Choose from: {', '.join(CURVES)}")
+        steps = max(1, int(round((self._max_rssi - self._min_rssi) / self._resolution)))
+        grid = np.linspace(self._min_rssi, self._max_rssi, steps + 1)
+
+        # Normalize RSSI to [0, 1] range where 1 is closest
+        normalized = (grid - self._min_rssi) / (self._max_rssi - self._min_rssi)
+        adjusted = np.clip(curve(normalized, self._curve_factor), 0.0, 1.0)
+
+        # Apply frequency mapping using musical intervals for more pleasing sounds
+        # Using a logarithmic frequency scale like musical octaves
+        freq_ratio = self._max_freq / self._min_freq
+        table = self._min_freq * np.power(freq_ratio, adjusted)
+
+        self._table = table
+        self._table_list = table.tolist()  # Python floats: fastest for scalar lookups
+        self._last_index = steps
+        self._scale = steps / (self._max_rssi - self._min_rssi)
+        self.builds += 1
+
+    def __call__(self, rssi):
+        """Frequency in Hz for one RSSI value"""
+        if self._table is None:
+            self._build()
+        table = self._table_list
+        # Ensure RSSI is within our defined range
+        x = (rssi - self._min_rssi) * self._scale
+        if x <= 0:
+            return table[0]
+        if x >= self._last_index:
+            return table[-1]
+        i = int(x)
+        low = table[i]
+        return low + (table[i + 1] - low) * (x - i)
+
+    def map_array(self, rssi):
+        """Frequencies for a whole array of RSSI values, e.g. a replayed trace"""
+        import numpy as np
+        if self._table is None:
+            self._build()
+        # Same arithmetic as __call__; the grid is uniform, so no search is needed
+        x = (np.asarray(rssi, dtype=np.float64) - self._min_rssi) * self._scale
+        np.clip(x, 0, self._last_index, out=x)
+        i = np.minimum(x.astype(np.intp), self._last_index - 1)
+        low = self._table[i]
+        return low + (self._table[i + 1] - low) * (x - i)
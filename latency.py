@@ -0,0 +1,95 @@
+import time
+
+from metrics import REGISTRY, exponential_buckets
+
+# Points a reading passes on its way to the speaker, each timed from its readRSSI() request
+STAGES = (
+    ('callback', "RSSI callback on the radio thread"),
+    ('filter', "smoothed on the event loop"),
+    ('publish', "frequency handed to the voice (set_frequency)"),
+    ('audible', "first audio block with the new frequency reaches the DAC"),
+)
+
+# 10 us .. ~10 s in steps of 1.2x, so p99.9 is resolved to within ~10%
+TRACE_BUCKETS = exponential_buckets(1e-5, 1.2, 77)
+
+QUANTILES = (0.5, 0.99, 0.999)
+
+
+class LatencyTracer:
+    """Times readings from readRSSI() request to the audio block that plays them.
+
+    The read scheduler reports when each answered read was issued, the
+    bridge stamps the callback, and the pipeline calls published() with those
+    stamps once the reading's frequency is handed to its voice. The pool
+    (with trace_clock set) notes which parameter update each voice picked up
+    and when that block plays; collect() matches the two. Only readings that
+    are published are traced, since earlier readings in a batch never reach
+    the voice. A reading whose frequency is replaced by a newer one before
+    the audio callback ran is counted but not timed.
+
+    Each stage gets a histogram in `registry` (and so in the Prometheus
+    export); report() formats p50/p99/p99.9 of all of them.
+    """
+    def __init__(self, registry=REGISTRY, clock=time.monotonic):
+        self.clock = clock
+        self.histograms = {
+            stage: registry.histogram(f'echonav_latency_{stage}_seconds',
+                                      f"Time from readRSSI() request until {description}", TRACE_BUCKETS)
+            for stage, description in STAGES
+        }
+        self.superseded = registry.counter('echonav_latency_superseded_total',
+                                           "Traced readings replaced before any audio block picked them up")
+        self._pending = {}  # Voice slot -> (sequence, requested)
+
+    def attach(self, pool):
+        """Have a VoicePool timestamp its blocks on this tracer's clock"""
+        pool.trace_clock = self.clock
+
+    def published(self, slot, sequence, requested, callback, filtered):
+        """Stamps of a reading whose frequency was just published as `sequence` of voice `slot`"""
+        if requested is None:
+            return  # Answer to a read the scheduler had written off: no request time
+        published = self.clock()
+        histograms = self.histograms
+        histograms['callback'].observe(callback - requested)
+        histograms['filter'].observe(filtered - requested)
+        histograms['publish'].observe(published - requested)
+        if slot in self._pending:
+            self.superseded.inc()
+        self._pending[slot] = (sequence, requested)
+
+    def collect(self, pool):
+        """Time the pending readings the audio callback has picked up since the last call"""
+        pending = self._pending
+        if not pending:
+            return
+        audible = self.histograms['audible']
+        applied = pool.applied
+        for slot, (sequence, requested) in list(pending.items()):
+            applied_sequence, played = applied[slot]
+            if applied_sequence < sequence:
+                continue  # Not rendered yet
+            # Later publishes (amplitude, bearing) carry the frequency along; a newer
+            # frequency would have replaced this entry in published()
+            del pending[slot]
+            audible.observe(played - requested)
+
+    def summary(self):
+        """{stage: (count, p50, p99, p99.9)} in seconds; None quantiles for stages with no data"""
+        result = {}
+        for stage, histogram in self.histograms.items():
+            counts = histogram.snapshot()[0]
+            result[stage] = (sum(counts),) + tuple(histogram.quantile(q, counts) for q in QUANTILES)
+        return result
+
+    def report(self):
+        """Latency table as text, one line per stage"""
+        lines = [f"{'request ->':<11} {'count':>8} {'p50 ms':>8} {'p99 ms':>8} {'p99.9 ms':>9}"]
+        for stage, (count, *quantiles) in self.summary().items():
+            cells = ' '.join(f"{q * 1000:>{w}.2f}" if q is not None else f"{'-':>{w}}"
+                             for q, w in zip(quantiles, (8, 8, 9)))
+            lines.append(f"{stage:<11} {count:>8} {cells}")
+        if self.superseded.value:
+            lines.append(f"({self.superseded.value} traced readings superseded before playback)")
+        return '\n'.join(lines)
@@ -0,0 +1,151 @@
+import objc
+from CoreBluetooth import CBCentralManager
+from Foundation import NSObject, NSNumber, NSUUID
+from PyObjCTools import AppHelper
+
+from radio_backend import RadioBackend, RadioError, WifiNetwork
+
+
+def _load_corewlan():
+    """Load CoreWLAN on first WiFi use, so BLE-only runs start without it"""
+    objc.loadBundle('CoreWLAN', bundle_path='/System/Library/Frameworks/CoreWLAN.framework',
+                    module_globals={})
+
+# CBManagerState values
+MANAGER_STATES = {
+    0: 'unknown',
+    1: 'resetting',
+    2: 'unsupported',
+    3: 'unauthorized',
+    4: 'poweredOff',
+    5: 'poweredOn',
+}
+
+
+class CentralDelegate(NSObject):
+    """CoreBluetooth delegate that forwards events to the backend's listener"""
+    def initWithBackend_(self, backend):
+        self = objc.super(CentralDelegate, self).init()
+        if self is None:
+            return None
+        self.backend = backend
+        return self
+
+    def centralManagerDidUpdateState_(self, central):
+        self.backend.listener.centralManagerDidUpdateState_(self.backend)
+
+    def centralManager_didDiscoverPeripheral_advertisementData_RSSI_(self, central, peripheral, data, rssi):
+        self.backend.listener.centralManager_didDiscoverPeripheral_advertisementData_RSSI_(
+            self.backend, peripheral, data, rssi.intValue())
+
+    def centralManager_didConnectPeripheral_(self, central, peripheral):
+        peripheral.setDelegate_(self)
+        try:
+            # Try to optimize peripheral settings
+            peripheral.setValue_forKey_(NSNumber.numberWithFloat_(0.01), "notifyOnNotificationTimeout")
+        except:
+            pass
+        self.backend.listener.centralManager_didConnectPeripheral_(self.backend, peripheral)
+
+    def centralManager_didDisconnectPeripheral_error_(self, central, peripheral, error):
+        self.backend.listener.centralManager_didDisconnectPeripheral_error_(self.backend, peripheral, error)
+
+    def peripheral_didReadRSSI_error_(self, peripheral, rssi, error):
+        rssi_val = rssi.intValue() if rssi is not None else None
+        self.backend.listener.peripheral_didReadRSSI_error_(peripheral, rssi_val, error)
+
+
+class MacOSRadioBackend(RadioBackend):
+    """CoreBluetooth for BLE and CoreWLAN for WiFi, driven by the Cocoa event loop"""
+    def __init__(self):
+        super().__init__()
+        self.delegate = CentralDelegate.alloc().initWithBackend_(self)
+        self.manager = None
+
+    def state(self):
+        if self.manager is None:
+            return 'unknown'
+        return MANAGER_STATES.get(self.manager.state(), str(self.manager.state()))
+
+    def is_powered_on(self):
+        return self.manager is not None and self.manager.state() == 5  # CBManagerStatePoweredOn
+
+    def run(self):
+        if self.manager is None:
+            self.manager = CBCentralManager.alloc().initWithDelegate_queue_(self.delegate, None)
+        AppHelper.runConsoleEventLoop()
+
+    def stop(self):
+        AppHelper.stopEventLoop()
+
+    def call_later(self, delay, fn, *args):
+        # Timers fire on the main run loop, where the delegate callbacks run too
+        AppHelper.callLater(delay, fn, *args)
+
+    def start_discovery(self):
+        # Use scan options to improve device discovery
+        scan_options = {
+            'CBCentralManagerScanOptionAllowDuplicatesKey': True
+        }
+        self.manager.scanForPeripheralsWithServices_options_(None, scan_options)
+
+    def stop_discovery(self):
+        self.manager.stopScan()
+
+    def identifier_of(self, peripheral):
+        # str(NSUUID) is the object description, which includes its address
+        return peripheral.identifier().UUIDString()
+
+    def retrieve_peripherals(self, identifiers):
+        # Peripherals the system has seen before can be connected without discovering them again
+        uuids = [NSUUID.alloc().initWithUUIDString_(identifier) for identifier in identifiers]
+        uuids = [uuid for uuid in uuids if uuid is not None]
+        if self.manager is None or not uuids:
+            return []
+        return list(self.manager.retrievePeripheralsWithIdentifiers_(uuids) or [])
+
+    def connect(self, peripheral):
+        self.manager.connectPeripheral_options_(peripheral, None)
+
+    def disconnect(self, peripheral):
+        self.manager.cancelPeripheralConnection_(peripheral)
+
+    def read_rssi(self, peripheral):
+        peripheral.readRSSI()
+
+    def wifi_interfaces(self):
+        _load_corewlan()
+        try:
+            CWWiFiClient = objc.lookUpClass('CWWiFiClient')
+        except objc.nosuchclass_error:
+            return [None]
+        interfaces = CWWiFiClient.sharedWiFiClient().interfaces() or []
+        return [interface.interfaceName() for interface in interfaces] or [None]
+
+    def scan_wifi(self, interface=None):
+        _load_corewlan()
+        try:
+            CWInterface = objc.lookUpClass('CWInterface')
+        except objc.nosuchclass_error:
+            raise RadioError("Unable to load CoreWLAN classes. Ensure macOS permissions are set correctly.")
+
+        # The named WiFi interface, or the default one
+        name = interface
+        interface = CWInterface.interfaceWithName_(name) if name else CWInterface.interface()
+        if not interface:
+            raise RadioError(f"No WiFi interface {name or 'found'}. Ensure WiFi is enabled.")
+
+        networks, error = interface.scanForNetworksWithName_error_(None, None)
+        if error:
+            raise RadioError(f"Error scanning for networks: {error}")
+
+        return [
+            WifiNetwork(
+                network.ssid(),
+                network.bssid(),
+                network.rssiValue(),
+                network.wlanChannel().channelNumber(),
+                network.securityMode(),
+            )
+            for network in networks
+        ]
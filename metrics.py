@@ -0,0 +1,298 @@
+import bisect
+import math
+import os
+import sys
+import threading
+
+
+class _ThreadCells:
+    """One mutable cell per writing thread, so updates never contend.
+
+    A thread only ever writes its own cell; readers sum over all cells. The
+    registry lock is taken once per thread, when its cell is created.
+    """
+    def __init__(self, make_cell):
+        self._make_cell = make_cell
+        self._local = threading.local()
+        self._cells = []
+        self._lock = threading.Lock()
+
+    def cell(self):
+        cell = self._make_cell()
+        with self._lock:
+            self._cells.append(cell)
+        self._local.cell = cell
+        return cell
+
+    def all(self):
+        with self._lock:
+            return list(self._cells)
+
+
+class Counter:
+    """Monotonic count, cheap enough to bump from audio and radio callbacks"""
+    kind = 'counter'
+
+    def __init__(self, name, help=''):
+        self.name = name
+        self.help = help
+        self._cells = _ThreadCells(lambda: [0])
+
+    def inc(self, amount=1):
+        try:
+            self._cells._local.cell[0] += amount
+        except AttributeError:
+            self._cells.cell()[0] += amount
+
+    @property
+    def value(self):
+        return sum(cell[0] for cell in self._cells.all())
+
+    def samples(self):
+        yield self.name, None, self.value
+
+
+class Gauge:
+    """Current value of something, set directly or read from `function` when collected.
+
+    With `label`, function returns {label value: value} and the gauge
+    exports one sample per entry (e.g. per device).
+    """
+    kind = 'gauge'
+
+    def __init__(self, name, help='', function=None, label=None):
+        self.name = name
+        self.help = help
+        self.function = function
+        self.label = label
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self):
+        value = self.function() if self.function else self.value
+        if self.label is None:
+            yield self.name, None, value
+        else:
+            for key, v in value.items():
+                yield self.name, {self.label: key}, v
+
+
+def exponential_buckets(start, factor, count):
+    """Upper bounds start, start * factor, ... (count of them)"""
+    return [start * factor ** i for i in range(count)]
+
+
+# 10 us .. ~5 s in steps of about 1.5x: fine enough for p50/p99 of callback latencies
+LATENCY_BUCKETS = exponential_buckets(1e-5, 1.5, 33)
+
+
+class Histogram:
+    """Distribution of observed values in fixed buckets, with per-thread counts.
+
+    observe() is a bisect and two increments on the calling thread's own
+    cell. quantile() estimates percentiles by interpolating inside buckets,
+    so its resolution is the bucket spacing.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, help='', buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.bounds = list(buckets)
+        width = len(self.bounds) + 1  # Last bucket: above every bound
+        self._cells = _ThreadCells(lambda: [[0] * width, 0.0])
+
+    def observe(self, value):
+        try:
+            cell = self._cells._local.cell
+        except AttributeError:
+            cell = self._cells.cell()
+        cell[0][bisect.bisect_left(self.bounds, value)] += 1
+        cell[1] += value
+
+    def snapshot(self):
+        """(bucket counts, sum) over all threads"""
+        counts = [0] * (len(self.bounds) + 1)
+        total = 0.0
+        for cell_counts, cell_sum in self._cells.all():
+            for i, n in enumerate(cell_counts):
+                counts[i] += n
+            total += cell_sum
+        return counts, total
+
+    @property
+    def count(self):
+        return sum(self.snapshot()[0])
+
+    def quantile(self, q, counts=None):
+        """Estimated q-quantile (0..1) of everything observed; None if empty"""
+        if counts is None:
+            counts = self.snapshot()[0]
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for i, n in enumerate(counts):
+            if n and seen + n >= rank:
+                lower = self.bounds[i - 1] if i else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+    def samples(self):
+        counts, total = self.snapshot()
+        cumulative = 0
+        for bound, n in zip(self.bounds, counts):
+            cumulative += n
+            yield self.name + '_bucket', {'le': f"{bound:.6g}"}, cumulative
+        cumulative += counts[-1]
+        yield self.name + '_bucket', {'le': '+Inf'}, cumulative
+        yield self.name + '_sum', None, total
+        yield self.name + '_count', None, cumulative
+
+
+class Registry:
+    """Named metrics of one process; counter()/gauge()/histogram() return the existing metric if registered"""
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric '{name}' is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, help=''):
+        return self._get(Counter, name, help)
+
+    def gauge(self, name, help='', function=None, label=None):
+        gauge = self._get(Gauge, name, help)
+        if function is not None:
+            gauge.function, gauge.label = function, label
+        return gauge
+
+    def histogram(self, name, help='', buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, help, buckets)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            if metric.help:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    inner = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                    name = f"{name}{{{inner}}}"
+                lines.append(f"{name} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if value is None:
+        return 'NaN'
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value) if not value.is_integer() else str(int(value))
+
+
+# Metrics of this process unless a component is given its own registry
+REGISTRY = Registry()
+
+
+class MetricsReporter:
+    """Calls report() every `interval` seconds on a low-priority background thread.
+
+    Keeps console output off the radio, loop and audio threads: they only
+    update metrics, and this thread formats and prints them. On Linux the
+    thread also lowers its own scheduling priority.
+    """
+    def __init__(self, report, interval=5.0, niceness=10):
+        self.report = report
+        self.interval = interval
+        self.niceness = niceness
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='metrics-reporter', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        # Only Linux takes a thread id here; elsewhere it would be read as a pid
+        if sys.platform.startswith('linux'):
+            try:
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(),
+                               os.getpriority(os.PRIO_PROCESS, 0) + self.niceness)
+            except (AttributeError, OSError):
+                pass
+        while not self._stop.wait(self.interval):
+            try:
+                self.report()
+            except Exception as e:
+                print(f"Metrics report failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+
+class MetricsServer:
+    """Serves a registry at http://host:port/metrics for Prometheus to scrape.
+
+    Binds to localhost by default; port 0 picks a free port (see `port`).
+    """
+    def __init__(self, registry=REGISTRY, host='127.0.0.1', port=9464):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Only loaded when serving
+        registry_ = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry_.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes are not worth a console line each
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.host, self.port = self.server.server_address[:2]
+        self._thread = threading.Thread(target=self.server.serve_forever, name='metrics-server', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
@@ -0,0 +1,340 @@
+import argparse
+import asyncio
+import math
+import multiprocessing
+import os
+import signal
+import socket
+import struct
+import time
+from array import array
+from multiprocessing.reduction import recv_handle, send_handle
+
+from ble_pipeline import RSSI_UNAVAILABLE
+from frequency_map import FrequencyMap
+from rssi_filters import make_filter
+
+DEFAULT_SOCKET = '/tmp/echonav.sock'
+
+# Wire format, all little-endian. Clients send request frames: a header
+# followed by `count` readings. The server answers every request frame with
+# a response frame carrying the same session and sequence and one tone per
+# reading, in order. A frame with no readings ends the session.
+FRAME_HEADER = struct.Struct('<IIH')  # Session id, sequence number, count
+READING = struct.Struct('<db')         # Client time in seconds, raw RSSI in dBm
+TONE = struct.Struct('<ff')            # Smoothed RSSI, tone frequency in Hz (both NaN if unavailable)
+
+
+def encode_request(session, sequence, readings):
+    """Request frame for a list of (time, rssi) readings"""
+    frame = bytearray(FRAME_HEADER.size + READING.size * len(readings))
+    FRAME_HEADER.pack_into(frame, 0, session, sequence, len(readings))
+    offset = FRAME_HEADER.size
+    for when, rssi in readings:
+        READING.pack_into(frame, offset, when, rssi)
+        offset += READING.size
+    return bytes(frame)
+
+
+def decode_tones(payload):
+    """[(smoothed, frequency)] from the body of a response frame"""
+    return list(TONE.iter_unpack(payload))
+
+
+async def read_frame(reader, item):
+    """(session, sequence, body) of the next frame, `item` being the per-entry struct; None at EOF"""
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+    session, sequence, count = FRAME_HEADER.unpack(header)
+    body = await reader.readexactly(count * item.size) if count else b''
+    return session, sequence, body
+
+
+class Session:
+    """One user's RSSI stream: its own filter, fed in arrival order"""
+    __slots__ = ('filter', 'last_seen', 'readings')
+
+    def __init__(self, rssi_filter, now):
+        self.filter = rssi_filter
+        self.last_seen = now
+        self.readings = 0
+
+
+class SessionShard:
+    """The sessions of one worker process and the filter -> frequency pipeline they run.
+
+    process() takes the body of a request frame and returns the body of its
+    response: each reading is smoothed by the session's filter and mapped to
+    a frequency, as in BluetoothDelegate.filter_stage and map_stage. Sessions
+    are created by their first frame and dropped by an empty frame, or after
+    `session_timeout` seconds without one.
+    """
+    def __init__(self, filter_kind='moving_average', filter_options=None, frequency_map=None,
+                 session_timeout=60.0, clock=time.monotonic):
+        self.filter_kind = filter_kind
+        self.filter_options = dict(filter_options or {})
+        if filter_kind in ('moving_average', 'median'):
+            self.filter_options.setdefault('window', 3)
+        self.frequency_map = frequency_map or FrequencyMap()
+        self.frequency_map(self.frequency_map.min_rssi)  # Build the table (and load numpy) before the first frame
+        self.session_timeout = session_timeout
+        self.clock = clock
+        self.sessions = {}
+        self.frames = 0
+        self.readings = 0
+        self._expiry_timer = None
+
+    def process(self, session_id, body):
+        now = self.clock()
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = Session(make_filter(self.filter_kind, **self.filter_options), now)
+        session.last_seen = now
+        update = session.filter.update
+        calculate_frequency = self.frequency_map
+        tones = array('f')
+        for _, rssi in READING.iter_unpack(body):
+            if rssi == RSSI_UNAVAILABLE:
+                tones.extend((math.nan, math.nan))
+                continue
+            smoothed = update(rssi)
+            tones.extend((smoothed, calculate_frequency(smoothed)))
+        count = len(tones) // 2
+        session.readings += count
+        self.readings += count
+        self.frames += 1
+        return tones.tobytes()
+
+    def end(self, session_id):
+        self.sessions.pop(session_id, None)
+
+    def expire(self):
+        """Drop sessions idle for longer than session_timeout; returns how many"""
+        cutoff = self.clock() - self.session_timeout
+        idle = [s for s, session in self.sessions.items() if session.last_seen < cutoff]
+        for session_id in idle:
+            del self.sessions[session_id]
+        return len(idle)
+
+    def start_expiry(self, loop):
+        """Run expire() on `loop` every half session_timeout until stop_expiry()"""
+        def tick():
+            self.expire()
+            self._expiry_timer = loop.call_later(self.session_timeout / 2, tick)
+        self._expiry_timer = loop.call_later(self.session_timeout / 2, tick)
+
+    def stop_expiry(self):
+        if self._expiry_timer:
+            self._expiry_timer.cancel()
+            self._expiry_timer = None
+
+    async def serve(self, reader, writer):
+        """Answer the request frames of one client connection until it closes"""
+        process = self.process
+        try:
+            while True:
+                frame = await read_frame(reader, READING)
+                if frame is None:
+                    break
+                session_id, sequence, body = frame
+                if not body:
+                    self.end(session_id)
+                    writer.write(FRAME_HEADER.pack(session_id, sequence, 0))
+                    continue
+                tones = process(session_id, body)
+                writer.write(FRAME_HEADER.pack(session_id, sequence, len(tones) // TONE.size) + tones)
+                # Only wait for the socket when the client is not keeping up
+                if writer.transport.get_write_buffer_size() > 1 << 16:
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def _shard_main(handles, options):
+    """Worker process: serve the connections the acceptor hands over on `handles`"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The parent stops the pool
+    shard = SessionShard(**options)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    connections = set()  # The loop only keeps weak references to tasks
+
+    def accept():
+        try:
+            fd = recv_handle(handles)
+            header = handles.recv_bytes()  # Sent right after the socket
+        except (EOFError, OSError):
+            loop.stop()  # Acceptor gone: shut down
+            return
+        task = loop.create_task(_serve_socket(shard, socket.socket(fileno=fd), header))
+        connections.add(task)
+        task.add_done_callback(connections.discard)
+
+    loop.add_reader(handles.fileno(), accept)
+    shard.start_expiry(loop)
+    try:
+        loop.run_forever()
+    finally:
+        # Let the open connections close their transports before the loop goes
+        loop.remove_reader(handles.fileno())
+        shard.stop_expiry()
+        for task in connections:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*connections, return_exceptions=True))
+        loop.close()
+
+
+async def _serve_socket(shard, sock, header):
+    """Serve a handed-over socket whose first frame header the acceptor already read"""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    reader.feed_data(header)
+    protocol = asyncio.StreamReaderProtocol(reader)
+    transport, _ = await loop.create_unix_connection(lambda: protocol, sock=sock)
+    writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+    await shard.serve(reader, writer)
+
+
+class NavServer:
+    """Headless EchoNav: many users' RSSI streams in, tone parameters out.
+
+    Listens on a Unix socket for the batched binary frames described above
+    (FRAME_HEADER, READING, TONE). The listening process only accepts: it
+    reads the first frame header of each new connection and hands it, with
+    the socket itself, over to shard `session % workers`, a worker process with
+    its own event loop and SessionShard, which then talks to the client
+    directly. Sessions are spread over the workers without any frame
+    passing through a shared process, so the pipeline work is not bound by
+    one interpreter's GIL. All sessions of one connection land on the shard
+    of its first session, so clients that multiplex should keep each session
+    on the same connection.
+
+    With workers=0 the acceptor serves every connection itself, in one
+    process, for comparison and for hosts with a single core.
+    """
+    def __init__(self, path=DEFAULT_SOCKET, workers=None, header_timeout=10.0, **shard_options):
+        self.path = path
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.header_timeout = header_timeout  # Connections that send no full header by then are dropped
+        self.shard_options = shard_options
+        self._processes = []
+        self._handles = []
+        self._server = None
+        self._listener = None
+        self._accepting = None
+        self._dispatching = set()
+        self.shard = None  # The in-process shard with workers=0
+        self.connections = [0] * max(1, self.workers)
+
+    def start_workers(self):
+        context = multiprocessing.get_context('spawn')  # No inherited event loop or sockets
+        for index in range(self.workers):
+            parent, child = context.Pipe()
+            process = context.Process(target=_shard_main, args=(child, self.shard_options),
+                                      name=f'echonav-shard-{index}', daemon=True)
+            process.start()
+            child.close()
+            self._processes.append(process)
+            self._handles.append(parent)
+
+    async def start(self):
+        """Start the worker pool and listen; returns once connections are accepted"""
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # Stale socket of an earlier run
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.path)
+        listener.listen(1024)
+        listener.setblocking(False)
+        if self.workers:
+            self.start_workers()
+            self._listener = listener
+            self._accepting = asyncio.get_running_loop().create_task(self._accept())
+        else:
+            self.shard = SessionShard(**self.shard_options)
+            self.shard.start_expiry(asyncio.get_running_loop())
+            self._server = await asyncio.start_unix_server(self.shard.serve, sock=listener)
+        print(f"EchoNav server on {self.path} with "
+              f"{self.workers or 'no'} worker process{'es' if self.workers != 1 else ''}")
+
+    async def _accept(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            sock, _ = await loop.sock_accept(self._listener)
+            task = loop.create_task(self._dispatch(sock))
+            self._dispatching.add(task)
+            task.add_done_callback(self._dispatching.discard)
+
+    async def _dispatch(self, sock):
+        try:
+            header = await asyncio.wait_for(_read_header(sock), self.header_timeout)
+            if header is not None:
+                shard = FRAME_HEADER.unpack(header)[0] % self.workers
+                self.connections[shard] += 1
+                send_handle(self._handles[shard], sock.fileno(), self._processes[shard].pid)
+                self._handles[shard].send_bytes(header)  # The shard reads the rest of the stream itself
+        except asyncio.TimeoutError:
+            pass
+        except OSError as e:
+            print(f"Could not hand a connection over: {e}")
+        finally:
+            sock.close()  # The worker holds its own copy of the socket now
+
+    async def serve_forever(self):
+        await self.start()
+        if self._server:
+            async with self._server:
+                await self._server.serve_forever()
+        else:
+            await self._accepting
+
+    def close(self):
+        if self.shard:
+            self.shard.stop_expiry()
+        if self._server:
+            self._server.close()
+        if self._accepting:
+            self._accepting.cancel()
+        if self._listener:
+            self._listener.close()
+        for handles in self._handles:
+            handles.close()
+        for process in self._processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        self._processes, self._handles = [], []
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+async def _read_header(sock):
+    """The first frame header of a new connection, or None if it closes before sending one"""
+    loop = asyncio.get_running_loop()
+    header = b''
+    while len(header) < FRAME_HEADER.size:
+        data = await loop.sock_recv(sock, FRAME_HEADER.size - len(header))
+        if not data:
+            return None
+        header += data
+    return header
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Headless EchoNav server: RSSI streams in, tone frequencies out")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help="Unix socket path to listen on")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per core; 0 serves in-process)")
+    parser.add_argument('--filter', default='moving_average', help="RSSI filter of each session")
+    parser.add_argument('--session-timeout', type=float, default=60.0,
+                        help="seconds after which an idle session is dropped")
+    args = parser.parse_args()
+
+    server = NavServer(args.socket, args.workers, filter_kind=args.filter, session_timeout=args.session_timeout)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("Stopped by user")
+    finally:
+        server.close()
@@ -0,0 +1,38 @@
+import threading
+from collections import namedtuple
+
+# Parameters the control side hands to a tone voice; timbre 0 is a pure sine. bearing
+# (radians clockwise from ahead) places the voice with a SpatialRenderer; None follows pan
+ToneParams = namedtuple('ToneParams', ['frequency', 'amplitude', 'pan', 'timbre', 'bearing'],
+                        defaults=(0.0, None))
+
+
+class ParamChannel:
+    """Single-slot, latest-value-wins parameter handoff for the audio thread.
+
+    Producers publish a new immutable snapshot; the reader picks up whatever
+    snapshot is current. Publishing is a single reference assignment of a
+    (sequence, params) tuple, which is atomic under the interpreter, so the
+    reader never takes a lock, never waits and never sees a torn update.
+    Producers serialize among themselves only so partial updates
+    (e.g. frequency only) are merged instead of lost.
+    """
+    def __init__(self, initial):
+        self._slot = (0, initial)
+        self._write_lock = threading.Lock()
+
+    def publish(self, **changes):
+        """Replace some fields of the current snapshot and publish it; returns its sequence number"""
+        with self._write_lock:
+            seq, params = self._slot
+            self._slot = (seq + 1, params._replace(**changes))
+        return seq + 1
+
+    def read(self):
+        """Return (sequence, params); never blocks. Compare sequence to detect changes"""
+        return self._slot
+
+    @property
+    def latest(self):
+        """The most recently published parameters"""
+        return self._slot[1]
@@ -0,0 +1,232 @@
+import json
+import math
+
+import numpy as np
+
+
+class PathLossModel:
+    """Log-distance path-loss model: RSSI = tx_power - 10 * n * log10(d / d0).
+
+    tx_power is the RSSI measured at the reference distance d0 (1 m by
+    default, which is what iBeacon's "measured power" field holds) and n the
+    path-loss exponent: about 2 in free space, 2.5-4 indoors.
+    """
+    def __init__(self, tx_power=-59.0, exponent=2.5, reference_distance=1.0, min_distance=0.1):
+        self.tx_power = tx_power
+        self.exponent = exponent
+        self.reference_distance = reference_distance
+        self.min_distance = min_distance
+
+    def distance(self, rssi):
+        """Distance in metres for RSSI values (scalar or array)"""
+        return self.reference_distance * np.power(10.0, (self.tx_power - np.asarray(rssi, dtype=np.float64))
+                                                  / (10.0 * self.exponent))
+
+    def rssi(self, distance):
+        """Expected RSSI at the given distances (scalar or array)"""
+        distance = np.maximum(np.asarray(distance, dtype=np.float64), self.min_distance)
+        return self.tx_power - 10.0 * self.exponent * np.log10(distance / self.reference_distance)
+
+
+def load_anchors(path):
+    """Read anchor positions from a JSON file: {"<identifier or BSSID>": [x, y], ...}"""
+    with open(path) as f:
+        data = json.load(f)
+    return {key: (float(x), float(y)) for key, (x, y) in data.items()}
+
+
+def solve_least_squares(anchors, distances, weights=None, iterations=5, initial=None):
+    """2-D position from anchor positions (K x 2) and distances (K,), K >= 3.
+
+    A linearized solve (each circle equation minus the last one) gives the
+    starting point unless `initial` is given; a few weighted Gauss-Newton
+    steps on the distance residuals then refine it. Returns (position,
+    rms residual in metres).
+    """
+    if weights is None:
+        weights = np.ones(len(distances))
+    if initial is None:
+        ref, ref_d = anchors[-1], distances[-1]
+        a = 2.0 * (anchors[:-1] - ref)
+        b = (ref_d ** 2 - distances[:-1] ** 2
+             + np.einsum('ij,ij->i', anchors[:-1], anchors[:-1]) - ref @ ref)
+        w = np.sqrt(weights[:-1])
+        position = np.linalg.lstsq(a * w[:, None], b * w, rcond=None)[0]
+    else:
+        position = np.array(initial, dtype=np.float64)
+
+    for _ in range(iterations):
+        offsets = position - anchors
+        ranges = np.maximum(np.hypot(offsets[:, 0], offsets[:, 1]), 1e-6)
+        residuals = ranges - distances
+        jacobian = offsets / ranges[:, None]
+        jw = jacobian * weights[:, None]
+        normal = jw.T @ jacobian
+        if abs(np.linalg.det(normal)) < 1e-12:
+            break  # Anchors (nearly) collinear: keep the current estimate
+        step = np.linalg.solve(normal, jw.T @ residuals)
+        position = position - step
+        if step @ step < 1e-8:
+            break
+
+    offsets = position - anchors
+    residuals = np.hypot(offsets[:, 0], offsets[:, 1]) - distances
+    return position, math.sqrt(float(np.average(residuals ** 2, weights=weights)))
+
+
+class ParticleFilter:
+    """Sequential Monte Carlo position tracker working directly on RSSI.
+
+    Particles random-walk between updates (motion_std metres per sqrt(second))
+    and are weighted by how well the path-loss model's expected RSSI at each
+    particle explains the readings, assuming Gaussian noise of rssi_noise dB.
+    Everything is vectorized over particles x anchors.
+    """
+    def __init__(self, bounds, model, count=2000, motion_std=1.0, rssi_noise=4.0, seed=0):
+        self.bounds = bounds  # ((min_x, min_y), (max_x, max_y))
+        self.model = model
+        self.count = count
+        self.motion_std = motion_std
+        self.rssi_noise = rssi_noise
+        self.rng = np.random.default_rng(seed)
+        self.reset()
+
+    def reset(self):
+        low, high = np.asarray(self.bounds, dtype=np.float64)
+        self.particles = self.rng.uniform(low, high, size=(self.count, 2))
+        self.weights = np.full(self.count, 1.0 / self.count)
+
+    def update(self, anchors, rssi, dt):
+        """Fold in one set of readings (anchors K x 2, rssi K,); returns (position, spread)"""
+        low, high = self.bounds
+        particles = self.particles
+        particles += self.rng.normal(0.0, self.motion_std * math.sqrt(max(dt, 1e-3)), particles.shape)
+        np.clip(particles, low, high, out=particles)
+
+        # Log-likelihood of the readings at each particle: (particles x anchors)
+        dx = particles[:, 0, None] - anchors[None, :, 0]
+        dy = particles[:, 1, None] - anchors[None, :, 1]
+        errors = self.model.rssi(np.hypot(dx, dy)) - rssi
+        log_weights = np.log(self.weights) - 0.5 * np.einsum('ij,ij->i', errors, errors) / self.rssi_noise ** 2
+        log_weights -= log_weights.max()
+        weights = np.exp(log_weights)
+        weights /= weights.sum()
+        self.weights = weights
+
+        position = weights @ particles
+        spread = math.sqrt(float(weights @ np.sum((particles - position) ** 2, axis=1)))
+
+        # Resample when the effective sample size drops below half
+        if 1.0 / (weights @ weights) < self.count / 2:
+            self._resample()
+        return position, spread
+
+    def _resample(self):
+        """Systematic resampling"""
+        positions = (self.rng.random() + np.arange(self.count)) / self.count
+        indexes = np.searchsorted(np.cumsum(self.weights), positions)
+        np.minimum(indexes, self.count - 1, out=indexes)
+        self.particles = self.particles[indexes]
+        self.weights.fill(1.0 / self.count)
+
+
+class PositionEngine:
+    """Estimates the listener's 2-D position from RSSI of beacons at known spots.
+
+    Readings come in through observe() (BLE RSSI, keyed by peripheral
+    identifier) and observe_networks() (the dicts scan_wifi_networks
+    returns, keyed by BSSID) and are smoothed per anchor. update() solves
+    with the `max_anchors` strongest readings younger than `max_age`, either
+    by weighted least squares on path-loss distances or with a particle
+    filter; start() calls it at a fixed `update_rate`.
+    """
+    def __init__(self, anchors, model=None, method='least_squares', update_rate=10.0,
+                 max_age=2.0, smoothing=0.3, max_anchors=12, particles=2000, seed=0,
+                 on_position=None):
+        if method not in ('least_squares', 'particle'):
+            raise ValueError(f"Unknown positioning method '{method}'. Choose from: least_squares, particle")
+        self.keys = list(anchors)
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        self.anchors = np.array([anchors[key] for key in self.keys], dtype=np.float64).reshape(-1, 2)
+        self.model = model or PathLossModel()
+        self.method = method
+        self.update_rate = update_rate
+        self.max_age = max_age
+        self.smoothing = smoothing      # EMA weight of a new reading
+        self.max_anchors = max_anchors
+        self.on_position = on_position  # Called with the engine after every successful update
+
+        # Latest smoothed RSSI of each anchor and when it was last heard
+        self.rssi = np.zeros(len(self.keys))
+        self.seen = np.full(len(self.keys), -np.inf)
+
+        self.position = None
+        self.accuracy = None            # RMS residual (least squares) or particle spread, metres
+        self.anchors_used = 0
+        self.updates = 0
+        self._last_update = None
+        self.running = False
+
+        self.particle_filter = None
+        if method == 'particle':
+            margin = 5.0
+            bounds = (tuple(self.anchors.min(axis=0) - margin), tuple(self.anchors.max(axis=0) + margin))
+            self.particle_filter = ParticleFilter(bounds, self.model, count=particles, seed=seed)
+
+    def observe(self, key, rssi, now):
+        """Record one reading; returns False if `key` is not an anchor"""
+        i = self.index.get(key)
+        if i is None:
+            return False
+        if now - self.seen[i] > self.max_age:
+            self.rssi[i] = rssi  # Stale or first reading: start over
+        else:
+            self.rssi[i] += self.smoothing * (rssi - self.rssi[i])
+        self.seen[i] = now
+        return True
+
+    def observe_networks(self, networks, now):
+        """Record a WiFi scan (scan_wifi_networks output); returns how many were anchors"""
+        return sum(self.observe(net['bssid'], net['rssi'], now) for net in networks)
+
+    def update(self, now):
+        """Re-estimate the position from current readings; returns it, or None if too few anchors"""
+        fresh = np.flatnonzero(self.seen >= now - self.max_age)
+        if len(fresh) > self.max_anchors:
+            strongest = np.argpartition(self.rssi[fresh], -self.max_anchors)[-self.max_anchors:]
+            fresh = fresh[strongest]
+        if len(fresh) < 3:
+            return None
+        anchors = self.anchors[fresh]
+        rssi = self.rssi[fresh]
+
+        if self.particle_filter is not None:
+            dt = 1.0 / self.update_rate if self._last_update is None else now - self._last_update
+            self.position, self.accuracy = self.particle_filter.update(anchors, rssi, dt)
+        else:
+            distances = self.model.distance(rssi)
+            # Shadowing makes distance errors grow with distance, so trust near anchors more
+            self.position, self.accuracy = solve_least_squares(
+                anchors, distances, weights=1.0 / distances ** 2, initial=self.position)
+
+        self._last_update = now
+        self.anchors_used = len(fresh)
+        self.updates += 1
+        if self.on_position:
+            self.on_position(self)
+        return self.position
+
+    def start(self, call_later, clock):
+        """Update every 1/update_rate seconds on a timer (e.g. RadioBackend.call_later)"""
+        self.running = True
+
+        def tick():
+            if not self.running:
+                return
+            self.update(clock())
+            call_later(1.0 / self.update_rate, tick)
+
+        call_later(1.0 / self.update_rate, tick)
+
+    def stop(self):
+        self.running = False
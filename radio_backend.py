@@ -0,0 +1,118 @@
+import importlib
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+
+# One access point seen by a WiFi scan
+WifiNetwork = namedtuple('WifiNetwork', ['ssid', 'bssid', 'rssi', 'channel', 'security'])
+
+# Backend name -> (module, class); modules are imported only when selected so
+# that PyObjC is never needed on other platforms
+BACKENDS = {
+    'corebluetooth': ('macos_backend', 'MacOSRadioBackend'),
+    'simulated': ('simulated_backend', 'SimulatedRadioBackend'),
+}
+
+
+class RadioError(Exception):
+    """Raised when the radio stack cannot perform an operation"""
+
+
+class RadioBackend:
+    """Interface between EchoNav and a radio stack.
+
+    A backend drives discovery, connections and RSSI reads, and reports events
+    to its listener through the CoreBluetooth delegate method names:
+
+        centralManagerDidUpdateState_(backend)
+        centralManager_didDiscoverPeripheral_advertisementData_RSSI_(backend, peripheral, data, rssi)
+        centralManager_didConnectPeripheral_(backend, peripheral)
+        centralManager_didDisconnectPeripheral_error_(backend, peripheral, error)
+        peripheral_didReadRSSI_error_(peripheral, rssi, error)
+
+    RSSI values are plain ints in dBm. Peripherals are opaque handles that
+    provide name() and identifier(), like CBPeripheral; identifier_of() turns
+    the latter into a string that stays the same from one run to the next.
+    """
+    def __init__(self):
+        self.listener = None
+
+    def set_listener(self, listener):
+        """Set the object that receives radio events"""
+        self.listener = listener
+
+    def clock(self):
+        """Monotonic time in seconds, in the backend's time base"""
+        return time.monotonic()
+
+    def call_later(self, delay, fn, *args):
+        """Run fn(*args) after `delay` seconds of backend time"""
+        timer = threading.Timer(delay, fn, args)
+        timer.daemon = True
+        timer.start()
+
+    def state(self):
+        """Human-readable radio state"""
+        return 'poweredOn' if self.is_powered_on() else 'unknown'
+
+    def is_powered_on(self):
+        raise NotImplementedError
+
+    def run(self):
+        """Run the event loop on the calling thread until stop() is called"""
+        raise NotImplementedError
+
+    def stop(self):
+        """Make run() return"""
+        raise NotImplementedError
+
+    def start_discovery(self):
+        raise NotImplementedError
+
+    def stop_discovery(self):
+        raise NotImplementedError
+
+    def identifier_of(self, peripheral):
+        """Stable string identifier of a peripheral, for caches, anchors and traces"""
+        return str(peripheral.identifier())
+
+    def retrieve_peripherals(self, identifiers):
+        """Handles for known peripherals by identifier, without scanning; those it cannot provide are left out"""
+        return []
+
+    def connect(self, peripheral):
+        raise NotImplementedError
+
+    def disconnect(self, peripheral):
+        raise NotImplementedError
+
+    def read_rssi(self, peripheral):
+        """Request one RSSI reading; the answer arrives via peripheral_didReadRSSI_error_"""
+        raise NotImplementedError
+
+    def wifi_interfaces(self):
+        """Names of the WiFi interfaces scan_wifi can use; [None] if only the default one"""
+        return [None]
+
+    def scan_wifi(self, interface=None):
+        """Scan for WiFi networks on an interface (None: the default one) and return a list of WifiNetwork"""
+        raise NotImplementedError
+
+
+def default_backend_name():
+    """ECHONAV_BACKEND if set, otherwise CoreBluetooth on macOS and the simulator elsewhere"""
+    if os.environ.get('ECHONAV_BACKEND'):
+        return os.environ['ECHONAV_BACKEND']
+    return 'corebluetooth' if sys.platform == 'darwin' else 'simulated'
+
+
+def get_backend(name=None, **options):
+    """Create a radio backend by name (see BACKENDS)"""
+    name = name or default_backend_name()
+    if name not in BACKENDS:
+        raise RadioError(f"Unknown radio backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    module_name, class_name = BACKENDS[name]
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name)(**options)
@@ -0,0 +1,179 @@
+import bisect
+import math
+
+
+class MovingAverageFilter:
+    """Mean of the last `window` samples, kept as a running sum over a ring buffer"""
+    # Re-add the window from scratch this often so float rounding cannot drift
+    RESUM_INTERVAL = 4096
+
+    def __init__(self, window=3):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self._ring = [0.0] * self.window
+        self._index = 0
+        self._count = 0
+        self._sum = 0.0
+        self._updates = 0
+        self.value = None
+
+    def update(self, sample):
+        ring = self._ring
+        index = self._index
+        self._sum += sample - ring[index]
+        ring[index] = sample
+        self._index = index + 1 if index + 1 < self.window else 0
+        if self._count < self.window:
+            self._count += 1
+
+        self._updates += 1
+        if self._updates >= self.RESUM_INTERVAL:
+            self._updates = 0
+            self._sum = math.fsum(ring)
+
+        self.value = self._sum / self._count
+        return self.value
+
+
+class EMAFilter:
+    """Exponential moving average; alpha close to 1 follows new samples quickly"""
+    def __init__(self, alpha=0.3):
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self):
+        self.value = None
+
+    def update(self, sample):
+        if self.value is None:
+            self.value = float(sample)
+        else:
+            self.value += self.alpha * (sample - self.value)
+        return self.value
+
+
+class MedianFilter:
+    """Median of the last `window` samples; rejects the single-reading spikes BLE is prone to.
+
+    Keeps the window both in arrival order (ring buffer) and sorted, so each
+    update is a bisect plus one short memmove instead of a full sort.
+    """
+    def __init__(self, window=5):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self._ring = [0.0] * self.window
+        self._sorted = []
+        self._index = 0
+        self.value = None
+
+    def update(self, sample):
+        ordered = self._sorted
+        if len(ordered) == self.window:
+            del ordered[bisect.bisect_left(ordered, self._ring[self._index])]
+        self._ring[self._index] = sample
+        self._index = self._index + 1 if self._index + 1 < self.window else 0
+        bisect.insort(ordered, sample)
+
+        middle = len(ordered) // 2
+        if len(ordered) % 2:
+            self.value = float(ordered[middle])
+        else:
+            self.value = (ordered[middle - 1] + ordered[middle]) / 2
+        return self.value
+
+
+class KalmanFilter:
+    """1-D Kalman filter for a slowly changing RSSI level.
+
+    process_variance is how much the true level may move between samples
+    (dB^2); measurement_variance is the noise of one reading (dB^2).
+    """
+    def __init__(self, process_variance=0.5, measurement_variance=4.0):
+        self.process_variance = process_variance
+        self.measurement_variance = measurement_variance
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.error_variance = 1.0
+
+    def update(self, sample):
+        if self.value is None:
+            self.value = float(sample)
+            self.error_variance = self.measurement_variance
+            return self.value
+
+        # Predict: the level may have drifted since the last sample
+        variance = self.error_variance + self.process_variance
+        # Correct towards the new measurement
+        gain = variance / (variance + self.measurement_variance)
+        self.value += gain * (sample - self.value)
+        self.error_variance = (1 - gain) * variance
+        return self.value
+
+
+# Filter name -> class, for make_filter()
+FILTERS = {
+    'moving_average': MovingAverageFilter,
+    'ema': EMAFilter,
+    'median': MedianFilter,
+    'kalman': KalmanFilter,
+}
+
+
+def make_filter(kind='moving_average', **options):
+    """Create an RSSI filter by name (see FILTERS)"""
+    if kind not in FILTERS:
+        raise ValueError(f"Unknown filter '{kind}'. Choose from: {', '.join(FILTERS)}")
+    return FILTERS[kind](**options)
+
+
+class RateMeter:
+    """Events per second over a sliding window, in fixed memory.
+
+    Counts go into a ring of time buckets; buckets that fall out of the window
+    are cleared as time moves on, so marking an event is O(1) however high the
+    rate gets.
+    """
+    def __init__(self, window=1.0, buckets=10):
+        self.window = window
+        self.bucket_width = window / buckets
+        self._counts = [0] * buckets
+        self._current = None  # Absolute index of the newest bucket
+        self.total = 0
+
+    def _advance(self, now):
+        bucket = int(now / self.bucket_width)
+        if self._current is None:
+            self._current = bucket
+        elif bucket > self._current:
+            size = len(self._counts)
+            for b in range(self._current + 1, min(bucket, self._current + size) + 1):
+                self._counts[b % size] = 0
+            self._current = bucket
+        return bucket
+
+    def mark(self, now, count=1):
+        bucket = int(now / self.bucket_width)
+        if bucket != self._current:
+            self._advance(now)
+            if self._current - bucket >= len(self._counts):
+                self.total += count
+                return  # Too late to fall inside the window
+        self._counts[bucket % len(self._counts)] += count
+        self.total += count
+
+    def rate(self, now):
+        """Events per second over the last `window` seconds"""
+        self._advance(now)
+        return sum(self._counts) / self.window
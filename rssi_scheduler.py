@@ -0,0 +1,224 @@
+import threading
+import time
+from collections import deque
+
+
+class RSSIReadScheduler:
+    """Keeps a small, adaptive number of RSSI reads in flight.
+
+    Instead of threads that spin on readRSSI(), the next read is issued from the
+    RSSI callback itself (on_read_complete). The window of outstanding reads
+    grows while the observed read latency stays near its floor and shrinks as
+    soon as requests start queueing in the BLE stack, so the link runs at its
+    real update rate without piling up duplicate requests.
+
+    Answers carry no request id, so a dropped read cannot be told apart from a
+    slow one. A watchdog therefore only steps in when the link has gone quiet
+    for several typical gaps between answers, writes off everything
+    outstanding and refills the window. It runs as a timer via call_later
+    (e.g. RadioBackend.call_later) when given, otherwise on its own thread.
+
+    cpu_percent is the CPU time of the scheduler's own work (completions,
+    including issuing the next reads, and stall checks) per second of wall
+    time. Reading the thread CPU clock costs about as much as a completion,
+    so only one completion in `cpu_sample_interval` is timed and scaled up.
+    """
+    cpu_sample_interval = 16
+
+    def __init__(self, read_rssi, max_in_flight=4, min_in_flight=2,
+                 min_stall_timeout=0.005, latency_tolerance=0.5, watchdog=True,
+                 clock=time.monotonic, call_later=None):
+        self.read_rssi = read_rssi            # Callable that issues one RSSI read
+        self.max_in_flight = max_in_flight
+        self.min_in_flight = min_in_flight    # Two keeps the link busy if one read is lost
+        self.min_stall_timeout = min_stall_timeout
+        self.latency_tolerance = latency_tolerance  # Allowed queueing above the latency floor
+        self.use_watchdog = watchdog
+        self.clock = clock
+        self.call_later = call_later
+
+        self.running = False
+        self._watchdog_thread = None
+        self._watchdog_armed = False
+        self._last_activity = clock()
+        self.window = min_in_flight           # Current target number of reads in flight
+        self._sent = deque()                  # Send times of outstanding reads, oldest first
+        self._lock = threading.Lock()
+
+        # Observed latency (EWMA) and its floor; target rate follows from both
+        self.latency = None
+        self.min_latency = None
+        self.gap = None                       # EWMA of the time between answers
+        self._since_adjust = 0
+
+        # Stats, refreshed by tick()
+        self.completed = 0
+        self.lost = 0
+        self.achieved_hz = 0.0
+        self.cpu_percent = 0.0
+        self.cpu_time = 0.0                   # Estimated CPU seconds spent in the scheduler
+        self._calls = 0
+        self._tick_time = clock()
+        self._tick_cpu = 0.0
+        self._tick_completed = 0
+
+    @property
+    def in_flight(self):
+        return len(self._sent)
+
+    @property
+    def target_hz(self):
+        """Update rate the current window should sustain at the observed latency"""
+        if not self.latency:
+            return 0.0
+        return self.window / self.latency
+
+    @property
+    def stall_timeout(self):
+        """How long the link may stay silent before outstanding reads are written off"""
+        if self.gap is None:
+            return max(4 * (self.latency or 0), self.min_stall_timeout)
+        return max(3 * self.gap, self.min_stall_timeout)
+
+    def start(self):
+        """Start (or restart after a reconnect) issuing reads"""
+        with self._lock:
+            self.running = True
+            self._sent.clear()  # Anything outstanding died with the old connection
+            self._last_activity = self.clock()
+        if self.use_watchdog:
+            self._start_watchdog()
+        self._fill()
+
+    def stop(self):
+        """Stop issuing reads; outstanding callbacks are still accepted"""
+        with self._lock:
+            self.running = False
+
+    def on_read_complete(self, error=None):
+        """Call from the RSSI callback; records latency and issues the next read.
+
+        Returns when the answered read was issued, or None for a late answer.
+        """
+        self._calls += 1
+        if self._calls % self.cpu_sample_interval:
+            return self._complete(error)
+        start = time.thread_time()
+        try:
+            return self._complete(error)
+        finally:
+            self.cpu_time += (time.thread_time() - start) * self.cpu_sample_interval
+
+    def _complete(self, error):
+        now = self.clock()
+        with self._lock:
+            if self.completed:
+                gap = now - self._last_activity
+                self.gap = gap if self.gap is None else self.gap + 0.1 * (gap - self.gap)
+            self._last_activity = now
+            if not self._sent:
+                return None  # Late answer to a read already written off
+            sent = self._sent.popleft()
+            self.completed += 1
+            if not error:
+                self._observe_latency(now - sent)
+        self._fill()
+        return sent
+
+    def check_stall(self):
+        """Write off outstanding reads if the link has gone quiet; returns True if it had"""
+        start = time.thread_time()
+        try:
+            return self._check_stall()
+        finally:
+            self.cpu_time += time.thread_time() - start
+
+    def _check_stall(self):
+        now = self.clock()
+        with self._lock:
+            if not self._sent or now - self._last_activity < self.stall_timeout:
+                return False
+            self.lost += len(self._sent)
+            self._sent.clear()
+            self._last_activity = now
+            # Losses usually mean the stack is saturated; back off
+            self.window = max(self.min_in_flight, self.window - 1)
+        self._fill()
+        return True
+
+    def tick(self):
+        """Refresh the achieved rate and CPU stats; call about once a second"""
+        now = self.clock()
+        cpu = self.cpu_time
+        with self._lock:
+            elapsed = now - self._tick_time
+            if elapsed > 0:
+                self.achieved_hz = (self.completed - self._tick_completed) / elapsed
+                self.cpu_percent = (cpu - self._tick_cpu) / elapsed * 100
+            self._tick_time = now
+            self._tick_cpu = cpu
+            self._tick_completed = self.completed
+
+    def _observe_latency(self, latency):
+        """Update the latency estimate and adapt the window (caller holds the lock)"""
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += 0.2 * (latency - self.latency)
+        if self.min_latency is None or latency < self.min_latency:
+            self.min_latency = latency
+
+        # Adjust at most once per window's worth of completions
+        self._since_adjust += 1
+        if self._since_adjust < self.window:
+            return
+        self._since_adjust = 0
+
+        if self.latency > self.min_latency * (1 + self.latency_tolerance):
+            # Requests are queueing: more in flight only adds delay
+            self.window = max(self.min_in_flight, self.window - 1)
+        elif self.window < self.max_in_flight:
+            self.window += 1
+
+        # Let the floor drift up slowly so a changed connection interval is picked up
+        self.min_latency *= 1.01
+
+    def _fill(self):
+        """Issue reads until the window is full"""
+        with self._lock:
+            if not self.running:
+                return
+            count = self.window - len(self._sent)
+            now = self.clock()
+            for _ in range(count):
+                self._sent.append(now)
+        # Issue outside the lock: the read may call back synchronously
+        for _ in range(max(0, count)):
+            try:
+                self.read_rssi()
+            except Exception:
+                # Leave the slot outstanding; the stall check writes it off
+                pass
+
+    def _start_watchdog(self):
+        if self.call_later is not None:
+            if not self._watchdog_armed:
+                self._watchdog_armed = True
+                self.call_later(self.stall_timeout, self._watchdog_timer)
+        elif not (self._watchdog_thread and self._watchdog_thread.is_alive()):
+            self._watchdog_thread = threading.Thread(target=self._watchdog_loop, daemon=True)
+            self._watchdog_thread.start()
+
+    def _watchdog_timer(self):
+        """Timer flavour of the watchdog: check, then re-arm while running"""
+        if not self.running:
+            self._watchdog_armed = False
+            return
+        self.check_stall()
+        self.call_later(self.stall_timeout, self._watchdog_timer)
+
+    def _watchdog_loop(self):
+        """Sleep for one stall timeout at a time and recover a silent link"""
+        while self.running:
+            time.sleep(self.stall_timeout)
+            self.check_stall()
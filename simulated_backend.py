@@ -0,0 +1,415 @@
+import bisect
+import heapq
+import itertools
+import math
+import random
+import threading
+import time
+
+from radio_backend import RadioBackend, RadioError, WifiNetwork
+
+
+class SyntheticTrace:
+    """RSSI of someone walking towards and away from a beacon: a slow swing plus drift"""
+    def __init__(self, base=-70.0, swing=20.0, period=20.0, phase=0.0):
+        self.base = base
+        self.swing = swing
+        self.period = period
+        self.phase = phase
+
+    def rssi_at(self, t):
+        return self.base + self.swing * math.sin(2 * math.pi * t / self.period + self.phase)
+
+
+class RecordedTrace:
+    """Replays recorded (time, rssi) samples, holding each value until the next one"""
+    def __init__(self, times, values, loop=True):
+        if len(times) != len(values) or not len(times):
+            raise ValueError("A recorded trace needs the same, non-zero number of times and values")
+        self.start = float(times[0])
+        self.times = [float(t) - self.start for t in times]
+        self.values = [float(v) for v in values]
+        self.duration = self.times[-1]
+        self.loop = loop
+
+    def rssi_at(self, t):
+        if self.loop and self.duration > 0:
+            t = t % self.duration
+        index = bisect.bisect_right(self.times, t) - 1
+        return self.values[max(0, index)]
+
+
+class Route:
+    """A walk through a floor plan: straight lines between waypoints at constant speed"""
+    def __init__(self, waypoints, speed=1.2, loop=True):
+        self.waypoints = [(float(x), float(y)) for x, y in waypoints]
+        self.speed = speed  # Metres per second
+        self.loop = loop
+        self.ends = [0.0]   # Distance walked at each waypoint
+        for (x0, y0), (x1, y1) in zip(self.waypoints, self.waypoints[1:]):
+            self.ends.append(self.ends[-1] + math.hypot(x1 - x0, y1 - y0))
+        self.length = self.ends[-1]
+
+    def position_at(self, t):
+        if len(self.waypoints) == 1:
+            return self.waypoints[0]
+        walked = t * self.speed
+        if self.loop and self.length > 0:
+            walked = walked % self.length
+        walked = min(walked, self.length)
+        index = min(bisect.bisect_right(self.ends, walked) - 1, len(self.waypoints) - 2)
+        (x0, y0), (x1, y1) = self.waypoints[index], self.waypoints[index + 1]
+        span = self.ends[index + 1] - self.ends[index]
+        f = (walked - self.ends[index]) / span if span else 0.0
+        return x0 + (x1 - x0) * f, y0 + (y1 - y0) * f
+
+
+class FloorPlanTrace:
+    """RSSI at a fixed anchor while walking a Route, from a path-loss model"""
+    def __init__(self, anchor, route, model):
+        self.anchor = anchor
+        self.route = route
+        self.model = model
+
+    def rssi_at(self, t):
+        x, y = self.route.position_at(t)
+        return float(self.model.rssi(math.hypot(x - self.anchor[0], y - self.anchor[1])))
+
+
+class SimulatedPeripheral:
+    """A BLE peripheral whose signal follows a trace"""
+    def __init__(self, identifier, name=None, trace=None, advertising_rate=10.0,
+                 noise=2.0, connectable=True):
+        self._identifier = identifier
+        self._name = name
+        self.trace = trace or SyntheticTrace()
+        self.advertising_rate = advertising_rate  # Advertisements per second
+        self.noise = noise                        # Std-dev of per-reading noise in dB
+        self.connectable = connectable
+
+        # Link state, owned by the backend
+        self.connected = False
+        self.link_generation = 0  # Bumped on every connect/disconnect to void in-flight events
+        self.link_free = 0.0      # Earliest time the link can answer the next read
+        self.stalled = False      # Link up but no longer answering reads
+        self.connect_pending = False
+        self.reachable_at = 0.0   # Connections cannot complete before this (outage after a link loss)
+
+    def name(self):
+        return self._name
+
+    def identifier(self):
+        return self._identifier
+
+    def advertisement_data(self):
+        data = {'kCBAdvDataIsConnectable': self.connectable}
+        if self._name:
+            data['kCBAdvDataLocalName'] = self._name
+        return data
+
+    def __repr__(self):
+        return f"SimulatedPeripheral({self._identifier!r}, {self._name!r})"
+
+
+class SimulatedAccessPoint:
+    """A WiFi access point whose signal follows a trace"""
+    def __init__(self, ssid, bssid, channel=6, security=3, trace=None, noise=2.0):
+        self.ssid = ssid
+        self.bssid = bssid
+        self.channel = channel
+        self.security = security
+        self.trace = trace or SyntheticTrace(base=-75.0, swing=10.0, period=60.0)
+        self.noise = noise
+
+
+def demo_scene(seed=0, peripherals=6, access_points=12):
+    """A handful of beacons and access points with varied, reproducible traces"""
+    rng = random.Random(seed)
+    names = ['iPhone', 'Beacon A', 'Beacon B', 'Bluetooth Speaker', 'Watch', None]
+    beacons = [
+        SimulatedPeripheral(
+            f"SIM-{i:04d}",
+            names[i % len(names)],
+            SyntheticTrace(base=rng.uniform(-85, -60), swing=rng.uniform(5, 20),
+                           period=rng.uniform(10, 40), phase=rng.uniform(0, 2 * math.pi)),
+        )
+        for i in range(peripherals)
+    ]
+    aps = [
+        SimulatedAccessPoint(
+            f"Net-{i % 4}",
+            "02:00:00:00:%02x:%02x" % (i // 256, i % 256),
+            channel=rng.choice([1, 6, 11, 36, 44, 149]),
+            trace=SyntheticTrace(base=rng.uniform(-90, -50), swing=rng.uniform(2, 10),
+                                 period=rng.uniform(30, 120), phase=rng.uniform(0, 2 * math.pi)),
+        )
+        for i in range(access_points)
+    ]
+    return beacons, aps
+
+
+def floor_plan_scene(anchors, route, model=None, noise=4.0, wifi=False):
+    """Beacons (or access points, with wifi=True) at the given anchor positions.
+
+    `anchors` maps identifier (BSSID for access points) -> (x, y) in metres,
+    as read by positioning.load_anchors; their signals follow the listener
+    walking `route` under `model` (a positioning.PathLossModel by default).
+    Returns (peripherals, access_points) like demo_scene.
+    """
+    if model is None:
+        from positioning import PathLossModel
+        model = PathLossModel()
+    if wifi:
+        aps = [SimulatedAccessPoint(f"Anchor-{i}", key, trace=FloorPlanTrace(xy, route, model), noise=noise)
+               for i, (key, xy) in enumerate(anchors.items())]
+        return [], aps
+    beacons = [SimulatedPeripheral(key, f"Anchor {i}", FloorPlanTrace(xy, route, model), noise=noise)
+               for i, (key, xy) in enumerate(anchors.items())]
+    return beacons, []
+
+
+class SimulatedRadioBackend(RadioBackend):
+    """Deterministic radio simulator for benchmarking and profiling without hardware.
+
+    Events are kept in a time-ordered heap and delivered on the thread that
+    calls run(). In realtime mode events fire at wall-clock pace; otherwise the
+    clock jumps from event to event, so a run is reproducible for a given seed
+    and can go far faster than real time.
+
+    RSSI reads are answered after read_latency (+/- jitter) with the link
+    serving at most one read per connection_interval. Reads and advertisements
+    are dropped with probability loss, and connected peripherals drop their
+    link at disconnect_rate per second. After a drop a peripheral cannot be
+    reached for an exponentially distributed time averaging `outage`
+    seconds. Links also go silent at stall_rate per second: reads stay
+    unanswered and no disconnect is reported, as when CoreBluetooth has not
+    noticed a dead link. As on CoreBluetooth, a connection request stays
+    pending until the peripheral is reachable or disconnect() cancels it.
+    """
+    def __init__(self, peripherals=None, access_points=None, seed=0, realtime=True,
+                 read_latency=0.005, jitter=0.002, connection_interval=0.0075, loss=0.0,
+                 disconnect_rate=0.0, connect_latency=0.05, wifi_scan_time=0.0, wifi_interfaces=('sim0',),
+                 stall_rate=0.0, outage=0.0):
+        super().__init__()
+        if peripherals is None and access_points is None:
+            peripherals, access_points = demo_scene(seed)
+        self.peripherals = list(peripherals or [])
+        self.access_points = list(access_points or [])
+        self.rng = random.Random(seed)
+        self.realtime = realtime
+        self.read_latency = read_latency
+        self.jitter = jitter
+        self.connection_interval = connection_interval
+        self.loss = loss
+        self.disconnect_rate = disconnect_rate
+        self.connect_latency = connect_latency
+        self.stall_rate = stall_rate
+        self.outage = outage
+        self.wifi_scan_time = wifi_scan_time
+        self._wifi_interfaces = list(wifi_interfaces)  # Each hears every access point, with its own noise
+
+        self.powered_on = False
+        self.discovering = False
+        self._discovery_generation = 0
+
+        self._events = []                 # Heap of (time, seq, fn, args)
+        self._seq = itertools.count()
+        self._cond = threading.Condition(threading.RLock())
+        self._running = False
+        self._now = 0.0                   # Virtual clock
+        self._t0 = time.monotonic()       # Realtime clock origin
+        self.events_delivered = 0
+
+    # -- clock and event loop --------------------------------------------
+
+    def clock(self):
+        if self.realtime:
+            return time.monotonic() - self._t0
+        return self._now
+
+    def is_powered_on(self):
+        return self.powered_on
+
+    def run(self, duration=None):
+        """Deliver events until stop(), or for `duration` seconds of backend time"""
+        with self._cond:
+            self._running = True
+            if not self.powered_on:
+                self._schedule(0.0, self._power_on)
+            end = None if duration is None else self.clock() + duration
+
+        while True:
+            with self._cond:
+                if not self._running:
+                    break
+                now = self.clock()
+                if end is not None and self.realtime and now >= end:
+                    break
+                if not self._events:
+                    if not self.realtime:
+                        break  # Nothing can happen any more
+                    self._cond.wait(None if end is None else end - now)
+                    continue
+                when = self._events[0][0]
+                if end is not None and when > end:
+                    if self.realtime:
+                        self._cond.wait(end - now)
+                        continue
+                    self._now = end
+                    break
+                if self.realtime:
+                    if when > now:
+                        self._cond.wait(when - now)
+                        continue
+                else:
+                    self._now = max(self._now, when)
+                _, _, fn, args = heapq.heappop(self._events)
+            fn(*args)
+            self.events_delivered += 1
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def call_later(self, delay, fn, *args):
+        self._schedule(delay, fn, *args)
+
+    def _schedule(self, delay, fn, *args):
+        """Queue fn(*args) to run `delay` seconds from now; safe from any thread"""
+        with self._cond:
+            heapq.heappush(self._events, (self.clock() + max(0.0, delay), next(self._seq), fn, args))
+            self._cond.notify()
+
+    def _jittered(self, value):
+        return max(0.0, value + self.rng.uniform(-self.jitter, self.jitter))
+
+    def _sample_rssi(self, source):
+        return int(round(source.trace.rssi_at(self.clock()) + self.rng.gauss(0.0, source.noise)))
+
+    def _power_on(self):
+        self.powered_on = True
+        if self.listener:
+            self.listener.centralManagerDidUpdateState_(self)
+
+    # -- discovery --------------------------------------------------------
+
+    def start_discovery(self):
+        with self._cond:
+            self.discovering = True
+            self._discovery_generation += 1
+            generation = self._discovery_generation
+            for peripheral in self.peripherals:
+                if peripheral.advertising_rate > 0:
+                    first = self.rng.uniform(0, 1.0 / peripheral.advertising_rate)
+                    self._schedule(first, self._advertise, peripheral, generation)
+
+    def stop_discovery(self):
+        with self._cond:
+            self.discovering = False
+
+    def _advertise(self, peripheral, generation):
+        if not self.discovering or generation != self._discovery_generation:
+            return
+        with self._cond:
+            lost = self.rng.random() < self.loss
+            rssi = self._sample_rssi(peripheral)
+            # Advertising intervals carry a random delay, which avoids collisions
+            self._schedule(self._jittered(1.0 / peripheral.advertising_rate),
+                           self._advertise, peripheral, generation)
+        if not lost:
+            self.listener.centralManager_didDiscoverPeripheral_advertisementData_RSSI_(
+                self, peripheral, peripheral.advertisement_data(), rssi)
+
+    # -- connections ------------------------------------------------------
+
+    def retrieve_peripherals(self, identifiers):
+        wanted = set(identifiers)
+        return [peripheral for peripheral in self.peripherals if peripheral.identifier() in wanted]
+
+    def connect(self, peripheral):
+        with self._cond:
+            peripheral.connect_pending = True
+            self._schedule(self._jittered(self.connect_latency), self._complete_connect, peripheral)
+
+    def disconnect(self, peripheral):
+        with self._cond:
+            peripheral.connect_pending = False  # Also cancels a pending connection
+            self._schedule(0.0, self._drop_link, peripheral, peripheral.link_generation, None)
+
+    def _complete_connect(self, peripheral):
+        with self._cond:
+            if peripheral.connected or not peripheral.connectable or not peripheral.connect_pending:
+                return
+            now = self.clock()
+            if now < peripheral.reachable_at:
+                # Still out of reach: the request stays pending until it is back
+                self._schedule(peripheral.reachable_at - now + self._jittered(self.connect_latency),
+                               self._complete_connect, peripheral)
+                return
+            peripheral.connect_pending = False
+            peripheral.connected = True
+            peripheral.stalled = False
+            peripheral.link_generation += 1
+            peripheral.link_free = now
+            if self.disconnect_rate > 0:
+                self._schedule(self.rng.expovariate(self.disconnect_rate), self._drop_link,
+                               peripheral, peripheral.link_generation, 'Simulated link loss')
+            if self.stall_rate > 0:
+                self._schedule(self.rng.expovariate(self.stall_rate), self._stall_link,
+                               peripheral, peripheral.link_generation)
+        self.listener.centralManager_didConnectPeripheral_(self, peripheral)
+
+    def _drop_link(self, peripheral, generation, error):
+        with self._cond:
+            if not peripheral.connected or generation != peripheral.link_generation:
+                return
+            peripheral.connected = False
+            peripheral.stalled = False
+            peripheral.link_generation += 1
+            if error and self.outage > 0:
+                peripheral.reachable_at = self.clock() + self.rng.expovariate(1.0 / self.outage)
+        self.listener.centralManager_didDisconnectPeripheral_error_(self, peripheral, error)
+
+    def _stall_link(self, peripheral, generation):
+        with self._cond:
+            if peripheral.connected and generation == peripheral.link_generation:
+                peripheral.stalled = True
+
+    # -- RSSI -------------------------------------------------------------
+
+    def read_rssi(self, peripheral):
+        with self._cond:
+            if not peripheral.connected or peripheral.stalled:
+                return
+            answer = max(self.clock() + self._jittered(self.read_latency), peripheral.link_free)
+            peripheral.link_free = answer + self.connection_interval
+            if self.rng.random() < self.loss:
+                return  # Dropped: no callback, just like a lost request on air
+            self._schedule(answer - self.clock(), self._deliver_rssi,
+                           peripheral, peripheral.link_generation)
+
+    def _deliver_rssi(self, peripheral, generation):
+        if generation != peripheral.link_generation:
+            return  # The link this read was issued on is gone
+        with self._cond:
+            rssi = self._sample_rssi(peripheral)
+        self.listener.peripheral_didReadRSSI_error_(peripheral, rssi, None)
+
+    # -- WiFi -------------------------------------------------------------
+
+    def wifi_interfaces(self):
+        return list(self._wifi_interfaces)
+
+    def scan_wifi(self, interface=None):
+        if interface is not None and interface not in self._wifi_interfaces:
+            raise RadioError(f"No WiFi interface {interface}")
+        if self.realtime and self.wifi_scan_time:
+            time.sleep(self.wifi_scan_time)
+        with self._cond:
+            networks = []
+            for ap in self.access_points:
+                rssi = self._sample_rssi(ap)
+                if rssi > -100:
+                    networks.append(WifiNetwork(ap.ssid, ap.bssid, rssi, ap.channel, ap.security))
+            return networks
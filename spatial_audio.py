@@ -0,0 +1,201 @@
+import math
+
+import numpy as np
+
+TWO_PI = 2 * math.pi
+
+HEAD_RADIUS = 0.0875   # Metres, average adult head
+SPEED_OF_SOUND = 343.0  # Metres per second
+
+
+def stereo_tables(angles, sample_rate):
+    """Constant-power (left, right) gains for each bearing, no delays.
+
+    The bearing's sideways component (sin) is the pan position, so a
+    source straight ahead and one straight behind sound the same.
+    """
+    angle = (np.sin(angles) + 1) * (math.pi / 4)
+    gains = np.stack([np.cos(angle), np.sin(angle)])
+    return gains, np.zeros_like(gains)
+
+
+def binaural_tables(angles, sample_rate, head_radius=HEAD_RADIUS, reference_frequency=1000.0):
+    """Per-ear gains and delays (in samples) of a spherical head for each bearing.
+
+    Delays follow Woodworth's formula for the interaural time difference
+    (up to ~0.66 ms); gains are the head-shadow filter of Brown and Duda
+    evaluated at `reference_frequency`, scaled to constant total power.
+    """
+    lateral = np.arcsin(np.sin(angles))  # Front and back share the same lateral angle
+    itd = head_radius / SPEED_OF_SOUND * (lateral + np.sin(lateral))  # > 0: source on the right
+    delays = np.stack([np.maximum(itd, 0.0), np.maximum(-itd, 0.0)]) * sample_rate
+
+    w = TWO_PI * reference_frequency
+    w0 = SPEED_OF_SOUND / head_radius
+    gains = []
+    for ear in (-math.pi / 2, math.pi / 2):  # Left, right
+        incidence = np.abs(np.angle(np.exp(1j * (angles - ear))))  # 0 = source facing this ear
+        alpha = 1.05 + 0.95 * np.cos(incidence * (180 / 150))
+        gains.append(np.sqrt(alpha ** 2 * w ** 2 + 4 * w0 ** 2) / np.sqrt(w ** 2 + 4 * w0 ** 2))
+    gains = np.stack(gains)
+    gains /= np.sqrt(np.sum(gains ** 2, axis=0))
+    return gains, delays
+
+
+# Mode name -> function(bearing grid, sample rate) -> (gains, delays), each (2 x grid)
+MODES = {
+    'stereo': stereo_tables,
+    'binaural': binaural_tables,
+}
+
+
+class SpatialRenderer:
+    """Places each voice of a VoicePool at a bearing and mixes them to two channels.
+
+    Bearings are radians clockwise from straight ahead (pi/2 = right). The
+    per-ear gains (and, for binaural output, interaural delays) are
+    precomputed over `table_size` bearings; each block looks up every
+    voice's bearing with linear interpolation between entries, then glides
+    gains and delays sample by sample from the previous block's values, so
+    a moving source never steps (no zipper noise).
+
+    Stereo output is a pair of matrix products over all voices. Binaural
+    output reads each voice's signal at a fractional delay per ear, from a
+    short history of its previous block, as one vectorized gather over a
+    (ears x voices x frames) index matrix.
+    """
+    def __init__(self, max_voices=64, sample_rate=44100, mode='binaural', table_size=360):
+        tables = MODES.get(mode)
+        if tables is None:
+            raise ValueError(f"Unknown spatial mode '{mode}'. Choose from: {', '.join(MODES)}")
+        self.mode = mode
+        self.max_voices = max_voices
+        self.sample_rate = sample_rate
+        self.table_size = table_size
+
+        # One extra entry (bearing 2 pi = 0) so interpolation never wraps
+        angles = np.linspace(0.0, TWO_PI, table_size + 1)
+        gains, delays = tables(angles, sample_rate)
+        self.gain_table = gains.astype(np.float32)
+        self.delay_table = delays.astype(np.float32)
+        self.delayed = bool(np.any(delays))
+        self._scale = table_size / TWO_PI
+        # History kept per voice: longest delay, plus a sample for interpolation
+        self._history_length = int(math.ceil(float(delays.max()))) + 2 if self.delayed else 0
+        self._history = np.zeros((max_voices, self._history_length), dtype=np.float32)
+
+        # Gains and delays each voice reached at the end of the previous block
+        self.rendered_gains = np.zeros((2, max_voices), dtype=np.float32)
+        self.rendered_delays = np.zeros((2, max_voices), dtype=np.float32)
+
+        # Per-voice scratch
+        self._position = np.zeros(max_voices)
+        self._index = np.zeros(max_voices, dtype=np.intp)
+        self._upper = np.zeros((2, max_voices), dtype=np.float32)
+        self._target = np.zeros((2, max_voices), dtype=np.float32)
+        self._coefficients = np.zeros((4, max_voices), dtype=np.float32)  # Start gains, then their glide
+
+        self._frames = 0
+
+    def _prepare_buffers(self, frames):
+        n = np.arange(frames, dtype=np.float32)
+        self._ramp = (n + 1) / frames  # Reaches the new values on the block's last sample
+        self._product = np.empty((4, frames), dtype=np.float32)
+        if self.delayed:
+            shape = (2, self.max_voices, frames)
+            width = self._history_length + frames
+            self._extended = np.zeros((self.max_voices, width), dtype=np.float32)
+            # Read position of sample n with no delay within a voice's row, and where each row starts
+            self._base = (self._history_length + n).astype(np.float32)
+            self._row_start = (np.arange(self.max_voices) * width)[:, None]
+            self._delay = np.empty(shape, dtype=np.float32)
+            self._gain = np.empty(shape, dtype=np.float32)
+            self._fraction = np.empty(shape, dtype=np.float32)
+            self._taps = np.empty(shape, dtype=np.intp)
+            self._early = np.empty(shape, dtype=np.float32)
+            self._late = np.empty(shape, dtype=np.float32)
+        self._frames = frames
+
+    def _lookup(self, table, voices, fraction):
+        """Table values at this block's bearings (2 x voices), interpolated between entries"""
+        index = self._index[:voices]
+        target = self._target[:, :voices]
+        upper = self._upper[:, :voices]
+        np.take(table, index, axis=1, out=target)
+        np.take(table, index + 1, axis=1, out=upper)
+        np.subtract(upper, target, out=upper)
+        np.multiply(upper, fraction, out=upper)
+        np.add(target, upper, out=target)
+        return target
+
+    def mix(self, signals, bearings, out, headroom=1.0):
+        """Mix `signals` (voices x frames, float32) at `bearings` into `out` (2 x frames)"""
+        voices, frames = signals.shape
+        if frames != self._frames:
+            self._prepare_buffers(frames)
+
+        position = self._position[:voices]
+        np.remainder(bearings[:voices], TWO_PI, out=position)
+        np.multiply(position, self._scale, out=position)
+        index = self._index[:voices]
+        np.copyto(index, position, casting='unsafe')  # Truncates: position is never negative
+        np.minimum(index, self.table_size - 1, out=index)
+        np.subtract(position, index, out=position)
+        fraction = position.astype(np.float32)
+
+        start = self.rendered_gains[:, :voices]
+        coefficients = self._coefficients[:, :voices]
+        coefficients[:2] = start
+        target = self._lookup(self.gain_table, voices, fraction)
+        np.multiply(target, headroom, out=target)
+        np.subtract(target, start, out=coefficients[2:])
+        start[:] = target
+
+        if not self.delayed:
+            # out = start @ signals + ramp * (glide @ signals)
+            product = self._product
+            np.matmul(coefficients, signals, out=product)
+            np.multiply(product[2:], self._ramp, out=product[2:])
+            np.add(product[:2], product[2:], out=out)
+            return
+
+        # Gain of each ear and voice over the block: start + glide * ramp
+        gain = self._gain[:, :voices]
+        np.multiply(coefficients[2:, :, None], self._ramp, out=gain)
+        np.add(gain, coefficients[:2, :, None], out=gain)
+
+        # Delays, gliding the same way
+        delay = self._delay[:, :voices]
+        previous = self.rendered_delays[:, :voices]
+        target = self._lookup(self.delay_table, voices, fraction)
+        np.subtract(target, previous, out=self._upper[:, :voices])
+        np.multiply(self._upper[:, :voices, None], self._ramp, out=delay)
+        np.add(delay, previous[:, :, None], out=delay)
+        previous[:] = target
+
+        # This block after the last samples of the previous one, per voice
+        history = self._history[:voices]
+        extended = self._extended[:voices]
+        extended[:, :self._history_length] = history
+        extended[:, self._history_length:] = signals
+        history[:] = extended[:, frames:]
+
+        # Fractional read positions -> two taps each, linearly interpolated
+        fraction = self._fraction[:, :voices]
+        np.subtract(self._base, delay, out=fraction)
+        taps = self._taps[:, :voices]
+        np.floor(fraction, out=delay)
+        np.copyto(taps, delay, casting='unsafe')
+        np.subtract(fraction, delay, out=fraction)
+        np.add(taps, self._row_start[:voices], out=taps)
+        flat = self._extended.reshape(-1)
+        early, late = self._early[:, :voices], self._late[:, :voices]
+        np.take(flat, taps, out=early, mode='clip')
+        taps += 1
+        np.take(flat, taps, out=late, mode='clip')  # The tap past a row's end has weight 0
+        np.subtract(late, early, out=late)
+        np.multiply(late, fraction, out=late)
+        np.add(early, late, out=early)
+
+        np.multiply(early, gain, out=early)
+        np.sum(early, axis=1, out=out)
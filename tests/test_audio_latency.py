@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+from audio_latency import BlockSizeController
+
+UNDERRUN = SimpleNamespace(output_underflow=True)
+
+
+def make_controller(**options):
+    return BlockSizeController(initial=256, sample_rate=1000, clock=lambda: 0.0, **options)
+
+
+def render(controller, load, blocks=1, status=None):
+    """Report `blocks` blocks that each took `load` of their duration to render"""
+    for _ in range(blocks):
+        controller.on_block(controller.blocksize, status, load * controller.blocksize / 1000)
+
+
+def test_starts_at_the_nearest_size():
+    assert BlockSizeController(initial=300).blocksize == 256
+
+
+def test_quiet_stream_keeps_its_size_until_tighten_after():
+    controller = make_controller(tighten_after=10.0)
+    render(controller, 0.1, blocks=50)
+    assert controller.decide(now=5.0) is None
+    assert controller.decide(now=10.0) == 128
+    assert controller.changes == 1
+    assert controller.load is None  # Measured afresh at the new size
+
+
+def test_underrun_moves_one_size_up_and_bars_the_failed_size():
+    controller = make_controller(hold=5.0, tighten_after=1.0)
+    render(controller, 0.1, status=UNDERRUN)
+    assert controller.decide(now=0.0) == 512
+
+    # Quiet again, but 256 just failed: stay until its hold has passed
+    render(controller, 0.1, blocks=50)
+    assert controller.decide(now=2.0) is None
+    assert controller.decide(now=5.0) == 256
+
+
+def test_hold_doubles_each_time_a_size_fails_again():
+    controller = make_controller(hold=5.0, tighten_after=0.0)
+    render(controller, 0.1, status=UNDERRUN)
+    controller.decide(now=0.0)                  # 256 failed, barred until 5
+    render(controller, 0.1, blocks=50)
+    assert controller.decide(now=5.0) == 256
+    render(controller, 0.1, status=UNDERRUN)
+    assert controller.decide(now=6.0) == 512    # 256 failed again, barred until 6 + 10
+    render(controller, 0.1, blocks=50)
+    assert controller.decide(now=15.0) is None
+    assert controller.decide(now=16.0) == 256
+
+
+def test_high_load_moves_up_without_barring():
+    controller = make_controller(max_load=0.6, tighten_after=0.0)
+    render(controller, 0.9, blocks=50)
+    assert controller.decide(now=0.0) == 512
+    render(controller, 0.1, blocks=50)
+    assert controller.decide(now=0.0) == 256
+
+
+def test_moderate_load_stays_put():
+    controller = make_controller(idle_load=0.25, max_load=0.6, tighten_after=0.0)
+    render(controller, 0.4, blocks=50)
+    assert controller.decide(now=100.0) is None
+
+
+def test_largest_size_is_the_ceiling():
+    controller = BlockSizeController(sizes=(256, 512), initial=512, sample_rate=1000, clock=lambda: 0.0)
+    render(controller, 0.1, status=UNDERRUN)
+    assert controller.decide(now=0.0) is None
+    assert controller.blocksize == 512
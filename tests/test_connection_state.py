@@ -0,0 +1,151 @@
+import heapq
+import random
+
+import pytest
+
+from connection_state import BACKOFF, CONNECTED, CONNECTING, DISCONNECTED, FAILED, Backoff, Link
+
+
+class FakeLoop:
+    """call_later and a clock under the test's control"""
+    def __init__(self):
+        self.now = 0.0
+        self._timers = []
+        self._order = 0
+
+    def clock(self):
+        return self.now
+
+    def call_later(self, delay, fn, *args):
+        self._order += 1
+        heapq.heappush(self._timers, (self.now + delay, self._order, fn, args))
+
+    def advance(self, seconds):
+        """Run every timer due within the next `seconds`, in order"""
+        end = self.now + seconds
+        while self._timers and self._timers[0][0] <= end:
+            when, _, fn, args = heapq.heappop(self._timers)
+            self.now = when
+            fn(*args)
+        self.now = end
+
+
+def make_link(**options):
+    loop = FakeLoop()
+    calls = []
+    heard = [None]
+    states = []
+    link = Link('beacon', lambda p: calls.append('connect'), lambda p: calls.append('disconnect'),
+                loop.call_later, heard=lambda: heard[0], clock=loop.clock,
+                backoff=Backoff(initial=0.05, maximum=2.0, jitter=0.0),
+                on_state=lambda link, old, new: states.append(new), **options)
+    return link, loop, calls, heard, states
+
+
+def test_backoff_doubles_up_to_the_maximum_and_resets():
+    backoff = Backoff(initial=0.05, maximum=0.3, jitter=0.0)
+    assert [backoff.next() for _ in range(4)] == pytest.approx([0.05, 0.1, 0.2, 0.3])
+    backoff.reset()
+    assert backoff.next() == pytest.approx(0.05)
+
+
+def test_backoff_jitter_only_shortens_delays():
+    backoff = Backoff(initial=1.0, maximum=1.0, jitter=0.5, rng=random.Random(0))
+    delays = [backoff.next() for _ in range(100)]
+    assert all(0.5 <= delay <= 1.0 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_start_connects_and_on_connected_enters_connected():
+    link, loop, calls, _, states = make_link()
+    link.start()
+    assert link.state == CONNECTING and calls == ['connect']
+    link.start()  # Already trying
+    assert calls == ['connect']
+    loop.advance(0.1)
+    link.on_connected()
+    assert link.state == CONNECTED
+    assert link.last_downtime is None
+    assert states == [CONNECTING, CONNECTED]
+
+
+def test_connect_timeout_cancels_and_retries_after_backoff():
+    link, loop, calls, _, states = make_link(connect_timeout=2.0)
+    link.start()
+    loop.advance(2.0)
+    assert calls == ['connect', 'disconnect'] and link.state == BACKOFF
+    loop.advance(0.05)
+    assert calls[-1] == 'connect' and link.state == CONNECTING and link.attempts == 2
+
+
+def test_failed_attempts_back_off_exponentially():
+    link, loop, _, _, _ = make_link()
+    link.start()
+    delays = []
+    for _ in range(4):
+        link.on_disconnected('failed')  # The attempt failed at once
+        failed = loop.now
+        while link.state == BACKOFF:
+            loop.advance(0.001)
+        delays.append(loop.now - failed)
+    assert delays == pytest.approx([0.05, 0.1, 0.2, 0.4], abs=0.0015)
+
+
+def test_max_attempts_gives_up_until_started_again():
+    link, loop, calls, _, states = make_link(max_attempts=2)
+    link.start()
+    link.on_disconnected('failed')
+    loop.advance(0.05)
+    link.on_disconnected('failed')
+    assert link.state == FAILED
+    loop.advance(10.0)
+    assert calls.count('connect') == 2
+    link.start()
+    assert link.state == CONNECTING and link.attempts == 1
+
+
+def test_lost_link_reconnects_at_once_and_measures_the_outage():
+    link, loop, calls, _, _ = make_link()
+    link.start()
+    link.on_connected()
+    loop.advance(0.5)
+    link.on_disconnected()
+    assert link.state == CONNECTING and link.outages == 1
+    loop.advance(0.2)
+    link.on_connected()
+    assert link.last_downtime == pytest.approx(0.2)
+    assert link.down_since is None
+
+
+def test_silent_link_is_treated_as_stalled():
+    link, loop, calls, heard, _ = make_link(stall_timeout=1.0)
+    link.start()
+    link.on_connected()
+    # Readings keep the watchdog re-arming
+    for _ in range(5):
+        loop.advance(0.5)
+        heard[0] = loop.now
+    assert link.state == CONNECTED and link.stalls == 0
+    loop.advance(1.0)
+    assert link.stalls == 1
+    assert calls[-1] == 'disconnect' and link.state == BACKOFF
+
+
+def test_timers_of_a_state_that_was_left_are_ignored():
+    link, loop, calls, _, _ = make_link(connect_timeout=2.0)
+    link.start()
+    link.on_connected()   # Before the connect timeout fires
+    before = list(calls)
+    loop.advance(0.5)
+    link.close()
+    loop.advance(10.0)
+    assert link.state == DISCONNECTED
+    assert calls == before  # Neither the connect timeout nor the stall watchdog acted
+
+
+def test_stale_events_are_ignored():
+    link, _, calls, _, _ = make_link()
+    link.on_connected()          # Never started
+    assert link.state == DISCONNECTED
+    link.on_disconnected()
+    assert link.state == DISCONNECTED and calls == []
@@ -0,0 +1,69 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from frequency_map import FrequencyMap
+
+
+def formula(rssi, min_rssi=-100, max_rssi=-40, min_freq=110, max_freq=1760, factor=2.0):
+    """The original per-call logarithmic mapping the table replaces"""
+    rssi = max(min_rssi, min(max_rssi, rssi))
+    normalized = (rssi - min_rssi) / (max_rssi - min_rssi)
+    adjusted = math.log(normalized * (factor - 1) + 1) / math.log(factor)
+    return min_freq * (max_freq / min_freq) ** adjusted
+
+
+def test_grid_points_match_the_formula_exactly():
+    frequency_map = FrequencyMap()
+    for step in range(121):
+        rssi = -100 + step * 0.5
+        assert frequency_map(rssi) == pytest.approx(formula(rssi), rel=1e-12)
+
+
+def test_values_between_grid_points_stay_close_to_the_formula():
+    frequency_map = FrequencyMap()
+    rng = random.Random(0)
+    for _ in range(2000):
+        rssi = rng.uniform(-100, -40)
+        assert frequency_map(rssi) == pytest.approx(formula(rssi), rel=1e-3)
+
+
+def test_out_of_range_rssi_is_clamped():
+    frequency_map = FrequencyMap()
+    assert frequency_map(-130) == pytest.approx(110.0)
+    assert frequency_map(0) == pytest.approx(1760.0)
+
+
+def test_map_array_matches_scalar_lookups():
+    frequency_map = FrequencyMap()
+    rssi = np.random.default_rng(0).uniform(-110, -30, 1000)
+    expected = [frequency_map(value) for value in rssi]
+    np.testing.assert_allclose(frequency_map.map_array(rssi), expected, rtol=1e-12)
+
+
+def test_changing_a_parameter_rebuilds_the_table():
+    frequency_map = FrequencyMap()
+    frequency_map(-70)
+    assert frequency_map.builds == 1
+    frequency_map.max_freq = 880
+    assert frequency_map(-40) == pytest.approx(880.0)
+    assert frequency_map.builds == 2
+    frequency_map.max_freq = 880  # Unchanged: the table stays
+    frequency_map(-40)
+    assert frequency_map.builds == 2
+
+
+@pytest.mark.parametrize('curve', ['linear', 'exponential', lambda normalized, factor: normalized ** 0.5])
+def test_every_curve_spans_the_frequency_range(curve):
+    frequency_map = FrequencyMap(curve=curve)
+    assert frequency_map(-100) == pytest.approx(110.0)
+    assert frequency_map(-40) == pytest.approx(1760.0)
+    values = frequency_map.map_array(np.linspace(-100, -40, 200))
+    assert np.all(np.diff(values) >= 0)
+
+
+def test_unknown_curve_is_rejected():
+    with pytest.raises(ValueError):
+        FrequencyMap(curve='cubic')(-70)
@@ -0,0 +1,124 @@
+import asyncio
+import math
+import os
+import tempfile
+
+import pytest
+
+from ble_pipeline import RSSI_UNAVAILABLE
+from frequency_map import FrequencyMap
+from nav_server import (FRAME_HEADER, READING, TONE, NavServer, SessionShard, decode_tones, encode_request,
+                        read_frame)
+
+
+def test_request_frame_encodes_header_and_readings():
+    frame = encode_request(7, 3, [(1.5, -60), (1.75, -62)])
+    assert FRAME_HEADER.unpack_from(frame) == (7, 3, 2)
+    assert list(READING.iter_unpack(frame[FRAME_HEADER.size:])) == [(1.5, -60), (1.75, -62)]
+
+
+def test_read_frame_round_trip():
+    async def main():
+        reader = asyncio.StreamReader()
+        reader.feed_data(encode_request(1, 1, [(0.0, -70)]) + FRAME_HEADER.pack(1, 2, 0))
+        reader.feed_eof()
+        first = await read_frame(reader, READING)
+        end = await read_frame(reader, READING)
+        return first, end, await read_frame(reader, READING)
+
+    first, end, eof = asyncio.run(main())
+    assert first == (1, 1, READING.pack(0.0, -70))
+    assert end == (1, 2, b'')
+    assert eof is None
+
+
+def test_shard_filters_per_session_and_maps_to_frequencies():
+    shard = SessionShard(filter_kind='moving_average', filter_options={'window': 2})
+    body = encode_request(1, 1, [(0.0, -60), (0.1, -70), (0.2, RSSI_UNAVAILABLE)])[FRAME_HEADER.size:]
+    tones = decode_tones(shard.process(1, body))
+    frequency_map = FrequencyMap()
+    assert tones[0] == pytest.approx((-60.0, frequency_map(-60.0)), rel=1e-6)
+    assert tones[1] == pytest.approx((-65.0, frequency_map(-65.0)), rel=1e-6)
+    assert all(math.isnan(value) for value in tones[2])
+
+    # Another session starts with its own filter
+    other = decode_tones(shard.process(2, encode_request(2, 1, [(0.0, -90)])[FRAME_HEADER.size:]))
+    assert other[0][0] == pytest.approx(-90.0)
+    assert shard.readings == 4 and shard.frames == 2  # Unavailable readings are answered too
+
+
+def test_shard_expires_idle_sessions():
+    now = [0.0]
+    shard = SessionShard(session_timeout=10.0, clock=lambda: now[0])
+    shard.process(1, READING.pack(0.0, -60))
+    now[0] = 5.0
+    shard.process(2, READING.pack(0.0, -60))
+    now[0] = 12.0
+    assert shard.expire() == 1
+    assert list(shard.sessions) == [2]
+
+
+@pytest.mark.parametrize('workers', [0, 1])
+def test_server_answers_every_frame_in_order(workers):
+    async def main():
+        path = os.path.join(tempfile.mkdtemp(), 'nav.sock')
+        server = NavServer(path, workers)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_unix_connection(path)
+            for sequence in range(1, 4):
+                writer.write(encode_request(5, sequence, [(0.0, -60 - sequence)] * sequence))
+            writer.write(FRAME_HEADER.pack(5, 4, 0))
+            frames = [await asyncio.wait_for(read_frame(reader, TONE), 10.0) for _ in range(4)]
+            writer.close()
+            return frames
+        finally:
+            server.close()
+
+    frames = asyncio.run(main())
+    assert [(session, sequence) for session, sequence, _ in frames] == [(5, 1), (5, 2), (5, 3), (5, 4)]
+    assert [len(decode_tones(body)) for _, _, body in frames] == [1, 2, 3, 0]
+
+
+def test_single_process_server_expires_idle_sessions():
+    async def main():
+        path = os.path.join(tempfile.mkdtemp(), 'nav.sock')
+        server = NavServer(path, 0, session_timeout=0.2)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(encode_request(9, 1, [(0.0, -60)]))
+            await read_frame(reader, TONE)
+            held = len(server.shard.sessions)
+            await asyncio.sleep(0.5)
+            writer.close()
+            return held, len(server.shard.sessions)
+        finally:
+            server.close()
+
+    assert asyncio.run(main()) == (1, 0)
+
+
+def test_partial_header_does_not_keep_the_acceptor_busy():
+    async def main():
+        path = os.path.join(tempfile.mkdtemp(), 'nav.sock')
+        server = NavServer(path, 1, header_timeout=0.3)
+        await server.start()
+        try:
+            # Half a header, then hang up; and half a header, kept open
+            _, closing = await asyncio.open_unix_connection(path)
+            closing.write(FRAME_HEADER.pack(1, 1, 1)[:4])
+            await closing.drain()
+            closing.close()
+            _, idle = await asyncio.open_unix_connection(path)
+            idle.write(FRAME_HEADER.pack(2, 1, 1)[:4])
+            await idle.drain()
+            await asyncio.sleep(0.6)
+            idle.close()
+            return len(server._dispatching), server.connections
+        finally:
+            server.close()
+
+    dispatching, connections = asyncio.run(main())
+    assert dispatching == 0
+    assert connections == [0]  # Neither was handed to a worker
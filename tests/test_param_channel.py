@@ -0,0 +1,39 @@
+import threading
+
+from param_channel import ParamChannel, ToneParams
+
+
+def test_publish_merges_fields_and_bumps_the_sequence():
+    channel = ParamChannel(ToneParams(440.0, 0.0, 0.0))
+    assert channel.read() == (0, ToneParams(440.0, 0.0, 0.0, 0.0, None))
+    assert channel.publish(frequency=500.0) == 1
+    assert channel.publish(amplitude=0.3) == 2
+    sequence, params = channel.read()
+    assert sequence == 2
+    assert (params.frequency, params.amplitude, params.pan) == (500.0, 0.3, 0.0)
+
+
+def test_reader_sees_only_the_latest_value():
+    channel = ParamChannel(ToneParams(440.0, 0.0, 0.0))
+    for frequency in (100.0, 200.0, 300.0):
+        channel.publish(frequency=frequency)
+    assert channel.read()[0] == 3
+    assert channel.latest.frequency == 300.0
+
+
+def test_concurrent_partial_updates_are_not_lost():
+    channel = ParamChannel(ToneParams(440.0, 0.0, 0.0))
+    count = 2000
+
+    def publish(field):
+        for i in range(count):
+            channel.publish(**{field: float(i)})
+
+    threads = [threading.Thread(target=publish, args=(field,)) for field in ('frequency', 'amplitude', 'pan')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sequence, params = channel.read()
+    assert sequence == 3 * count
+    assert params.frequency == params.amplitude == params.pan == count - 1
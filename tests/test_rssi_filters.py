@@ -0,0 +1,90 @@
+import random
+import statistics
+
+import pytest
+
+from rssi_filters import (FILTERS, EMAFilter, KalmanFilter, MedianFilter, MovingAverageFilter, RateMeter,
+                          make_filter)
+
+
+def samples(count=500, seed=0):
+    rng = random.Random(seed)
+    return [rng.randint(-100, -40) for _ in range(count)]
+
+
+@pytest.mark.parametrize('window', [1, 3, 8])
+def test_moving_average_matches_the_mean_of_the_window(window):
+    f = MovingAverageFilter(window)
+    history = []
+    for sample in samples():
+        history.append(sample)
+        assert f.update(sample) == pytest.approx(statistics.fmean(history[-window:]))
+
+
+def test_moving_average_resums_without_drift():
+    f = MovingAverageFilter(3)
+    for i in range(3 * MovingAverageFilter.RESUM_INTERVAL):
+        f.update(-60.1 if i % 2 else -70.3)
+    f.update(-50.0)
+    f.update(-50.0)
+    assert f.update(-50.0) == pytest.approx(-50.0, abs=1e-12)
+
+
+@pytest.mark.parametrize('window', [1, 4, 5])
+def test_median_matches_the_median_of_the_window(window):
+    f = MedianFilter(window)
+    history = []
+    for sample in samples():
+        history.append(sample)
+        assert f.update(sample) == statistics.median(history[-window:])
+
+
+def test_median_rejects_a_single_spike():
+    f = MedianFilter(5)
+    for sample in (-70, -70, -70, -20, -70):
+        value = f.update(sample)
+    assert value == -70
+
+
+def test_ema_starts_at_the_first_sample_and_follows_by_alpha():
+    f = EMAFilter(alpha=0.5)
+    assert f.update(-80) == -80.0
+    assert f.update(-60) == -70.0
+    assert f.update(-60) == -65.0
+
+
+def test_kalman_converges_to_a_constant_level():
+    f = KalmanFilter()
+    assert f.update(-90) == -90.0
+    for _ in range(200):
+        value = f.update(-60)
+    assert value == pytest.approx(-60.0, abs=0.01)
+
+
+@pytest.mark.parametrize('kind', sorted(FILTERS))
+def test_reset_forgets_the_history(kind):
+    f = make_filter(kind)
+    for sample in samples(20):
+        f.update(sample)
+    f.reset()
+    assert f.value is None
+    assert f.update(-55) == -55.0
+
+
+def test_make_filter_rejects_unknown_kinds_and_bad_options():
+    with pytest.raises(ValueError):
+        make_filter('lowpass')
+    with pytest.raises(ValueError):
+        make_filter('moving_average', window=0)
+    with pytest.raises(ValueError):
+        make_filter('ema', alpha=0.0)
+
+
+def test_rate_meter_counts_events_in_its_window_only():
+    meter = RateMeter(window=1.0, buckets=10)
+    for i in range(100):
+        meter.mark((i + 0.5) * 0.01)  # 100 events/s for one second, clear of bucket edges
+    assert meter.rate(0.995) == pytest.approx(100.0)
+    assert meter.rate(1.55) == pytest.approx(40.0)  # Only the last 0.4 s are still inside
+    assert meter.rate(5.0) == 0.0
+    assert meter.total == 100
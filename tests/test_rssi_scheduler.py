@@ -0,0 +1,102 @@
+import pytest
+
+from rssi_scheduler import RSSIReadScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_scheduler(**options):
+    clock = FakeClock()
+    reads = []
+    scheduler = RSSIReadScheduler(lambda: reads.append(clock.now), watchdog=False, clock=clock, **options)
+    return scheduler, clock, reads
+
+
+def answer(scheduler, clock, latency):
+    """Answer the oldest outstanding read `latency` seconds after it was issued"""
+    clock.now = scheduler._sent[0] + latency
+    return scheduler.on_read_complete()
+
+
+def test_start_fills_the_minimum_window():
+    scheduler, _, reads = make_scheduler(min_in_flight=2, max_in_flight=4)
+    scheduler.start()
+    assert len(reads) == 2
+    assert scheduler.in_flight == 2
+
+
+def test_window_grows_to_the_budget_while_latency_stays_at_its_floor():
+    scheduler, clock, reads = make_scheduler(min_in_flight=2, max_in_flight=4)
+    scheduler.start()
+    for _ in range(200):
+        answer(scheduler, clock, 0.01)
+        assert scheduler.in_flight <= scheduler.max_in_flight
+    assert scheduler.window == 4
+    assert scheduler.in_flight == 4
+
+
+def test_window_shrinks_when_reads_start_queueing():
+    scheduler, clock, _ = make_scheduler(min_in_flight=2, max_in_flight=4)
+    scheduler.start()
+    for _ in range(200):
+        answer(scheduler, clock, 0.01)
+    for _ in range(200):
+        answer(scheduler, clock, 0.05)  # Five times the floor: requests are queueing
+    assert scheduler.window == scheduler.min_in_flight
+
+
+def test_late_answer_after_a_stall_is_ignored():
+    scheduler, clock, reads = make_scheduler(min_stall_timeout=0.005)
+    scheduler.start()
+    clock.now += 1.0
+    assert scheduler.check_stall()
+    assert scheduler.lost == 2
+    assert len(reads) == 4  # The window was refilled
+    scheduler.stop()
+    for _ in range(2):
+        scheduler.on_read_complete()
+    assert scheduler.on_read_complete() is None  # Nothing outstanding any more
+
+
+def test_stopped_scheduler_issues_no_reads():
+    scheduler, clock, reads = make_scheduler()
+    scheduler.start()
+    scheduler.stop()
+    answer(scheduler, clock, 0.01)
+    assert len(reads) == 2
+
+
+def test_tick_reports_rate_and_the_schedulers_own_cpu():
+    scheduler, clock, _ = make_scheduler()
+    scheduler.start()
+    for _ in range(10 * scheduler.cpu_sample_interval):
+        answer(scheduler, clock, 0.01)
+    clock.now = 2.0
+    cpu = scheduler.cpu_time
+    scheduler.tick()
+    assert cpu > 0  # Sampled completions were timed
+    assert scheduler.achieved_hz == pytest.approx(scheduler.completed / 2.0)
+    assert scheduler.cpu_percent == pytest.approx(cpu / 2.0 * 100)
+
+    # Nothing done since: the next interval shows no CPU
+    clock.now = 3.0
+    scheduler.tick()
+    assert scheduler.cpu_percent == 0.0
+    assert scheduler.achieved_hz == 0.0
+
+
+def test_only_sampled_completions_read_the_cpu_clock(monkeypatch):
+    import rssi_scheduler
+    calls = []
+    monkeypatch.setattr(rssi_scheduler.time, 'thread_time', lambda: calls.append(1) or 0.0)
+    scheduler, clock, _ = make_scheduler()
+    scheduler.start()
+    for _ in range(3 * scheduler.cpu_sample_interval):
+        answer(scheduler, clock, 0.01)
+    assert len(calls) == 2 * 3  # Start and end of every sampled completion
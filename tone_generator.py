@@ -0,0 +1,227 @@
+import math
+import threading
+import time as time_module
+import numpy as np
+
+from metrics import REGISTRY
+from param_channel import ParamChannel, ToneParams
+
+TWO_PI = 2 * math.pi
+
+
+def pan_gains(pan):
+    """Constant-power (left, right) gains for a pan position in [-1, 1]"""
+    angle = (max(-1.0, min(1.0, pan)) + 1) * math.pi / 4
+    return math.cos(angle), math.sin(angle)
+
+
+class ToneOutput:
+    """Owns the audio output stream and feeds it from audio_callback"""
+    def __init__(self, sample_rate=44100, channels=1, stream_factory=None):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        # Callable with sounddevice.OutputStream's signature; None = sounddevice
+        self.stream_factory = stream_factory
+        self.running = False
+        self.stream = None
+        self.blocksize = 0       # Frames per callback; 0 lets the host choose
+        self.latency = None      # Latency hint for the stream ('low', 'high' or seconds); None = default
+        self.latency_controller = None  # See enable_low_latency
+        self.reconfigurations = 0
+        self._stream_lock = threading.Lock()
+        self._monitor = None
+        # Blocks the device needed before we delivered them, across all outputs
+        self.underruns = REGISTRY.counter('echonav_audio_underruns_total',
+                                          'Audio blocks not delivered in time (output underflow)')
+
+    def audio_callback(self, outdata, frames, time, status):
+        raise NotImplementedError
+
+    def _timed_callback(self, outdata, frames, time, status):
+        """audio_callback, reporting each block to the latency controller"""
+        start = time_module.perf_counter()
+        self.audio_callback(outdata, frames, time, status)
+        self.latency_controller.on_block(frames, status, time_module.perf_counter() - start)
+
+    def _open_stream(self):
+        stream_factory = self.stream_factory
+        if stream_factory is None:
+            import sounddevice as sd
+            stream_factory = sd.OutputStream
+        options = {}
+        if self.blocksize:
+            options['blocksize'] = self.blocksize
+        if self.latency is not None:
+            options['latency'] = self.latency
+        self.stream = stream_factory(
+            channels=self.channels,
+            samplerate=self.sample_rate,
+            callback=self._timed_callback if self.latency_controller else self.audio_callback,
+            **options
+        )
+        self.stream.start()
+
+    def _close_stream(self):
+        if self.stream:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    def start(self):
+        """Open the output stream and start calling audio_callback"""
+        with self._stream_lock:
+            if self.running:
+                return
+            self.running = True
+            self._open_stream()
+        if self.latency_controller and not (self._monitor and self._monitor.is_alive()):
+            self._monitor = threading.Thread(target=self._adapt_loop, name='audio-latency', daemon=True)
+            self._monitor.start()
+
+    def stop(self):
+        """Stop and close the output stream"""
+        with self._stream_lock:
+            self.running = False
+            self._close_stream()
+
+    def enable_low_latency(self, controller=None, check_interval=0.5):
+        """Run with small blocks and a 'low' latency hint, adapting the block size to the host.
+
+        A background thread asks `controller` (an audio_latency.BlockSizeController
+        by default) every `check_interval` seconds whether to change the
+        block size, and reopens the stream with the new size when it does;
+        the switch costs one short gap in the audio. Call before start().
+        """
+        from audio_latency import BlockSizeController
+        self.latency_controller = controller or BlockSizeController(sample_rate=self.sample_rate)
+        self.check_interval = check_interval
+        self.blocksize = self.latency_controller.blocksize
+        self.latency = 'low'
+        REGISTRY.gauge('echonav_audio_blocksize_frames', 'Frames per audio callback', lambda: self.blocksize)
+        REGISTRY.gauge('echonav_audio_load', 'Audio callback time as a fraction of the block duration',
+                       lambda: self.latency_controller.load or 0.0)
+        return self.latency_controller
+
+    def _adapt_loop(self):
+        controller = self.latency_controller
+        while self.running:
+            time_module.sleep(self.check_interval)
+            blocksize = controller.decide()
+            if blocksize is None:
+                continue
+            with self._stream_lock:
+                if not self.running:
+                    break
+                self._close_stream()
+                self.blocksize = blocksize
+                self._open_stream()
+                self.reconfigurations += 1
+
+    def stream_settings(self):
+        """Block size, latency and underrun figures of the running stream"""
+        controller = self.latency_controller
+        return {
+            'blocksize': self.blocksize or getattr(self.stream, 'blocksize', 0),
+            'latency': getattr(self.stream, 'latency', self.latency),  # Seconds once the stream is open
+            'underruns': self.underruns.value,
+            'load': controller.load if controller else None,
+            'reconfigurations': self.reconfigurations,
+        }
+
+
+class ContinuousToneGenerator(ToneOutput):
+    """Generates a continuous tone with frequency that can be updated in real-time"""
+    def __init__(self, initial_freq=440.0, sample_rate=44100, channels=1, stream_factory=None):
+        super().__init__(sample_rate, channels, stream_factory)
+        self.frequency = initial_freq
+        self.amplitude = 0.3
+        self.pan = 0.0  # -1 = left, 0 = centre, 1 = right (stereo only)
+        self.phase = 0.0
+
+        # Lock-free handoff of new parameters from the RSSI side
+        self.params = ParamChannel(ToneParams(initial_freq, self.amplitude, self.pan))
+        self._params_seq = 0
+        self._gain_left, self._gain_right = pan_gains(self.pan)
+
+        # Frequency reached at the end of the previous block; each block glides
+        # from here to self.frequency so updates never click
+        self.rendered_frequency = initial_freq
+
+        # Scratch buffers, allocated once per block size (never in steady state)
+        self._frames = 0
+        self._n = None      # 0, 1, ..., frames-1
+        self._tri = None    # n(n+1) / (2 * frames), the integrated glide ramp
+        self._buf = None
+        self._tmp = None
+
+    def _prepare_buffers(self, frames):
+        """Preallocate the scratch buffers for a given block size"""
+        n = np.arange(frames, dtype=np.float64)
+        self._n = n
+        self._tri = n * (n + 1) / (2 * frames)
+        self._buf = np.empty(frames, dtype=np.float64)
+        self._tmp = np.empty(frames, dtype=np.float64)
+        self._frames = frames
+
+    def render(self, out, frames):
+        """Synthesize one block into the 1-D float array `out` without allocating"""
+        if frames != self._frames:
+            self._prepare_buffers(frames)
+
+        # Phase increments per sample at the start and end of the block
+        inc0 = TWO_PI * self.rendered_frequency / self.sample_rate
+        inc1 = TWO_PI * self.frequency / self.sample_rate
+        delta = inc1 - inc0
+
+        # Phase of sample i with a linear frequency glide:
+        # phase + i * inc0 + delta * i(i+1) / (2 * frames)
+        buf = self._buf
+        np.multiply(self._n, inc0, out=buf)
+        np.add(buf, self.phase, out=buf)
+        if delta:
+            np.multiply(self._tri, delta, out=self._tmp)
+            np.add(buf, self._tmp, out=buf)
+
+        # Update phase for next callback (closed form of the sum above)
+        self.phase = (self.phase + frames * inc0 + delta * (frames + 1) / 2) % TWO_PI
+        self.rendered_frequency = self.frequency
+
+        np.sin(buf, out=buf)
+        np.multiply(buf, self.amplitude, out=buf)
+        # copyto casts into the (usually float32, strided) output without the
+        # temporary buffer a mixed-dtype ufunc call would allocate
+        np.copyto(out, buf, casting='same_kind')
+
+    def audio_callback(self, outdata, frames, time, status):
+        """Callback for the sounddevice stream"""
+        if status and status.output_underflow:
+            self.underruns.inc()
+        # Pick up the latest parameters, if any were published
+        seq, params = self.params.read()
+        if seq != self._params_seq:
+            self._params_seq = seq
+            self.frequency = params.frequency
+            self.amplitude = params.amplitude
+            pan = params.pan
+            if pan != self.pan:
+                self.pan = pan
+                self._gain_left, self._gain_right = pan_gains(pan)
+
+        # Write straight into the output buffer
+        left = outdata[:, 0]
+        self.render(left, frames)
+        if self.channels == 2:
+            np.multiply(left, self._gain_right, out=outdata[:, 1])
+            np.multiply(left, self._gain_left, out=left)
+
+    def set_frequency(self, freq):
+        """Update the frequency of the tone"""
+        self.params.publish(frequency=freq)
+
+    def set_amplitude(self, amplitude):
+        """Update the amplitude of the tone"""
+        self.params.publish(amplitude=amplitude)
+
+    def set_pan(self, pan):
+        """Update the stereo position of the tone (-1 left .. 1 right)"""
+        self.params.publish(pan=pan)
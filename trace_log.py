@@ -0,0 +1,284 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from frequency_map import FrequencyMap
+from rssi_filters import make_filter
+
+MAGIC = b'ECHOTRC1'
+HEADER_SIZE = 256  # Magic + JSON header, padded; records start here
+FORMAT = 2         # 1: 16-bit device numbers and a JSON array device table
+
+# Kinds of reading
+KIND_RSSI = 0          # RSSI read on a connection
+KIND_ADVERTISEMENT = 1
+KIND_WIFI = 2
+
+# One fixed-size little-endian record per reading (22 bytes)
+RECORD_DTYPE = np.dtype([
+    ('time', '<f8'),       # Seconds since the start of the trace
+    ('device', '<u4'),     # Index into the trace's device table
+    ('kind', 'u1'),
+    ('rssi', 'i1'),        # Raw dBm
+    ('smoothed', '<f4'),   # Filtered RSSI (NaN if not filtered)
+    ('frequency', '<f4'),  # Tone frequency in Hz (NaN if none)
+])
+
+
+def devices_path(path):
+    """Sidecar file holding the trace's device table, one JSON [identifier, name] line per device"""
+    return path + '.devices.jsonl'
+
+
+def read_devices(path):
+    """Device table of a trace: per index, (identifier, name)"""
+    devices = []
+    try:
+        with open(devices_path(path)) as f:
+            for line in f:
+                try:
+                    devices.append(tuple(json.loads(line)))
+                except ValueError:
+                    break  # Last line cut short by a crash
+    except FileNotFoundError:
+        try:
+            with open(path + '.devices.json') as f:  # Format 1: one JSON array, rewritten whole
+                devices = [tuple(d) for d in json.load(f)]
+        except FileNotFoundError:
+            pass
+    return devices
+
+
+class TraceRecorder:
+    """Appends readings to a binary trace file from a background writer thread.
+
+    record() only appends a tuple to a deque, so it is cheap enough for the
+    RSSI callback. The writer wakes every `flush_interval` seconds, or once
+    `batch_size` readings are waiting, and writes them as one block of
+    fixed-size records. Devices are numbered in order of appearance; their
+    identifiers and names are appended to a sidecar file as they appear.
+    """
+    def __init__(self, path, flush_interval=0.5, batch_size=8192, clock=time.monotonic):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.clock = clock
+        self.start_time = clock()
+        self.devices = {}       # Identifier -> index
+        self.device_names = []  # Per index: [identifier, name]
+        self._devices_written = 0
+        self._pending = deque()
+        self._wake = threading.Event()
+        self.records_written = 0
+        self.flushes = 0
+        self.write_errors = 0
+
+        self._file = open(path, 'wb')
+        self._devices_file = open(devices_path(path), 'w')
+        header = json.dumps({'format': FORMAT, 'dtype': RECORD_DTYPE.descr,
+                             'started': time.time()}).encode()
+        if len(MAGIC) + len(header) > HEADER_SIZE:
+            raise ValueError("Trace header too large")
+        self._file.write(MAGIC + header.ljust(HEADER_SIZE - len(MAGIC), b' '))
+        self._file.flush()
+
+        self.running = True
+        self._thread = threading.Thread(target=self._writer, name='trace-writer', daemon=True)
+        self._thread.start()
+
+    def device_index(self, identifier, name=None):
+        """Number of a device in this trace, registering it on first use"""
+        index = self.devices.get(identifier)
+        if index is None:
+            index = len(self.device_names)
+            self.device_names.append([identifier, name])
+            self.devices[identifier] = index
+        return index
+
+    def record(self, identifier, rssi, smoothed=np.nan, frequency=np.nan, when=None,
+               kind=KIND_RSSI, name=None):
+        """Queue one reading; `when` is on the recorder's clock (default: now)"""
+        index = self.devices.get(identifier)
+        if index is None:
+            index = self.device_index(identifier, name)
+        t = (self.clock() if when is None else when) - self.start_time
+        pending = self._pending
+        pending.append((t, index, kind, rssi, smoothed, frequency))
+        if len(pending) >= self.batch_size:
+            self._wake.set()
+
+    def record_advertisement(self, identifier, rssi, when=None, name=None):
+        """Queue the RSSI of one advertisement"""
+        self.record(identifier, rssi, when=when, kind=KIND_ADVERTISEMENT, name=name)
+
+    def _writer(self):
+        while self.running:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # That batch is lost, but the writer keeps draining the queue
+                self.write_errors += 1
+                print(f"Trace write failed: {e}")
+
+    def flush(self):
+        """Write all queued readings now"""
+        pending = self._pending
+        count = len(pending)
+        if count:
+            block = np.array([pending.popleft() for _ in range(count)], dtype=RECORD_DTYPE)
+            self._file.write(block.tobytes())
+            self._file.flush()
+            self.records_written += count
+            self.flushes += 1
+        written = self._devices_written
+        if len(self.device_names) != written:
+            new = self.device_names[written:]
+            self._devices_file.write(''.join(json.dumps(entry) + '\n' for entry in new))
+            self._devices_file.flush()
+            self._devices_written = written + len(new)
+
+    def close(self):
+        """Stop the writer and write everything still queued"""
+        if not self.running:
+            return
+        self.running = False
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        self._file.close()
+        self._devices_file.close()
+
+
+class TraceReader:
+    """Memory-maps a trace so that even multi-GB files open instantly.
+
+    `records` is a read-only structured array over the file; the columns
+    (time, device, rssi, ...) are zero-copy views of it. A record cut short
+    by a crash is ignored.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            head = f.read(HEADER_SIZE)
+        if not head.startswith(MAGIC):
+            raise ValueError(f"{path} is not an EchoNav trace")
+        self.header = json.loads(head[len(MAGIC):].decode())
+        # The record layout is in the header, so older formats open too
+        dtype = np.dtype([tuple(field) for field in self.header['dtype']])
+        count = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+        if count:
+            self.records = np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE, shape=(count,))
+        else:
+            self.records = np.empty(0, dtype=dtype)
+        self.devices = read_devices(path)  # Per index: (identifier, name)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, column):
+        return self.records[column]
+
+    @property
+    def duration(self):
+        return float(self.records['time'][-1] - self.records['time'][0]) if len(self) else 0.0
+
+    def device_number(self, identifier):
+        for index, (device, _) in enumerate(self.devices):
+            if device == identifier:
+                return index
+        raise KeyError(identifier)
+
+    def select(self, device=None, kind=None):
+        """Records of one device number and/or kind"""
+        mask = np.ones(len(self), dtype=bool)
+        if device is not None:
+            mask &= self.records['device'] == device
+        if kind is not None:
+            mask &= self.records['kind'] == kind
+        return self.records[mask]
+
+    def recorded_trace(self, device, kind=KIND_RSSI):
+        """A simulated_backend.RecordedTrace of one device, to replay through the simulator"""
+        from simulated_backend import RecordedTrace
+        records = self.select(device, kind)
+        return RecordedTrace(records['time'], records['rssi'], loop=False)
+
+
+def replay(reader, filter_kind='moving_average', filter_options=None, frequency_map=None,
+           kind=KIND_RSSI, speed=None, on_reading=None):
+    """Run a trace's raw RSSI through the filter -> frequency pipeline.
+
+    Each device gets a fresh filter (see rssi_filters.make_filter) and the
+    frequencies come from `frequency_map` (a default FrequencyMap if None).
+    With speed=None readings are processed as fast as possible; otherwise
+    they are paced at `speed` times real time. on_reading(device, time, rssi,
+    smoothed, frequency) is called for every reading if given.
+
+    Returns {device number: (smoothed, frequency)} as float arrays, in trace
+    order, for comparing against the recorded columns or a previous run.
+    """
+    frequency_map = frequency_map or FrequencyMap()
+    options = dict(filter_options or {})
+    if filter_kind in ('moving_average', 'median'):
+        options.setdefault('window', 3)
+    records = reader.select(kind=kind)
+    results = {}
+    for device in np.unique(records['device']).tolist():
+        device_records = records[records['device'] == device]
+        rssi = device_records['rssi'].tolist()
+        update = make_filter(filter_kind, **options).update
+        if speed is None and on_reading is None:
+            smoothed = np.array([update(value) for value in rssi], dtype=np.float64)
+        else:
+            smoothed = np.empty(len(rssi))
+            times = device_records['time']
+            start, origin = time.monotonic(), float(times[0]) if len(times) else 0.0
+            for i, value in enumerate(rssi):
+                if speed:
+                    delay = (times[i] - origin) / speed - (time.monotonic() - start)
+                    if delay > 0:
+                        time.sleep(delay)
+                smoothed[i] = update(value)
+                if on_reading:
+                    on_reading(device, float(times[i]), value, smoothed[i], frequency_map(smoothed[i]))
+        results[device] = (smoothed, frequency_map.map_array(smoothed))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Summarize an EchoNav trace and replay it through the RSSI pipeline")
+    parser.add_argument('path')
+    parser.add_argument('--filter', default='moving_average', help="filter to replay with")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    reader = TraceReader(args.path)
+    opened = time.perf_counter() - start
+    print(f"{len(reader)} records over {reader.duration:.1f} s, opened in {opened * 1000:.1f} ms")
+    for index, (identifier, name) in enumerate(reader.devices):
+        records = reader.select(index)
+        if len(records):
+            print(f"  [{index}] {name or 'Unnamed'} ({identifier}): {len(records)} readings, "
+                  f"RSSI {records['rssi'].min()}..{records['rssi'].max()}")
+
+    start = time.perf_counter()
+    results = replay(reader, args.filter)
+    elapsed = time.perf_counter() - start
+    readings = sum(len(smoothed) for smoothed, _ in results.values())
+    if readings:
+        print(f"Replayed {readings} readings in {elapsed * 1000:.0f} ms "
+              f"({reader.duration / max(elapsed, 1e-9):.0f}x real time)")
+        recorded = reader.select(kind=KIND_RSSI)
+        for device, (smoothed, frequency) in results.items():
+            reference = recorded['frequency'][recorded['device'] == device]
+            known = ~np.isnan(reference)
+            if known.any():
+                drift = np.max(np.abs(frequency[known] - reference[known]))
+                print(f"  [{device}] max frequency difference vs. recording: {drift:.2f} Hz")
@@ -0,0 +1,267 @@
+import math
+from collections import deque
+
+import numpy as np
+
+from param_channel import ParamChannel, ToneParams
+from tone_generator import TWO_PI, ToneOutput
+
+
+class Voice:
+    """Handle for one voice in a VoicePool; same control methods as ContinuousToneGenerator"""
+    def __init__(self, pool, slot):
+        self.pool = pool
+        self.slot = slot
+        self.params = pool.params[slot]
+        self.released = False
+
+    def set_frequency(self, freq):
+        return self.params.publish(frequency=freq)
+
+    def set_amplitude(self, amplitude):
+        self.params.publish(amplitude=amplitude)
+
+    def set_pan(self, pan):
+        self.params.publish(pan=pan)
+
+    def set_timbre(self, timbre):
+        self.params.publish(timbre=timbre)
+
+    def set_bearing(self, bearing):
+        """Direction of the voice in radians clockwise from ahead, with spatial output (see enable_spatial)"""
+        self.params.publish(bearing=bearing)
+
+    def release(self):
+        self.pool.release(self)
+
+
+class VoicePool(ToneOutput):
+    """Many tone voices mixed into one output stream by a single vectorized callback.
+
+    Every voice has a frequency and a gain that glide within each block (like
+    ContinuousToneGenerator's frequency), a stereo position and a timbre (the
+    depth of a sine self-modulation: 0 is a pure sine, ~1 sounds reedy). All
+    voices are synthesized together as a (voices x frames) matrix and mixed
+    down with one matrix product, so the per-voice cost is a handful of
+    vectorized operations rather than a Python-level loop over samples.
+    The sample matrix is float32 (the output format anyway), where numpy's
+    sin is SIMD-vectorized and several times faster than in float64; the
+    per-voice phase is still carried between blocks in float64.
+
+    enable_spatial() swaps the pan mixdown for a spatial_audio.SpatialRenderer,
+    which places each voice at its bearing in stereo or binaural output.
+
+    Parameters reach the audio thread through one ParamChannel per voice.
+    With `trace_clock` set, the pool also notes for each voice which
+    parameter sequence it picked up last and when that block reaches the
+    speaker (on trace_clock), for latency.LatencyTracer.
+    """
+    def __init__(self, max_voices=64, sample_rate=44100, channels=2, stream_factory=None,
+                 auto_gain=True):
+        super().__init__(sample_rate, channels, stream_factory)
+        self.max_voices = max_voices
+        # Scale the mix by 1/sqrt(active voices) so many beacons do not clip
+        self.auto_gain = auto_gain
+
+        self.params = [ParamChannel(ToneParams(440.0, 0.0, 0.0)) for _ in range(max_voices)]
+        self._params_seq = [0] * max_voices
+        self._free = deque(range(max_voices))  # Slots ready for allocate()
+        self._released = deque()               # Slots to retire after their fade-out block
+        self.active_count = 0
+        self._voices = 0                       # Rows rendered: highest slot in use + 1
+
+        # Per-voice state (audio thread)
+        self.frequency = np.zeros(max_voices)
+        self.rendered_frequency = np.zeros(max_voices)
+        self.amplitude = np.zeros(max_voices)
+        self.rendered_amplitude = np.zeros(max_voices)
+        self.pan = np.zeros(max_voices)
+        self.bearing = np.zeros(max_voices)    # Radians, for the spatializer
+        self.timbre = np.zeros(max_voices)
+        self.phase = np.zeros(max_voices)
+        self.gains = np.zeros((channels, max_voices), dtype=np.float32)  # Pan and headroom per channel and voice
+        self._any_timbre = False
+        self._gains_active = -1  # active_count the gains were computed for
+        self._headroom = 1.0
+        self.spatializer = None  # SpatialRenderer replacing the pan mixdown (see enable_spatial)
+
+        # Per-voice scratch vectors
+        self._inc0 = np.zeros(max_voices)
+        self._delta = np.zeros(max_voices)
+        self._amp_delta = np.zeros(max_voices)
+        self._scratch = np.zeros(max_voices)
+        self._column = np.zeros((4, max_voices, 1), dtype=np.float32)  # float32 copies for broadcasting
+
+        # Block-sized scratch, allocated once per block size
+        self._frames = 0
+
+        # Latency tracing (off unless trace_clock is set): per slot, (sequence, time it plays)
+        self.trace_clock = None
+        self.applied = [(0, 0.0)] * max_voices
+        self._block_time = 0.0
+
+    def _prepare_buffers(self, frames):
+        n = np.arange(frames, dtype=np.float64)
+        self._n = n.astype(np.float32)
+        self._tri = (n * (n + 1) / (2 * frames)).astype(np.float32)
+        self._ramp = ((n + 1) / frames).astype(np.float32)
+        self._matrix = np.empty((self.max_voices, frames), dtype=np.float32)
+        self._modulation = np.empty((self.max_voices, frames), dtype=np.float32)
+        self._mix = np.empty((self.channels, frames), dtype=np.float32)
+        self._frames = frames
+
+    # -- control side -----------------------------------------------------
+
+    def enable_spatial(self, mode='binaural', **options):
+        """Place voices by bearing instead of pan (see spatial_audio.SpatialRenderer). Call before start()"""
+        from spatial_audio import SpatialRenderer
+        if self.channels != 2:
+            raise ValueError("Spatial output needs a stereo pool (channels=2)")
+        self.spatializer = SpatialRenderer(self.max_voices, self.sample_rate, mode, **options)
+        return self.spatializer
+
+    def allocate(self, frequency=440.0, amplitude=0.3, pan=0.0, timbre=0.0):
+        """Start a new voice and return its Voice handle"""
+        if not self._free:
+            raise RuntimeError(f"All {self.max_voices} voices are in use")
+        slot = self._free.popleft()
+        # Every field, so nothing carries over from the slot's previous voice
+        self.params[slot].publish(frequency=frequency, amplitude=amplitude, pan=pan, timbre=timbre,
+                                  bearing=None)
+        self.active_count += 1
+        if slot >= self._voices:
+            self._voices = slot + 1
+        return Voice(self, slot)
+
+    def release(self, voice):
+        """Fade a voice out; its slot is reused after the next block. Releasing it again does nothing"""
+        if voice.released:
+            return
+        voice.released = True
+        voice.params.publish(amplitude=0.0)
+        self.active_count -= 1
+        self._released.append(voice.slot)
+
+    # -- audio side -------------------------------------------------------
+
+    def _apply_params(self, voices):
+        """Pick up parameters published since the last block"""
+        # Gains only depend on pan, timbre and the number of active voices
+        changed = self.active_count != self._gains_active
+        for slot in range(voices):
+            seq, params = self.params[slot].read()
+            if seq == self._params_seq[slot]:
+                continue
+            silent = self.amplitude[slot] == 0 and self.rendered_amplitude[slot] == 0
+            self._params_seq[slot] = seq
+            if self.trace_clock is not None:
+                self.applied[slot] = (seq, self._block_time)
+            self.frequency[slot] = params.frequency
+            if silent:
+                # A (re)started voice begins at its pitch and fades in from there
+                self.rendered_frequency[slot] = params.frequency
+            self.amplitude[slot] = params.amplitude
+            if params.pan != self.pan[slot] or params.timbre != self.timbre[slot]:
+                self.pan[slot] = params.pan
+                self.timbre[slot] = params.timbre
+                changed = True
+            # Without a bearing of its own, a voice sits where its pan puts it
+            self.bearing[slot] = params.pan * (math.pi / 2) if params.bearing is None else params.bearing
+        if changed:
+            self._update_gains(voices)
+
+    def _update_gains(self, voices):
+        self._gains_active = self.active_count
+        headroom = 1.0 / math.sqrt(max(1, self.active_count)) if self.auto_gain else 1.0
+        self._headroom = headroom
+        if self.channels == 2:
+            angle = (np.clip(self.pan[:voices], -1.0, 1.0) + 1) * (math.pi / 4)
+            np.multiply(np.cos(angle), headroom, out=self.gains[0, :voices])
+            np.multiply(np.sin(angle), headroom, out=self.gains[1, :voices])
+        else:
+            self.gains[:, :voices] = headroom
+        self._any_timbre = bool(np.any(self.timbre[:voices]))
+
+    def render(self, out, frames):
+        """Synthesize and mix all voices into `out` (frames x channels)"""
+        if frames != self._frames:
+            self._prepare_buffers(frames)
+        voices = self._voices
+        if voices == 0:
+            out.fill(0)
+            return
+
+        # Per-voice phase increments at the start of the block and their glide
+        scale = TWO_PI / self.sample_rate
+        inc0 = self._inc0[:voices]
+        delta = self._delta[:voices]
+        np.multiply(self.rendered_frequency[:voices], scale, out=inc0)
+        np.multiply(self.frequency[:voices], scale, out=delta)
+        np.subtract(delta, inc0, out=delta)
+
+        # float32 columns of the per-voice values the matrix ops broadcast
+        inc0_col, delta_col, phase_col, amp_col = self._column[:, :voices]
+        np.copyto(inc0_col[:, 0], inc0, casting='same_kind')
+        np.copyto(delta_col[:, 0], delta, casting='same_kind')
+        np.copyto(phase_col[:, 0], self.phase[:voices], casting='same_kind')
+
+        # Phase matrix: phase + i * inc0 + delta * i(i+1) / (2 * frames)
+        phases = self._matrix[:voices]
+        glide = self._modulation[:voices]
+        np.multiply(inc0_col, self._n, out=phases)
+        np.add(phases, phase_col, out=phases)
+        np.multiply(delta_col, self._tri, out=glide)
+        np.add(phases, glide, out=phases)
+
+        # Advance each voice's phase to the end of the block
+        phase = self.phase[:voices]
+        scratch = self._scratch[:voices]
+        np.multiply(inc0, frames, out=scratch)
+        np.add(phase, scratch, out=phase)
+        np.multiply(delta, (frames + 1) / 2, out=scratch)
+        np.add(phase, scratch, out=phase)
+        np.remainder(phase, TWO_PI, out=phase)
+        self.rendered_frequency[:voices] = self.frequency[:voices]
+
+        if self._any_timbre:
+            # sin(p + timbre * sin(p)): adds harmonics so voices are easier to tell apart
+            np.sin(phases, out=glide)
+            np.copyto(amp_col[:, 0], self.timbre[:voices], casting='same_kind')
+            np.multiply(glide, amp_col, out=glide)
+            np.add(phases, glide, out=phases)
+        np.sin(phases, out=phases)
+
+        # Gain ramp from the previous block's amplitude to the new one, per voice
+        amp_delta = self._amp_delta[:voices]
+        np.subtract(self.amplitude[:voices], self.rendered_amplitude[:voices], out=amp_delta)
+        np.copyto(delta_col[:, 0], amp_delta, casting='same_kind')
+        np.copyto(amp_col[:, 0], self.rendered_amplitude[:voices], casting='same_kind')
+        np.multiply(delta_col, self._ramp, out=glide)
+        np.add(glide, amp_col, out=glide)
+        np.multiply(phases, glide, out=phases)
+        self.rendered_amplitude[:voices] = self.amplitude[:voices]
+
+        # Mix down: (channels x voices) @ (voices x frames), or placed at each voice's bearing
+        if self.spatializer is not None:
+            self.spatializer.mix(phases, self.bearing, self._mix, self._headroom)
+        else:
+            np.matmul(self.gains[:, :voices], phases, out=self._mix)
+        np.copyto(out.T, self._mix, casting='same_kind')
+
+    def audio_callback(self, outdata, frames, time, status):
+        """Callback for the sounddevice stream"""
+        if status and status.output_underflow:
+            self.underruns.inc()
+        voices = self._voices
+        retiring = len(self._released)
+        if self.trace_clock is not None:
+            # When this block's first sample reaches the DAC
+            self._block_time = self.trace_clock()
+            if time is not None and time.outputBufferDacTime > time.currentTime:  # 0 if the host API can't tell
+                self._block_time += time.outputBufferDacTime - time.currentTime
+        self._apply_params(voices)
+        self.render(outdata, frames)
+
+        # Voices released before this block have now faded to silence
+        for _ in range(retiring):
+            self._free.append(self._released.popleft())
@@ -0,0 +1,215 @@
+import json
+import os
+
+import numpy as np
+
+# RSSI stored for an access point a scan did not see; readings are clipped to [MISSING, 0]
+MISSING = -100
+
+FORMAT_VERSION = 1
+
+
+def scan_vector(networks, column, width):
+    """RSSI vector (int8, MISSING where unseen) of a scan_wifi_networks result"""
+    vector = np.full(width, MISSING, dtype=np.int8)
+    for net in networks:
+        i = column.get(net['bssid'])
+        if i is not None:
+            vector[i] = max(MISSING, min(0, int(round(net['rssi']))))
+    return vector
+
+
+class FingerprintSurvey:
+    """Records WiFi scans at labelled locations and writes them as a fingerprint database.
+
+    Every recorded scan becomes one fingerprint row; record several scans per
+    spot to capture its spread. save() merges with an existing database in
+    the same directory.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.scans = []  # (label, position or None, {bssid: rssi})
+
+    def record(self, label, networks, position=None):
+        """Add one scan (scan_wifi_networks output) taken at `label`, optionally at (x, y)"""
+        readings = {net['bssid']: net['rssi'] for net in networks if net['bssid'] != "Unknown"}
+        if readings:
+            self.scans.append((label, position, readings))
+        return len(readings)
+
+    def save(self, index_aps=3):
+        """Write the database; returns the number of fingerprints in it"""
+        labels, positions, vectors, bssids = [], [], [], []
+        if os.path.exists(os.path.join(self.path, 'meta.json')):
+            existing = FingerprintDatabase(self.path, mmap=False)
+            bssids = list(existing.bssids)
+            labels = list(existing.labels)
+            positions = [tuple(p) for p in existing.positions]
+            vectors = [existing.fingerprints]
+
+        column = {bssid: i for i, bssid in enumerate(bssids)}
+        for _, _, readings in self.scans:
+            for bssid in readings:
+                if bssid not in column:
+                    column[bssid] = len(bssids)
+                    bssids.append(bssid)
+
+        width = len(bssids)
+        if vectors:
+            # Widen the existing matrix with columns for newly seen access points
+            old = vectors[0]
+            vectors = [np.pad(old, ((0, 0), (0, width - old.shape[1])), constant_values=MISSING)]
+        new = np.full((len(self.scans), width), MISSING, dtype=np.int8)
+        for row, (label, position, readings) in enumerate(self.scans):
+            for bssid, rssi in readings.items():
+                new[row, column[bssid]] = max(MISSING, min(0, int(round(rssi))))
+            labels.append(label)
+            positions.append(position if position is not None else (np.nan, np.nan))
+        vectors.append(new)
+
+        write_database(self.path, np.concatenate(vectors), bssids, labels,
+                       np.array(positions, dtype=np.float32).reshape(-1, 2), index_aps)
+        self.scans = []
+        return len(labels)
+
+
+def write_database(path, fingerprints, bssids, labels, positions, index_aps=3):
+    """Write a fingerprint matrix (rows x access points, int8) with its index and metadata"""
+    os.makedirs(path, exist_ok=True)
+    fingerprints = np.ascontiguousarray(fingerprints, dtype=np.int8)
+    rows, width = fingerprints.shape
+
+    # Inverted index: access point -> rows where it is among the `index_aps` strongest
+    top = min(index_aps, width)
+    strongest = np.argpartition(fingerprints, width - top, axis=1)[:, width - top:] if width else np.empty((rows, 0), int)
+    heard = np.take_along_axis(fingerprints, strongest, axis=1) > MISSING
+    postings_ap = strongest[heard]
+    postings_row = np.repeat(np.arange(rows), top)[heard.ravel()]
+    order = np.argsort(postings_ap, kind='stable')
+    offsets = np.zeros(width + 1, dtype=np.int64)
+    np.cumsum(np.bincount(postings_ap, minlength=width), out=offsets[1:])
+
+    # Squared distance of each row from an empty scan, to complete partial distances at query time
+    energy = np.sum(np.square(fingerprints.astype(np.float32) - MISSING), axis=1)
+
+    np.save(os.path.join(path, 'fingerprints.npy'), fingerprints)
+    np.save(os.path.join(path, 'positions.npy'), np.asarray(positions, dtype=np.float32))
+    np.save(os.path.join(path, 'labels.npy'), np.array(labels, dtype=str))
+    np.save(os.path.join(path, 'energy.npy'), energy)
+    np.save(os.path.join(path, 'index_offsets.npy'), offsets)
+    np.save(os.path.join(path, 'index_rows.npy'), postings_row[order].astype(np.int32))
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump({'version': FORMAT_VERSION, 'missing': MISSING, 'index_aps': top,
+                   'bssids': list(bssids)}, f)
+
+
+class FingerprintDatabase:
+    """k-NN WiFi localization against a surveyed fingerprint database.
+
+    The arrays are memory-mapped, so opening even a large database is
+    immediate and only the pages a query touches are read. A query only
+    compares the fingerprints that share one of its strongest access points
+    (via the inverted index), and only on the access points the scan saw;
+    the rest of each distance comes from a precomputed per-row term.
+    """
+    def __init__(self, path, mmap=True):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported fingerprint database version {meta.get('version')} in {path}")
+        self.bssids = meta['bssids']
+        self.column = {bssid: i for i, bssid in enumerate(self.bssids)}
+        self.index_aps = meta['index_aps']
+        mode = 'r' if mmap else None
+        # Plain ndarray views of the maps: np.memmap's per-operation overhead shows up at these sizes
+        load = lambda name: np.asarray(np.load(os.path.join(path, name), mmap_mode=mode))
+        self.fingerprints = load('fingerprints.npy')
+        self.positions = load('positions.npy')
+        self.energy = load('energy.npy')
+        self.index_offsets = load('index_offsets.npy')
+        self.index_rows = load('index_rows.npy')
+        self._labels = None
+        self._mmap = mode
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    @property
+    def labels(self):
+        """Location label of every fingerprint, loaded on first use"""
+        if self._labels is None:
+            self._labels = np.asarray(np.load(os.path.join(self.path, 'labels.npy'), mmap_mode=self._mmap))
+        return self._labels
+
+    def candidates(self, vector, probes=None, min_shared=2, min_candidates=32):
+        """Rows whose strongest access points overlap the scan's strongest ones.
+
+        Rows sharing at least `min_shared` of the scan's `probes` strongest
+        access points are kept; if fewer than `min_candidates` do, any
+        overlap is enough.
+        """
+        heard = np.flatnonzero(vector > MISSING)
+        if not len(heard):
+            return np.empty(0, dtype=np.intp)
+        probes = probes or self.index_aps
+        strongest = heard[np.argsort(vector[heard])[::-1][:probes]]
+        offsets = self.index_offsets
+        # Count overlaps per row in a dense array: linear in the database size but far cheaper than sorting
+        shared = np.zeros(len(self), dtype=np.int8)
+        for ap in strongest:
+            shared[self.index_rows[offsets[ap]:offsets[ap + 1]]] += 1
+        rows = np.flatnonzero(shared >= min(min_shared, len(strongest)))
+        if len(rows) < min_candidates:
+            rows = np.flatnonzero(shared)
+        return rows
+
+    def nearest(self, networks, k=3, exhaustive=False):
+        """The k closest fingerprints to a scan: (rows, distances in dB), nearest first"""
+        vector = scan_vector(networks, self.column, len(self.bssids))
+        rows = np.arange(len(self)) if exhaustive else self.candidates(vector)
+        if not len(rows):
+            return rows, np.empty(0)
+
+        # Distance over the scan's access points, plus each row's energy elsewhere
+        heard = np.flatnonzero(vector > MISSING)
+        # Whole rows first (contiguous copies), then the columns: much faster than np.ix_
+        block = self.fingerprints[rows][:, heard].astype(np.float32)
+        query = vector[heard].astype(np.float32)
+        diff = block - query
+        block -= MISSING
+        inside = np.einsum('ij,ij->i', diff, diff)
+        outside = self.energy[rows] - np.einsum('ij,ij->i', block, block)
+        distances = np.sqrt(np.maximum(inside + outside, 0.0))
+
+        k = min(k, len(rows))
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest])]
+        return rows[nearest], distances[nearest]
+
+    def locate(self, networks, k=3, exhaustive=False):
+        """Best location for a scan: dict with label, position (weighted k-NN mean) and distance.
+
+        Returns None if the scan shares no access point with the survey.
+        """
+        rows, distances = self.nearest(networks, k, exhaustive)
+        if not len(rows):
+            return None
+        labels = self.labels[rows]
+        weights = 1.0 / (distances + 1.0)
+
+        # Majority label by weight; position is the weighted mean of the neighbours with one
+        votes = {}
+        for label, weight in zip(labels.tolist(), weights):
+            votes[label] = votes.get(label, 0.0) + weight
+        positions = np.asarray(self.positions[rows], dtype=np.float64)
+        known = ~np.isnan(positions[:, 0])
+        position = None
+        if known.any():
+            position = tuple(np.average(positions[known], axis=0, weights=weights[known]).tolist())
+        return {
+            'label': max(votes, key=votes.get),
+            'position': position,
+            'distance': float(distances[0]),
+            'neighbors': labels.tolist(),
+        }
@@ -1,50 +1,45 @@
-import objc
+import argparse
 import time
 
-# Load the CoreWLAN framework
-bundle_path = '/System/Library/Frameworks/CoreWLAN.framework'
-objc.loadBundle('CoreWLAN', bundle_path=bundle_path, module_globals=globals())
+from positioning import PositionEngine, load_anchors
+from radio_backend import BACKENDS, RadioError, get_backend
+from trace_log import KIND_WIFI, TraceRecorder
+from wifi_fingerprint import FingerprintDatabase, FingerprintSurvey
+from wifi_scanner import ParallelWifiScanner
 
-# Access CoreWLAN classes
-try:
-    CWInterface = objc.lookUpClass('CWInterface')
-    CWNetwork = objc.lookUpClass('CWNetwork')
-except objc.nosuchclass_error:
-    print("Error: Unable to load CoreWLAN classes. Ensure macOS permissions are set correctly.")
-    exit(1)
+_default_backend = None
 
-def scan_wifi_networks():
+def default_backend():
+    """The platform's radio backend, created on first use"""
+    global _default_backend
+    if _default_backend is None:
+        _default_backend = get_backend()
+    return _default_backend
+
+def scan_wifi_networks(backend=None, interface=None):
     """
     Scans for available WiFi networks and returns a list of network details.
 
+    Args:
+        backend (RadioBackend): Radio backend to scan with (default: the platform's).
+        interface (str): WiFi interface to scan on (default: the backend's default one).
+
     Returns:
         list: A list of dictionaries with network info (SSID, BSSID, RSSI, channel, security).
     """
-    # Get the default WiFi interface
-    interface = CWInterface.interface()
-    if not interface:
-        print("No WiFi interface found. Ensure WiFi is enabled.")
-        return []
-
     # Perform the scan
     try:
-        networks, error = interface.scanForNetworksWithName_error_(None, None)
-        if error:
-            print(f"Error scanning for networks: {error}")
-            return []
+        networks = (backend or default_backend()).scan_wifi(interface)
+    except RadioError as e:
+        print(e)
+        return []
     except Exception as e:
         print(f"Exception during scan: {e}")
         return []
 
     # Extract network information
     network_list = []
-    for network in networks:
-        ssid = network.ssid()  # Network name
-        bssid = network.bssid()  # MAC address of the access point
-        rssi = network.rssiValue()  # Signal strength in dBm
-        channel = network.wlanChannel().channelNumber()  # WiFi channel
-        security = network.securityMode()  # Security type
-
+    for ssid, bssid, rssi, channel, security in networks:
         # Warn if SSID or BSSID is None
         if ssid is None or bssid is None:
             print("Warning: SSID or BSSID is None. Enable Location Services for this application in System Preferences > Privacy & Security.")
@@ -59,29 +54,130 @@ def scan_wifi_networks():
 
     return network_list
 
-def continuously_track_rssi(interval=5):
+def survey_location(label, path, scans=5, interval=1.0, position=None, backend=None):
+    """
+    Records WiFi fingerprints at the current location into a fingerprint database.
+
+    Args:
+        label (str): Name of the location being surveyed, e.g. "kitchen".
+        path (str): Directory of the fingerprint database (created or extended).
+        scans (int): Number of scans to record here.
+        interval (float): Time in seconds between scans.
+        position (tuple): Optional (x, y) of the location in metres.
+        backend (RadioBackend): Radio backend to scan with (default: the platform's).
+
+    Returns:
+        int: Number of fingerprints in the database after saving.
+    """
+    survey = FingerprintSurvey(path)
+    for i in range(scans):
+        if i:
+            time.sleep(interval)
+        count = survey.record(label, scan_wifi_networks(backend), position)
+        print(f"Scan {i + 1}/{scans} at '{label}': {count} access points")
+    total = survey.save()
+    print(f"Saved; {path} now holds {total} fingerprints")
+    return total
+
+def print_scan_diff(result, table_size):
+    """Print what one scan changed: + new, - lost, ~ RSSI moved"""
+    new, lost, changed = result.diff
+    if not (new or lost or changed):
+        return
+    _, interface = result.source
+    print(f"\n[{time.strftime('%H:%M:%S')}] {interface or 'wifi'}: "
+          f"+{len(new)} -{len(lost)} ~{len(changed)} ({table_size} access points in view)")
+    for net in new:
+        print(f"  + {net['ssid']:<32} {net['bssid']:<20} {net['rssi']:>4} dBm  ch {net['channel']:<4} {net['security']}")
+    for net in lost:
+        print(f"  - {net['ssid']:<32} {net['bssid']:<20} (last {net['rssi']} dBm)")
+    for net, previous in changed:
+        print(f"  ~ {net['ssid']:<32} {net['bssid']:<20} {previous:>4} -> {net['rssi']} dBm")
+
+def continuously_track_rssi(interval=5, backend=None, position_engine=None, fingerprints=None, recorder=None,
+                            interfaces=None, min_change=3):
     """
-    Continuously scans for WiFi networks and tracks their RSSI every 'interval' seconds.
+    Continuously scans for WiFi networks and reports changes in what is in view.
+
+    Every WiFi interface of every backend scans in parallel, each at most every
+    'interval' seconds, and the next scan runs while the last one is processed.
+    Only new, lost and changed access points are printed.
 
     Args:
-        interval (int): Time in seconds between scans.
+        interval (int): Time in seconds between scans of each interface.
+        backend (RadioBackend or list): Radio backend(s) to scan with (default: the platform's).
+        position_engine (PositionEngine): If given, each scan updates a position
+            estimate from access points at known positions (keyed by BSSID).
+        fingerprints (FingerprintDatabase): If given, each scan is matched
+            against surveyed locations.
+        recorder (TraceRecorder): If given, every network of every scan is logged to it.
+        interfaces (list): Interface names to scan on (default: all of each backend's).
+        min_change (int): RSSI change in dB worth reporting.
     """
-    print(f"Starting continuous WiFi scan every {interval} seconds. Press Ctrl+C to stop.")
+    backends = backend if isinstance(backend, (list, tuple)) else [backend or default_backend()]
+    if interfaces:
+        sources = [(b, name) for b in backends for name in interfaces]
+        scanner = ParallelWifiScanner(sources, scan_wifi_networks, interval=interval, min_change=min_change)
+    else:
+        scanner = ParallelWifiScanner.for_backends(backends, scan_wifi_networks, interval=interval,
+                                                   min_change=min_change)
+    names = ', '.join(name or 'default' for _, name in scanner.sources)
+    print(f"Starting continuous WiFi scan every {interval} seconds on {names}. Press Ctrl+C to stop.")
+    results = scanner.results()
     try:
-        while True:
-            networks = scan_wifi_networks()
-            if networks:
-                print("\n" + "=" * 80)
-                print(f"Scan at {time.strftime('%Y-%m-%d %H:%M:%S')}")
-                print(f"{'SSID':<32} {'BSSID':<20} {'RSSI':<10} {'Channel':<10} {'Security':<10}")
-                print("-" * 80)
-                for net in networks:
-                    print(f"{net['ssid']:<32} {net['bssid']:<20} {net['rssi']:<10} {net['channel']:<10} {net['security']:<10}")
-            else:
+        for result in results:
+            networks = result.networks
+            if not networks:
                 print("No networks found or unable to scan.")
-            time.sleep(interval)
+                continue
+            print_scan_diff(result, len(scanner.table))
+            if recorder:
+                for net in networks:
+                    recorder.record(net['bssid'], net['rssi'], kind=KIND_WIFI, name=net['ssid'])
+            if position_engine:
+                now = time.monotonic()
+                position_engine.observe_networks(networks, now)
+                position = position_engine.update(now)
+                if position is not None:
+                    print(f"Position: ({position[0]:.1f}, {position[1]:.1f}) m, "
+                          f"+/- {position_engine.accuracy:.1f} m from {position_engine.anchors_used} access points")
+            if fingerprints:
+                match = fingerprints.locate(networks)
+                if match:
+                    where = f" at ({match['position'][0]:.1f}, {match['position'][1]:.1f}) m" if match['position'] else ""
+                    print(f"Fingerprint match: {match['label']}{where} (distance {match['distance']:.1f} dB)")
     except KeyboardInterrupt:
         print("\nStopping WiFi scan.")
+    finally:
+        results.close()
+        if recorder:
+            recorder.close()
 
 if __name__ == "__main__":
-    continuously_track_rssi(interval=5)
+    parser = argparse.ArgumentParser(description="Continuously scan WiFi networks")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), action='append',
+                        help="radio backend, repeat to scan with several (default: corebluetooth on macOS, simulated elsewhere)")
+    parser.add_argument('--interval', type=float, default=5, help="seconds between scans")
+    parser.add_argument('--interface', action='append', metavar='NAME', help="WiFi interface to scan (default: all)")
+    parser.add_argument('--min-change', type=int, default=3, help="RSSI change in dB worth reporting")
+    parser.add_argument('--anchors', help="JSON file of access point positions ({bssid: [x, y]}) to estimate position from")
+    parser.add_argument('--fingerprints', metavar='DIR', help="fingerprint database to survey into or match against")
+    parser.add_argument('--survey', metavar='LABEL', help="record fingerprints for this location and exit")
+    parser.add_argument('--at', type=float, nargs=2, metavar=('X', 'Y'), help="position of the surveyed location in metres")
+    parser.add_argument('--scans', type=int, default=5, help="scans to record when surveying")
+    parser.add_argument('--record', metavar='PATH', help="log every scan to a binary trace file")
+    args = parser.parse_args()
+    if args.survey:
+        if not args.fingerprints:
+            parser.error("--survey needs --fingerprints DIR")
+        survey_location(args.survey, args.fingerprints, args.scans, args.interval, args.at,
+                        get_backend(args.backend[0] if args.backend else None))
+        raise SystemExit
+    # Scans are seconds apart, so readings must stay valid across a couple of them
+    engine = PositionEngine(load_anchors(args.anchors), max_age=2.5 * args.interval, smoothing=0.5) if args.anchors else None
+    fingerprints = FingerprintDatabase(args.fingerprints) if args.fingerprints else None
+    backends = [get_backend(name) for name in args.backend] if args.backend else [get_backend()]
+    continuously_track_rssi(interval=args.interval, backend=backends, position_engine=engine,
+                            fingerprints=fingerprints,
+                            recorder=TraceRecorder(args.record) if args.record else None,
+                            interfaces=args.interface, min_change=args.min_change)
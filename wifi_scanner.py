@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# What changed between scans: lists of network dicts (as scan_wifi_networks returns);
+# `changed` holds (network, previously reported RSSI) pairs
+ScanDiff = namedtuple('ScanDiff', ['new', 'lost', 'changed'])
+
+# One finished scan: which (backend, interface) ran it, when it started, its networks and the diff it caused
+ScanResult = namedtuple('ScanResult', ['source', 'started', 'networks', 'diff'])
+
+
+def network_key(net):
+    """BSSID, or SSID and channel when the OS hides BSSIDs (no location permission)"""
+    bssid = net['bssid']
+    return bssid if bssid != "Unknown" else f"{net['ssid']}/{net['channel']}"
+
+
+class _Sighting:
+    __slots__ = ('network', 'reported', 'last_seen')
+
+    def __init__(self, network, source, now):
+        self.network = network
+        self.reported = {source: network['rssi']}  # Per source: RSSI as of the last diff that mentioned it
+        self.last_seen = now
+
+
+class NetworkTable:
+    """Access points currently in view, keyed by BSSID, updated scan by scan.
+
+    update() folds in one scan and returns only what changed: networks seen
+    for the first time, networks not seen for `lost_after` seconds, and
+    networks whose RSSI moved by at least `min_change` dB since it was last
+    reported (so scan-to-scan noise stays quiet). The last reported RSSI is
+    kept per scan source, since two adapters hear the same access point at
+    different levels; a network is still one entry. Each scan costs one dict
+    lookup per network plus a sweep for lost ones, with no per-scan lists
+    of every network rebuilt.
+    """
+    def __init__(self, min_change=3, lost_after=15.0):
+        self.min_change = min_change
+        self.lost_after = lost_after
+        self.sightings = {}
+
+    def __len__(self):
+        return len(self.sightings)
+
+    def networks(self):
+        """The latest reading of every network in view"""
+        return [sighting.network for sighting in self.sightings.values()]
+
+    def update(self, networks, now, source=None):
+        """Fold in one scan by `source` (e.g. its interface); returns a ScanDiff"""
+        sightings = self.sightings
+        min_change = self.min_change
+        new, changed = [], []
+        for net in networks:
+            key = network_key(net)
+            sighting = sightings.get(key)
+            if sighting is None:
+                sightings[key] = _Sighting(net, source, now)
+                new.append(net)
+                continue
+            sighting.network = net
+            sighting.last_seen = now
+            reported = sighting.reported.get(source)
+            if reported is None:
+                sighting.reported[source] = net['rssi']  # First heard by this source: its own baseline
+            elif abs(net['rssi'] - reported) >= min_change:
+                changed.append((net, reported))
+                sighting.reported[source] = net['rssi']
+
+        lost = []
+        cutoff = now - self.lost_after
+        for key, sighting in list(sightings.items()):
+            if sighting.last_seen < cutoff:
+                lost.append(sighting.network)
+                del sightings[key]
+        return ScanDiff(new, lost, changed)
+
+
+class ParallelWifiScanner:
+    """Scans every (backend, interface) source concurrently and reports deltas.
+
+    Each source scans on its own pool thread at most every `interval`
+    seconds. As soon as a scan finishes, the source's next scan is queued
+    before the result is handed out, so scan N+1 runs while the caller
+    processes scan N. All sources feed one NetworkTable, so an access point
+    heard on two interfaces is one entry, with RSSI changes tracked per source.
+
+    `scan(backend, interface)` returns a list of network dicts, like
+    wifi_scan.scan_wifi_networks.
+    """
+    def __init__(self, sources, scan, interval=5.0, min_change=3, lost_after=None):
+        self.sources = list(sources)
+        self.scan = scan
+        self.interval = interval
+        # A network may miss a scan or two before it counts as gone
+        self.table = NetworkTable(min_change, 2.5 * interval + 1.0 if lost_after is None else lost_after)
+        self.scans_completed = 0
+        self._stop = threading.Event()
+
+    @classmethod
+    def for_backends(cls, backends, scan, **options):
+        """A scanner over every WiFi interface of each backend"""
+        sources = [(backend, interface) for backend in backends for interface in backend.wifi_interfaces()]
+        return cls(sources, scan, **options)
+
+    def _scan(self, source, due):
+        delay = due - time.monotonic()
+        if delay > 0 and self._stop.wait(delay):
+            return source, due, None
+        started = time.monotonic()
+        backend, interface = source
+        return source, started, self.scan(backend, interface)
+
+    def results(self):
+        """Yield a ScanResult for every scan as it completes, until stop() or the generator is closed"""
+        self._stop.clear()
+        pool = ThreadPoolExecutor(max_workers=len(self.sources), thread_name_prefix='wifi-scan')
+        try:
+            now = time.monotonic()
+            pending = {pool.submit(self._scan, source, now) for source in self.sources}
+            while pending and not self._stop.is_set():
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    source, started, networks = future.result()
+                    if networks is None:
+                        continue  # Stopped while waiting
+                    # Queue the next scan first, so it overlaps with processing this one
+                    pending.add(pool.submit(self._scan, source, started + self.interval))
+                    self.scans_completed += 1
+                    yield ScanResult(source, started, networks, self.table.update(networks, time.monotonic(), source))
+        finally:
+            self._stop.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stop(self):
+        self._stop.set()